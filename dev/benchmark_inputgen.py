@@ -0,0 +1,47 @@
+"""Measure the throughput of rendering APBS input files.
+
+Renders many inputs for one sized molecule, varying the ionic strength and
+solvent dielectric of each, as a parameter sweep does::
+
+    python dev/benchmark_inputgen.py --count 100000
+"""
+
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+from pdb2pqr.inputgen import Input
+from pdb2pqr.psize import Psize
+
+PQR_PATH = (
+    Path(__file__).parent.parent / "tests" / "data" / "input" / "dx2cube.pqr"
+)
+
+
+def main():
+    """Render the inputs and print the throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--method", default="mg-auto")
+    parser.add_argument("--pqr", default=str(PQR_PATH))
+    args = parser.parse_args()
+
+    size = Psize()
+    size.run_psize(args.pqr)
+    input_ = Input(args.pqr, size, args.method, False, 0.15, False)
+    start = perf_counter()
+    num_chars = 0
+    for idx in range(args.count):
+        for elec in input_.elecs:
+            elec.istrng = 0.001 * (idx % 500)
+        input_.elecs[0].sdie = 2.0 + idx % 80
+        num_chars += len(str(input_))
+    seconds = perf_counter() - start
+    print(
+        f"Rendered {args.count} {args.method} inputs ({num_chars} chars) in "
+        f"{seconds:.3f} s: {args.count / seconds:.0f} inputs/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,32 @@ For more information, see http://www.poissonboltzmann.org/
 import logging
 from sys import version_info
 from ._version import __version__  # noqa: F401
-from .pdb2pqr import main
 
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def __getattr__(name):
+    """Import :func:`main` on first use.
+
+    Every module of this package imports the package first, so importing
+    the PDB2PQR driver (and its dependencies) eagerly would slow the other
+    command-line tools.
+    """
+    if name == "main":
+        from .pdb2pqr import main
+
+        globals()["main"] = main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # TODO: update minimum required version to 3.7
 assert version_info >= (3, 5)
 logging.captureWarnings(True)
 
 
 if __name__ == "__main__":
+    from .pdb2pqr import main
+
     main()
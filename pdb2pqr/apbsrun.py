@@ -0,0 +1,357 @@
+"""Run the per-processor inputs of an asynchronous APBS calculation locally.
+
+``inputgen --asynch`` writes one ``-PE<n>.in`` file for each processor of a
+parallel focusing calculation.  This runs them with a bounded number of
+concurrent processes, starting a task only while the predicted memory of
+the running tasks (from the per-processor grid in each input, as estimated
+by :mod:`psize` or a calibrated :class:`~pdb2pqr.cost_model.CostModel`)
+stays within a budget.  Failed or timed-out tasks can be retried, and a
+JSON report of every attempt is written at the end.
+"""
+
+from argparse import (
+    ArgumentDefaultsHelpFormatter,
+    ArgumentError,
+    ArgumentParser,
+    Namespace,
+)
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, List
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from pdb2pqr.process_cli import check_file
+from .config import (
+    APBS_EXECUTABLE,
+    RUNNER_POLL_INTERVAL,
+    TITLE_STR,
+    VERSION,
+    LogLevels,
+)
+
+if TYPE_CHECKING:
+    # NumPy is only imported to predict memory, after the CLI is parsed
+    from .cost_model import CostModel
+
+_LOGGER = logging.getLogger(f"apbsrun {VERSION}")
+
+
+def estimate_memory(input_path, cost_model: "CostModel" = None) -> float:
+    """Predict the memory needed to run an APBS input file.
+
+    The largest ``dime`` of the ELEC statements (the grid points on each
+    processor) is used.
+
+    :param input_path:  path of APBS input file
+    :type input_path:  str
+    :param cost_model:  model to predict memory (the :mod:`psize` estimate
+        if ``None``)
+    :type cost_model:  CostModel
+    :return:  predicted memory in MB, or 0 if the input has no ``dime``
+    :rtype:  float
+    """
+    if cost_model is None:
+        from .cost_model import CostModel
+
+        cost_model = CostModel()
+    memory = 0.0
+    with open(input_path, "rt", encoding="utf-8") as input_file:
+        for line in input_file:
+            words = line.split()
+            if len(words) == 4 and words[0] == "dime":
+                dime = [int(word) for word in words[1:]]
+                memory = max(memory, cost_model.predict(dime)["memory"])
+    return memory
+
+
+def _start(task: dict, executable: str) -> subprocess.Popen:
+    """Start an attempt at a task.
+
+    APBS runs in the directory of the input file so that the relative paths
+    in the input work; its output goes to a ``.log`` file next to the input.
+    The output of a retry is appended to the log after a separator line, so
+    the output of the failed attempts is kept for diagnosis.
+
+    :param task:  task from :func:`run_inputs`
+    :type task:  dict
+    :param executable:  path of APBS executable
+    :type executable:  str
+    :return:  running process
+    :rtype:  subprocess.Popen
+    """
+    input_path = Path(task["input"])
+    attempt = len(task["attempts"]) + 1
+    with open(task["log"], "ab" if attempt > 1 else "wb") as log_file:
+        if attempt > 1:
+            log_file.write(
+                f"\n=== apbsrun: attempt {attempt} ===\n".encode("utf-8")
+            )
+            log_file.flush()
+        process = subprocess.Popen(
+            [executable, input_path.name],
+            cwd=input_path.parent,
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+    task["attempts"].append(
+        {"returncode": None, "seconds": None, "timed_out": False}
+    )
+    return process
+
+
+def run_inputs(
+    input_paths: List[str],
+    executable: str = APBS_EXECUTABLE,
+    jobs: int = None,
+    memory_limit: float = None,
+    timeout: float = None,
+    retries: int = 0,
+    cost_model: "CostModel" = None,
+) -> dict:
+    """Run APBS input files with bounded concurrency.
+
+    Tasks start in order whenever fewer than ``jobs`` are running and the
+    predicted memory of the running tasks plus the new one fits in
+    ``memory_limit``.  A task that needs more than the limit by itself runs
+    alone.
+
+    :param input_paths:  paths of APBS input files
+    :type input_paths:  [str]
+    :param executable:  path of APBS executable (or a stand-in accepting
+        the input file name as its only argument)
+    :type executable:  str
+    :param jobs:  maximum number of concurrent tasks (all CPUs if ``None``)
+    :type jobs:  int
+    :param memory_limit:  memory budget in MB for the concurrent tasks
+        (unlimited if ``None``)
+    :type memory_limit:  float
+    :param timeout:  maximum seconds for each attempt (unlimited if
+        ``None``)
+    :type timeout:  float
+    :param retries:  number of times to retry a failed or timed-out task
+    :type retries:  int
+    :param cost_model:  model to predict the memory of each task
+    :type cost_model:  CostModel
+    :return:  report with the ``executable``, ``jobs``, ``memory_limit``,
+        ``timeout``, ``retries``, total ``seconds``, the number of tasks
+        ``succeeded`` and ``failed``, and the ``tasks``, each with its
+        ``input``, ``log``, ``memory`` (MB), ``status`` (``succeeded`` or
+        ``failed``) and ``attempts`` (each with ``returncode``, ``seconds``
+        and ``timed_out``)
+    :rtype:  dict
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if os.sep in executable:
+        # Tasks run in the directories of their inputs
+        executable = str(Path(executable).resolve())
+    tasks = []
+    for input_path in input_paths:
+        input_path = Path(input_path)
+        tasks.append(
+            {
+                "input": str(input_path),
+                "log": str(input_path.with_suffix(".log")),
+                "memory": estimate_memory(input_path, cost_model),
+                "status": None,
+                "attempts": [],
+            }
+        )
+    start = perf_counter()
+    pending = list(range(len(tasks)))
+    running = {}
+    while pending or running:
+        memory_used = sum(tasks[idx]["memory"] for idx in running)
+        while pending and len(running) < jobs:
+            task = tasks[pending[0]]
+            if (
+                running
+                and memory_limit is not None
+                and memory_used + task["memory"] > memory_limit
+            ):
+                break
+            idx = pending.pop(0)
+            try:
+                running[idx] = (_start(task, executable), perf_counter())
+            except OSError as err:
+                task["status"] = "failed"
+                task["attempts"].append(
+                    {"returncode": None, "seconds": 0.0, "timed_out": False}
+                )
+                _LOGGER.error("Unable to run %s: %s", task["input"], err)
+                continue
+            memory_used += task["memory"]
+            _LOGGER.debug("Started %s", task["input"])
+        sleep(RUNNER_POLL_INTERVAL)
+        for idx, (process, started) in list(running.items()):
+            task = tasks[idx]
+            attempt = task["attempts"][-1]
+            seconds = perf_counter() - started
+            if process.poll() is None:
+                if timeout is None or seconds < timeout:
+                    continue
+                process.kill()
+                process.wait()
+                attempt["timed_out"] = True
+            del running[idx]
+            attempt["returncode"] = process.returncode
+            attempt["seconds"] = seconds
+            if process.returncode == 0 and not attempt["timed_out"]:
+                task["status"] = "succeeded"
+                _LOGGER.info("Ran %s in %.3f s", task["input"], seconds)
+            elif len(task["attempts"]) <= retries:
+                _LOGGER.warning(
+                    "Retrying %s after attempt %d failed",
+                    task["input"],
+                    len(task["attempts"]),
+                )
+                pending.insert(0, idx)
+            else:
+                task["status"] = "failed"
+                _LOGGER.error(
+                    "Unable to run %s (see %s)", task["input"], task["log"]
+                )
+    num_failed = sum(task["status"] == "failed" for task in tasks)
+    return {
+        "executable": executable,
+        "jobs": jobs,
+        "memory_limit": memory_limit,
+        "timeout": timeout,
+        "retries": retries,
+        "seconds": perf_counter() - start,
+        "succeeded": len(tasks) - num_failed,
+        "failed": num_failed,
+        "tasks": tasks,
+    }
+
+
+def get_cli_args(args_str: str = None) -> Namespace:
+    """Define and parse command line arguments via argparse.
+
+    :param args_str: String representation of command line arguments
+    :type args_str: str
+
+    :return:  Parsed arguments object
+    :rtype:  argparse.Namespace
+    """
+    desc = f"{TITLE_STR}\napbsrun: running the per-processor inputs of "
+    desc += "asynchronous APBS calculations"
+    parser = ArgumentParser(
+        description=desc,
+        formatter_class=ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "inputs",
+        type=str,
+        nargs="+",
+        help="APBS input files to run (e.g., the -PE<n>.in files)",
+    )
+    parser.add_argument(
+        "--apbs",
+        default=APBS_EXECUTABLE,
+        help="Path of the APBS executable",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of concurrent runs; all CPUs if omitted",
+    )
+    parser.add_argument(
+        "--memory",
+        type=float,
+        default=None,
+        help=(
+            "Memory budget (MB) for concurrent runs, checked against the "
+            "predicted memory of each input; unlimited if omitted"
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Maximum seconds for each run; unlimited if omitted",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Number of times to retry a failed or timed-out run",
+    )
+    parser.add_argument(
+        "--cost-model",
+        default=None,
+        help=(
+            "CSV file of past APBS runs to calibrate the memory prediction "
+            "(see pdb2pqr.cost_model)"
+        ),
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Write a JSON report of every run to this file",
+    )
+    parser.add_argument(
+        "--log-level",
+        help="Set logging level",
+        default=str(LogLevels.INFO),
+        choices=LogLevels.values(),
+        type=str,
+    )
+
+    args = None
+    try:
+        if args_str:
+            args = parser.parse_args(args_str.split())
+        else:
+            args = parser.parse_args()
+    except ArgumentError as err:
+        _LOGGER.error("Cannot parse CLI: %s", err)
+        sys.exit(1)
+    return args
+
+
+def main():
+    """Run APBS input files and report the results."""
+    args: Namespace = get_cli_args()
+    log_level = getattr(logging, args.log_level)
+    logging.basicConfig(level=log_level)
+    _LOGGER.debug("Got arguments: %s", args)
+
+    for input_path in args.inputs:
+        check_file(input_path)
+    cost_model = None
+    if args.cost_model is not None:
+        from .cost_model import CostModel
+
+        check_file(args.cost_model)
+        cost_model = CostModel.from_csv(args.cost_model)
+
+    report = run_inputs(
+        args.inputs,
+        executable=args.apbs,
+        jobs=args.jobs,
+        memory_limit=args.memory,
+        timeout=args.timeout,
+        retries=args.retries,
+        cost_model=cost_model,
+    )
+    _LOGGER.info(
+        "Ran %d of %d inputs in %.3f s",
+        report["succeeded"],
+        len(report["tasks"]),
+        report["seconds"],
+    )
+    if args.report is not None:
+        with open(args.report, "wt", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,27 @@ PREFIX_CONVERT = 1024.0
 MAX_PDB_ACCURACY = 0.001
 #: Number of bytes for stored representation of floating point values
 BYTES_STORED = 8.0 * 12.0
+#: Rough APBS run time (in seconds) per grid point per multigrid solve, for
+#: an uncalibrated :class:`~pdb2pqr.cost_model.CostModel`
+SECONDS_PER_GRID_SOLVE = 3.0e-6
+#: Number of distinct ELEC statement templates kept for rendering
+ELEC_TEMPLATE_CACHE_SIZE = 256
+#: Default APBS executable run by :mod:`~pdb2pqr.apbsrun`
+APBS_EXECUTABLE = "apbs"
+#: Seconds between checks on running APBS processes
+RUNNER_POLL_INTERVAL = 0.02
+#: Default size limit (in bytes) of the on-disk cache of psize results
+PSIZE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+#: Approximate number of characters of DX grid data converted at a time
+DX_CHUNK_SIZE = 4 * 1024 * 1024
+#: Suffix added to a DX file name for its binary grid cache
+DX_CACHE_SUFFIX = ".grid"
+#: Compression level for gzip-compressed DX output
+DX_GZIP_LEVEL = 6
+#: Number of lines of Cube grid data formatted at a time
+CUBE_BLOCK_LINES = 8192
+#: Number of points sampled from a grid at a time
+GRID_SAMPLE_CHUNK = 1 << 20
 #:  Minimum number of multigrid levels
 MIN_LEVELS = 4
 #:  Charge of a chloride ion
@@ -127,6 +148,70 @@ class ApbsCalcType(BaseEnum):
     MG_MANUAL = "mg-manual"
 
 
+class BoundaryCondition(BaseEnum):
+    """Enumerate APBS boundary conditions (``bcfl``)."""
+
+    ZERO = "zero"
+    SDH = "sdh"
+    MDH = "mdh"
+    MAP = "map"
+
+
+class GridInterpolation(BaseEnum):
+    """Enumerate methods for sampling grid values between grid points."""
+
+    NEAREST = "nearest"
+    LINEAR = "linear"
+
+
+class GridOutOfBounds(BaseEnum):
+    """Enumerate policies for sampling grids outside their bounds."""
+
+    FILL = "fill"
+    CLIP = "clip"
+    RAISE = "raise"
+
+
+class GridOperation(BaseEnum):
+    """Enumerate point-by-point operations for combining grids."""
+
+    ADD = "add"
+    SUBTRACT = "subtract"
+    MEAN = "mean"
+    MIN = "min"
+    MAX = "max"
+
+
+class GridMergePolicy(BaseEnum):
+    """Enumerate ways of resolving overlaps when merging sub-grids."""
+
+    OWNER = "owner"
+    MEAN = "mean"
+    FIRST = "first"
+    LAST = "last"
+
+
+class ProcGridObjective(BaseEnum):
+    """Enumerate goals of the parallel focusing processor grid search."""
+
+    PROCESSORS = "processors"
+    TIME = "time"
+
+
+class ReportFormat(BaseEnum):
+    """Enumerate formats of sizing reports."""
+
+    TEXT = "text"
+    JSON = "json"
+
+
+class TableFormat(BaseEnum):
+    """Enumerate formats of machine-readable result tables."""
+
+    CSV = "csv"
+    JSONL = "jsonl"
+
+
 class AtomType(BaseEnum):
     """Enumerate atom types."""
 
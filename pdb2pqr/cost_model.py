@@ -0,0 +1,201 @@
+"""Predict the memory and run time of APBS multigrid calculations.
+
+The default :class:`CostModel` reproduces the fixed memory estimate of
+:mod:`psize` (:const:`~pdb2pqr.config.BYTES_PER_GRID` bytes per grid point)
+with a rough run time estimate.  Both can be calibrated for local hardware
+with a least-squares fit to a CSV file of past runs, with one row per run
+and these columns:
+
+``nx``, ``ny``, ``nz``
+    grid points on each processor (``dime``)
+``nlev``
+    multigrid levels (optional, default
+    :const:`~pdb2pqr.config.MIN_LEVELS`)
+``nfocus``
+    focusing operations (optional, default 0)
+``px``, ``py``, ``pz``
+    processor grid (``pdime``; optional, default 1)
+``memory_mb``
+    peak memory per processor in MB (optional)
+``seconds``
+    wall time in seconds (optional)
+
+Rows with an empty ``memory_mb`` or ``seconds`` are left out of that fit.
+"""
+
+import csv
+import logging
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .config import (
+    BYTES_PER_GRID,
+    MIN_LEVELS,
+    PREFIX_CONVERT,
+    SECONDS_PER_GRID_SOLVE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CostModel:
+    """Linear model of the memory and run time of an APBS calculation.
+
+    Memory per processor (MB) is predicted as ``a0 + a1 * points`` and wall
+    time (s) as ``b0 + b1 * points * levels * solves + b2 * nproc``, where
+    ``points`` is the number of grid points on each processor, ``levels``
+    is the relative work of the multigrid hierarchy (each coarser level has
+    1/8 as many points), ``solves`` is one plus the number of focusing
+    operations and ``nproc`` is the total number of processors.
+    """
+
+    def __init__(self, memory_coefs=None, time_coefs=None):
+        """Initialize.
+
+        :param memory_coefs:  coefficients ``(a0, a1)`` of the memory model;
+            the default matches the fixed estimate used by :mod:`psize`
+        :type memory_coefs:  (float, float)
+        :param time_coefs:  coefficients ``(b0, b1, b2)`` of the time model;
+            the default is a rough, uncalibrated estimate
+        :type time_coefs:  (float, float, float)
+        """
+        if memory_coefs is None:
+            memory_coefs = (0.0, BYTES_PER_GRID / PREFIX_CONVERT**2)
+        if time_coefs is None:
+            time_coefs = (0.0, SECONDS_PER_GRID_SOLVE, 0.0)
+        self.memory_coefs = [float(coef) for coef in memory_coefs]
+        self.time_coefs = [float(coef) for coef in time_coefs]
+        self.calibrated = False
+
+    @staticmethod
+    def _features(
+        dime: Sequence[int],
+        pdime: Sequence[int] = (1, 1, 1),
+        nfocus: int = 0,
+        nlev: int = MIN_LEVELS,
+    ):
+        """Compute the model features of one or more calculations.
+
+        :param dime:  grid points on each processor, or an N x 3 array of
+            them
+        :type dime:  [int, int, int]
+        :param pdime:  processor grid, or an N x 3 array of them
+        :type pdime:  [int, int, int]
+        :param nfocus:  number of focusing operations, or an array of them
+        :type nfocus:  int
+        :param nlev:  number of multigrid levels
+        :type nlev:  int
+        :return:  features of the memory and time models, with the features
+            along the last axis
+        :rtype:  (numpy.ndarray, numpy.ndarray)
+        """
+        points = np.prod(np.asarray(dime, dtype=np.float64), axis=-1)
+        nproc = np.prod(np.asarray(pdime, dtype=np.float64), axis=-1)
+        nfocus = np.asarray(nfocus, dtype=np.float64)
+        levels = sum(8.0**-level for level in range(int(nlev)))
+        points, nproc, nfocus = np.broadcast_arrays(points, nproc, nfocus)
+        ones = np.ones_like(points)
+        memory = np.stack([ones, points], axis=-1)
+        time = np.stack([ones, points * levels * (1 + nfocus), nproc], axis=-1)
+        return memory, time
+
+    def predict(
+        self,
+        dime: Sequence[int],
+        pdime: Sequence[int] = (1, 1, 1),
+        nfocus: int = 0,
+        nlev: int = MIN_LEVELS,
+    ) -> Dict[str, float]:
+        """Predict the cost of a calculation.
+
+        :param dime:  grid points on each processor
+        :type dime:  [int, int, int]
+        :param pdime:  processor grid
+        :type pdime:  [int, int, int]
+        :param nfocus:  number of focusing operations
+        :type nfocus:  int
+        :param nlev:  number of multigrid levels
+        :type nlev:  int
+        :return:  predicted ``memory`` (MB per processor) and ``time`` (s),
+            as arrays if arrays of calculations were given
+        :rtype:  Dict[str, float]
+        """
+        memory, time = self._features(dime, pdime, nfocus, nlev)
+        memory = memory @ self.memory_coefs
+        time = time @ self.time_coefs
+        if memory.ndim == 0:
+            return {"memory": float(memory), "time": float(time)}
+        return {"memory": memory, "time": time}
+
+    def fit(self, runs: List[dict]):
+        """Fit the model to past runs by linear least squares.
+
+        :param runs:  runs, each a dictionary with the columns described in
+            :mod:`pdb2pqr.cost_model` (as numbers or strings)
+        :type runs:  [dict]
+        :raises ValueError:  if there are too few runs to fit a model
+        """
+        rows = {"memory_mb": ([], []), "seconds": ([], [])}
+        for run in runs:
+            memory, time = self._features(
+                [int(run[key]) for key in ("nx", "ny", "nz")],
+                [int(run.get(key) or 1) for key in ("px", "py", "pz")],
+                int(run.get("nfocus") or 0),
+                int(run.get("nlev") or MIN_LEVELS),
+            )
+            for target, features in [("memory_mb", memory), ("seconds", time)]:
+                if run.get(target) not in (None, ""):
+                    rows[target][0].append(features)
+                    rows[target][1].append(float(run[target]))
+        fitted = False
+        for target, attr in [
+            ("memory_mb", "memory_coefs"),
+            ("seconds", "time_coefs"),
+        ]:
+            features, values = rows[target]
+            if not values:
+                continue
+            features = np.array(features)
+            if len(values) < features.shape[1]:
+                raise ValueError(
+                    f"Need at least {features.shape[1]} runs with "
+                    f"{target} to fit the cost model; got {len(values)}."
+                )
+            coefs, _, rank, _ = np.linalg.lstsq(
+                features, np.array(values), rcond=None
+            )
+            if rank < features.shape[1]:
+                _LOGGER.info(
+                    "Runs do not determine every %s coefficient.", target
+                )
+            setattr(self, attr, coefs.tolist())
+            fitted = True
+        if not fitted:
+            raise ValueError("No runs with memory_mb or seconds to fit.")
+        self.calibrated = True
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> "CostModel":
+        """Create a model calibrated from a CSV file of past runs.
+
+        :param csv_path:  path to CSV file with the columns described in
+            :mod:`pdb2pqr.cost_model`
+        :type csv_path:  Path
+        :return:  calibrated model
+        :rtype:  CostModel
+        :raises ValueError:  if the runs cannot be fit
+        """
+        with open(csv_path, "rt", encoding="utf-8", newline="") as csv_file:
+            runs = list(csv.DictReader(csv_file))
+        model = cls()
+        model.fit(runs)
+        _LOGGER.debug(
+            "Calibrated cost model from %d runs in %s: memory %s, time %s",
+            len(runs),
+            csv_path,
+            model.memory_coefs,
+            model.time_coefs,
+        )
+        return model
@@ -6,16 +6,23 @@ from argparse import (
     ArgumentParser,
     Namespace,
 )
+from glob import glob
+from pathlib import Path
+from time import perf_counter
+from typing import List, Tuple
 import logging
 import sys
 
-from pdb2pqr.process_cli import check_file
+from pdb2pqr.process_cli import EmptyFileError, check_file
 from .config import TITLE_STR, VERSION, FilePermission, LogLevels
-from .io.dx import read_dx, write_cube
+from .io.dx import convert_dx_to_cube, open_dx, read_dx, write_cube
 from .io.reader_pqr import read_pqr
 
 _LOGGER = logging.getLogger(f"dx2cube {VERSION}")
 
+#: Atoms of each PQR file of a batch, by path, in a worker process
+_WORKER_ATOMS = {}
+
 
 def get_cli_args(args_str: str = None) -> Namespace:
     """Define and parse command line arguments via argparse.
@@ -32,11 +39,38 @@ def get_cli_args(args_str: str = None) -> Namespace:
         description=desc,
         formatter_class=ArgumentDefaultsHelpFormatter,
     )
-    parser.add_argument("dx_input", type=str, help="Name of the DX input file")
     parser.add_argument(
-        "pqr_input", type=str, help="Name of the PQR input file"
+        "dx_input", type=str, nargs="?", help="Name of the DX input file"
+    )
+    parser.add_argument(
+        "pqr_input", type=str, nargs="?", help="Name of the PQR input file"
+    )
+    parser.add_argument(
+        "output", type=str, nargs="?", help="Name of the output file"
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        help=(
+            "Convert the DX/PQR pairs listed in this manifest instead of a "
+            "single pair. Each line holds a DX path or glob, a PQR path and "
+            "optionally an output path (or directory, for globs)."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes for --batch; all CPUs if omitted",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Convert the grid in blocks without loading the whole DX file "
+            "into memory"
+        ),
     )
-    parser.add_argument("output", type=str, help="Name of the output file")
     parser.add_argument(
         "--log-level",
         help="Set logging level",
@@ -48,14 +82,186 @@ def get_cli_args(args_str: str = None) -> Namespace:
     args = None
     try:
         if args_str:
-            return parser.parse_args(args_str.split())
-        args = parser.parse_args()
+            args = parser.parse_args(args_str.split())
+        else:
+            args = parser.parse_args()
     except ArgumentError as err:
         _LOGGER.error("Cannot parse CLI: %s", err)
         sys.exit(1)
+    positionals = [args.dx_input, args.pqr_input, args.output]
+    if args.batch is None and None in positionals:
+        parser.error("dx_input, pqr_input and output are required")
+    if args.batch is not None and positionals != [None, None, None]:
+        parser.error("--batch cannot be combined with dx_input/pqr_input")
     return args
 
 
+def read_manifest(manifest_path: str) -> List[Tuple[Path, Path, Path]]:
+    """Read the DX/PQR pairs to convert from a batch manifest.
+
+    Each non-blank line that does not start with ``#`` holds a DX path, a
+    PQR path and, optionally, an output path, separated by whitespace.
+    Relative paths are relative to the manifest.  The DX path may be a glob
+    pattern, in which case the output (if given) is a directory.  Outputs
+    default to the DX path with a ``.cube`` suffix.
+
+    :param manifest_path:  path to manifest file
+    :type manifest_path:  str
+    :return:  list of (DX path, PQR path, output path) tuples
+    :rtype:  [(Path, Path, Path)]
+    :raises ValueError:  on parsing error
+    """
+    manifest_path = Path(manifest_path)
+    base_dir = manifest_path.parent
+    tasks = []
+    with open(manifest_path, "rt", encoding="utf-8") as manifest_file:
+        for line_num, line in enumerate(manifest_file, start=1):
+            words = line.split()
+            if not words or words[0].startswith("#"):
+                continue
+            if len(words) not in [2, 3]:
+                raise ValueError(
+                    f"{manifest_path}:{line_num}: expected 'DX PQR [OUTPUT]'"
+                )
+            dx_pattern = str(base_dir / words[0])
+            pqr_path = base_dir / words[1]
+            output = base_dir / words[2] if len(words) == 3 else None
+            if any(char in words[0] for char in "*?["):
+                dx_paths = [Path(path) for path in sorted(glob(dx_pattern))]
+                if not dx_paths:
+                    _LOGGER.warning("No DX files match %s", dx_pattern)
+                for dx_path in dx_paths:
+                    cube_dir = dx_path.parent if output is None else output
+                    cube_path = cube_dir / dx_path.with_suffix(".cube").name
+                    tasks.append((dx_path, pqr_path, cube_path))
+            else:
+                dx_path = Path(dx_pattern)
+                if output is None:
+                    output = dx_path.with_suffix(".cube")
+                tasks.append((dx_path, pqr_path, output))
+    return tasks
+
+
+def _init_worker(atom_lists: dict):
+    """Store the atoms of every PQR file of a batch in a worker process.
+
+    :param atom_lists:  atoms read from each PQR file, by path
+    :type atom_lists:  {Path: [Atom]}
+    """
+    _WORKER_ATOMS.update(atom_lists)
+
+
+def _convert_file(dx_path: Path, cube_path: Path, pqr_path: Path) -> float:
+    """Convert one DX file to a Cube file in a worker process.
+
+    :param dx_path:  path to DX input file
+    :type dx_path:  Path
+    :param cube_path:  path to Cube output file
+    :type cube_path:  Path
+    :param pqr_path:  path to the PQR file, whose atoms were passed to
+        :func:`_init_worker`
+    :type pqr_path:  Path
+    :return:  time taken for the conversion (s)
+    :rtype:  float
+    """
+    atom_list = _WORKER_ATOMS[pqr_path]
+    start = perf_counter()
+    check_file(dx_path)
+    check_file(cube_path, permission=FilePermission.WRITE, overwrite=False)
+    with open_dx(dx_path) as dx_file, open(
+        cube_path, "wt", encoding="utf-8"
+    ) as cube_file:
+        convert_dx_to_cube(dx_file, cube_file, atom_list)
+    return perf_counter() - start
+
+
+def convert_batch(
+    tasks: List[Tuple[Path, Path, Path]], jobs: int = None
+) -> List[dict]:
+    """Convert many DX files to Cube files across a pool of processes.
+
+    Each PQR file is read once, however many grids share it, and its atoms
+    are sent once to each worker rather than with every task.  A failed
+    conversion is logged and reported without stopping the others.
+
+    :param tasks:  list of (DX path, PQR path, output path) tuples, as
+        returned by :func:`read_manifest`
+    :type tasks:  [(Path, Path, Path)]
+    :param jobs:  number of worker processes (all CPUs if ``None``)
+    :type jobs:  int
+    :return:  one result per task with the keys ``dx``, ``pqr``, ``cube``,
+        ``seconds`` and ``error`` (``None`` on success)
+    :rtype:  [dict]
+    """
+    atom_lists = {}
+    results = []
+    for dx_path, pqr_path, cube_path in tasks:
+        results.append(
+            {
+                "dx": str(dx_path),
+                "pqr": str(pqr_path),
+                "cube": str(cube_path),
+                "seconds": None,
+                "error": None,
+            }
+        )
+        if pqr_path not in atom_lists:
+            try:
+                check_file(pqr_path)
+                with open(pqr_path, "rt", encoding="utf-8") as pqr_file:
+                    atom_lists[pqr_path] = read_pqr(pqr_file)
+            except (EmptyFileError, OSError, ValueError) as err:
+                atom_lists[pqr_path] = err
+            except Exception as err:
+                atom_lists[pqr_path] = RuntimeError(
+                    f"{type(err).__name__}: {err}"
+                )
+
+    # multiprocessing is slow to import and only needed for batches
+    from concurrent.futures import ProcessPoolExecutor
+
+    valid_lists = {
+        path: atom_list
+        for path, atom_list in atom_lists.items()
+        if not isinstance(atom_list, Exception)
+    }
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(valid_lists,)
+    ) as executor:
+        futures = {}
+        for idx, (dx_path, pqr_path, cube_path) in enumerate(tasks):
+            atom_list = atom_lists[pqr_path]
+            if isinstance(atom_list, Exception):
+                results[idx]["error"] = str(atom_list)
+                continue
+            future = executor.submit(
+                _convert_file, dx_path, cube_path, pqr_path
+            )
+            futures[future] = idx
+        for future, idx in futures.items():
+            result = results[idx]
+            try:
+                result["seconds"] = future.result()
+                _LOGGER.info(
+                    "Converted %s to %s in %.3f s",
+                    result["dx"],
+                    result["cube"],
+                    result["seconds"],
+                )
+            except (EmptyFileError, OSError, ValueError) as err:
+                result["error"] = str(err)
+            except Exception as err:
+                # Unexpected errors, including a crashed worker
+                # (BrokenProcessPool), only fail this conversion
+                result["error"] = f"{type(err).__name__}: {err}"
+        for result in results:
+            if result["error"] is not None:
+                _LOGGER.error(
+                    "Unable to convert %s: %s", result["dx"], result["error"]
+                )
+    return results
+
+
 def main():
     """Convert DX file format to Cube file format.
 
@@ -67,21 +273,48 @@ def main():
     .. todo:: This function should be moved into the APBS code base.
     """
     args: Namespace = get_cli_args()
+    log_level = getattr(logging, args.log_level)
+    logging.basicConfig(level=log_level)
+    _LOGGER.debug("Got arguments: %s", args)
+
+    if args.batch is not None:
+        check_file(args.batch)
+        start = perf_counter()
+        results = convert_batch(read_manifest(args.batch), jobs=args.jobs)
+        num_failed = sum(result["error"] is not None for result in results)
+        _LOGGER.info(
+            "Converted %d of %d DX files in %.3f s",
+            len(results) - num_failed,
+            len(results),
+            perf_counter() - start,
+        )
+        if num_failed:
+            sys.exit(1)
+        return
+
     check_file(args.pqr_input)
     check_file(args.dx_input)
     check_file(args.output, permission=FilePermission.WRITE, overwrite=False)
-
-    log_level = getattr(logging, args.log_level.name)
-    logging.basicConfig(level=log_level)
-    _LOGGER.debug("Got arguments: %s", args)
     _LOGGER.info("Reading PQR from %s...", args.pqr_input)
 
     # TODO: use try/except to catch/log permission-based exceptions
     with open(args.pqr_input, "rt", encoding="utf-8") as pqr_file:
         atom_list = read_pqr(pqr_file)
 
+    if args.stream:
+        _LOGGER.info(
+            "Converting DX from %s to Cube at %s...",
+            args.dx_input,
+            args.output,
+        )
+        with open_dx(args.dx_input) as dx_file, open(
+            args.output, "wt", encoding="utf-8"
+        ) as cube_file:
+            convert_dx_to_cube(dx_file, cube_file, atom_list)
+        return
+
     _LOGGER.info("Reading DX from %s...", args.dx_input)
-    with open(args.dx_input, "rt", encoding="utf-8") as dx_file:
+    with open_dx(args.dx_input) as dx_file:
         dx_dict = read_dx(dx_file)
 
     _LOGGER.info("Writing Cube to %s...", args.output)
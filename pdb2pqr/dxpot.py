@@ -0,0 +1,201 @@
+"""Sample DX-format grids (e.g., APBS potentials) at PQR atom positions."""
+
+from argparse import (
+    ArgumentDefaultsHelpFormatter,
+    ArgumentError,
+    ArgumentParser,
+    Namespace,
+)
+from io import FileIO
+import csv
+import logging
+import sys
+from typing import Tuple
+
+import numpy as np
+
+from pdb2pqr.process_cli import check_file
+from .config import (
+    TITLE_STR,
+    VERSION,
+    FilePermission,
+    GridInterpolation,
+    GridOutOfBounds,
+    LogLevels,
+)
+from .io.dx import interpolate_dx, open_dx, read_dx
+from .io.reader_pqr import get_atom_from_pqr_line
+
+_LOGGER = logging.getLogger(f"dxpot {VERSION}")
+
+
+def get_cli_args(args_str: str = None) -> Namespace:
+    """Define and parse command line arguments via argparse.
+
+    :param args_str: String representation of command line arguments
+    :type args_str: str
+
+    :return:  Parsed arguments object
+    :rtype:  argparse.Namespace
+    """
+    desc = f"{TITLE_STR}\ndxpot: annotating PQR atoms with values sampled "
+    desc += "from OpenDX-format grids"
+    parser = ArgumentParser(
+        description=desc,
+        formatter_class=ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("dx_input", type=str, help="Name of the DX input file")
+    parser.add_argument(
+        "pqr_input", type=str, help="Name of the PQR input file"
+    )
+    parser.add_argument(
+        "output",
+        type=str,
+        help=(
+            "Name of the output CSV file, with the serial number, name and "
+            "sampled value of each atom"
+        ),
+    )
+    parser.add_argument(
+        "--method",
+        default=str(GridInterpolation.LINEAR),
+        choices=GridInterpolation.values(),
+        help="Interpolation between grid points",
+    )
+    parser.add_argument(
+        "--out-of-bounds",
+        default=str(GridOutOfBounds.FILL),
+        choices=GridOutOfBounds.values(),
+        help=(
+            "Treatment of atoms outside the grid: fill with --fill-value, "
+            "clip to the grid boundary or raise an error"
+        ),
+    )
+    parser.add_argument(
+        "--fill-value",
+        default=np.nan,
+        type=float,
+        help="Value for atoms outside the grid",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Read (or create) the binary cache of the DX grid",
+    )
+    parser.add_argument(
+        "--log-level",
+        help="Set logging level",
+        default=str(LogLevels.INFO),
+        choices=LogLevels.values(),
+        type=str,
+    )
+
+    args = None
+    try:
+        if args_str:
+            return parser.parse_args(args_str.split())
+        args = parser.parse_args()
+    except ArgumentError as err:
+        _LOGGER.error("Cannot parse CLI: %s", err)
+        sys.exit(1)
+    return args
+
+
+def annotate_pqr(
+    pqr_file: FileIO,
+    output_file: FileIO,
+    dx_dict: dict,
+    method: str = str(GridInterpolation.LINEAR),
+    out_of_bounds: str = str(GridOutOfBounds.FILL),
+    fill_value: float = np.nan,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Write a table of the grid value at each PQR atom.
+
+    All atoms are sampled in a single call to
+    :func:`~pdb2pqr.io.dx.interpolate_dx`.  The table is CSV with the
+    header ``serial,name,value`` and one row per ``ATOM`` or ``HETATM``
+    record, in file order: the atom serial number, the atom name and the
+    grid value (``nan`` for atoms outside the grid with the default fill
+    value).  The PQR file itself is left unchanged, since extra fields on
+    atom lines would make it unreadable as PQR.
+
+    :param pqr_file:  file object for PQR file, ready for reading as text
+    :type pqr_file:  file
+    :param output_file:  file object ready for writing text data
+    :type output_file:  file
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`~pdb2pqr.io.dx.read_dx`
+    :type dx_dict:  dict
+    :param method:  see :func:`~pdb2pqr.io.dx.interpolate_dx`
+    :type method:  str
+    :param out_of_bounds:  see :func:`~pdb2pqr.io.dx.interpolate_dx`
+    :type out_of_bounds:  str
+    :param fill_value:  see :func:`~pdb2pqr.io.dx.interpolate_dx`
+    :type fill_value:  float
+    :returns:  grid values at the atoms, in file order, and a mask of the
+        atoms outside the grid
+    :rtype:  (numpy.ndarray, numpy.ndarray)
+    :raises ValueError:  for problems parsing
+    """
+    atoms = []
+    for line in pqr_file:
+        if not line.strip():
+            continue
+        atom = get_atom_from_pqr_line(line)
+        if atom is not None:
+            atoms.append(atom)
+    values, outside = interpolate_dx(
+        dx_dict,
+        np.array(
+            [(atom.x, atom.y, atom.z) for atom in atoms], dtype=np.float64
+        ).reshape(-1, 3),
+        method=method,
+        out_of_bounds=out_of_bounds,
+        fill_value=fill_value,
+        return_outside=True,
+    )
+    writer = csv.writer(output_file)
+    writer.writerow(["serial", "name", "value"])
+    for atom, value in zip(atoms, values.tolist()):
+        writer.writerow([atom.serial, atom.name, f"{value:.6e}"])
+    return values, outside
+
+
+def main():
+    """Annotate PQR atoms with values sampled from a DX grid."""
+    args: Namespace = get_cli_args()
+    check_file(args.pqr_input)
+    check_file(args.dx_input)
+    check_file(args.output, permission=FilePermission.WRITE, overwrite=False)
+
+    log_level = getattr(logging, args.log_level)
+    logging.basicConfig(level=log_level)
+    _LOGGER.debug("Got arguments: %s", args)
+
+    _LOGGER.info("Reading DX from %s...", args.dx_input)
+    with open_dx(args.dx_input) as dx_file:
+        dx_dict = read_dx(dx_file, cache=args.cache)
+
+    _LOGGER.info("Writing atom values to %s...", args.output)
+    with open(args.pqr_input, "rt", encoding="utf-8") as pqr_file, open(
+        args.output, "wt", encoding="utf-8", newline=""
+    ) as output_file:
+        _, outside = annotate_pqr(
+            pqr_file,
+            output_file,
+            dx_dict,
+            method=args.method,
+            out_of_bounds=args.out_of_bounds,
+            fill_value=args.fill_value,
+        )
+    num_outside = np.count_nonzero(outside)
+    if num_outside:
+        _LOGGER.warning(
+            "%d atoms lie outside the grid (%s).",
+            num_outside,
+            args.out_of_bounds,
+        )
+
+
+if __name__ == "__main__":
+    main()
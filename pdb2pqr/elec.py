@@ -1,8 +1,11 @@
 """This is used to create the ELEC section of an APBS input file."""
+from functools import lru_cache
 from pathlib import Path
+from typing import Tuple
 from pdb2pqr.config import ApbsCalcType
 from pdb2pqr.psize import Psize
 from .config import (
+    ELEC_TEMPLATE_CACHE_SIZE,
     MIN_LEVELS,
     PARTITION_OVERLAP,
     CL_CHARGE,
@@ -18,6 +21,89 @@ from .config import (
     SURFACE_TENSION,
 )
 
+#: Fields of :class:`Elec` with one value per axis
+_VECTOR_FIELDS = ("dime", "cglen", "fglen", "glen")
+
+
+@lru_cache(maxsize=ELEC_TEMPLATE_CACHE_SIZE)
+def _compile_template(
+    method,
+    pdime,
+    ofrac,
+    asyncflag,
+    async_,
+    mol,
+    lpbe,
+    bcfl,
+    ions,
+    pdie,
+    sdie,
+    srfm,
+    chgm,
+    sdens,
+    srad,
+    swin,
+    temp,
+    calcenergy,
+    calcforce,
+) -> Tuple[str, Tuple[str, ...]]:
+    """Format the parts of an ELEC statement that rarely change.
+
+    The arguments are the :class:`Elec` attributes of the same names, with
+    ``ions`` the ion list if ionic strength is positive and empty otherwise.
+
+    :return:  ``%``-style template and the :class:`Elec` attributes filling
+        it, in order, with those in :data:`_VECTOR_FIELDS` filling three
+        values and ``write`` filling one with all of its statements
+    :rtype:  (str, Tuple[str, ...])
+    """
+    parts = []
+    fields = []
+
+    def add(static: str, template: str = "", *names: str):
+        parts.append(static.replace("%", "%%") + template)
+        fields.extend(names)
+
+    add("elec ", "%s\n", "label")
+    add(f"    {method}\n")
+    add("    dime ", "%d %d %d\n", "dime")
+    if method == str(ApbsCalcType.MG_AUTO):
+        add("    cglen ", "%.4f %.4f %.4f\n", "cglen")
+        add("    fglen ", "%.4f %.4f %.4f\n", "fglen")
+        add("    cgcent ", "%s\n", "cgcent")
+        add("    fgcent ", "%s\n", "fgcent")
+    elif method == str(ApbsCalcType.MG_MANUAL):
+        add("    glen ", "%.3f %.3f %.3f\n", "glen")
+        add("    gcent ", "%s\n", "gcent")
+    elif method == str(ApbsCalcType.MG_PARA):
+        add(f"    pdime {int(pdime[0])} {int(pdime[1])} {int(pdime[2])}\n")
+        add(f"    ofrac {ofrac:.1f}\n")
+        add("    cglen ", "%.4f %.4f %.4f\n", "cglen")
+        add("    fglen ", "%.4f %.4f %.4f\n", "fglen")
+        add("    cgcent ", "%s\n", "cgcent")
+        add("    fgcent ", "%s\n", "fgcent")
+        if asyncflag:
+            add(f"    async {async_}\n")
+    add(f"    mol {int(mol)}\n")
+    add("    lpbe\n" if lpbe else "    npbe\n")
+    add(f"    bcfl {bcfl}\n")
+    for ion in ions:
+        add(f"    ion charge {ion[0]:.2f} conc ", "%.3f", "istrng")
+        add(f" radius {ion[1]:.4f}\n")
+    add(f"    pdie {pdie:.4f}\n")
+    add(f"    sdie {sdie:.4f}\n")
+    add(f"    srfm {srfm}\n")
+    add(f"    chgm {chgm}\n")
+    add(f"    sdens {sdens:.2f}\n")
+    add(f"    srad {srad:.2f}\n")
+    add(f"    swin {swin:.2f}\n")
+    add(f"    temp {temp:.2f}\n")
+    add(f"    calcenergy {calcenergy}\n")
+    add(f"    calcforce {calcforce}\n")
+    add("", "%s", "write")
+    add("end\n")
+    return "".join(parts), tuple(fields)
+
 
 class Elec:
     """Holds the data and creates ASCII representation of APBS input file"""
@@ -26,10 +112,12 @@ class Elec:
         self,
         pqrpath: str,
         method: str = str(ApbsCalcType.MG_AUTO),
-        size: Psize = Psize(),
+        size: Psize = None,
         asyncflag: bool = False,
         istrng: float = 0.0,
         potdx: bool = False,
+        mol: int = 1,
+        center=None,
     ):
         """Initialize object.
 
@@ -37,7 +125,8 @@ class Elec:
 
         :param pqrpath:  path to PQR file
         :type pqrpath:  str
-        :param size:  parameter sizing object
+        :param size:  parameter sizing object (a new, unsized one if
+            ``None``)
         :type size:  Psize
         :param method:  solution method (e.g., mg-para, mg-auto, etc.)
         :type method:  str
@@ -48,12 +137,22 @@ class Elec:
         :type istring:  float
         :param potdx:  whether to write out potential information in DX format
         :type potdx:  bool
+        :param mol:  ID of the molecule to calculate, in the order of the
+            READ statement
+        :type mol:  int
+        :param center:  center of the grids, as the ID of the molecule to
+            center on or as coordinates (the calculated molecule if
+            ``None``); use the same center for every molecule to get
+            identical grids
+        :type center:  int or [float, float, float]
         """
 
         if method not in ApbsCalcType.values():
             raise ValueError(
                 f"Method, '{method}', must be one of {ApbsCalcType.values()}."
             )
+        if size is None:
+            size = Psize()
 
         # If this is an async or parallel calc, we want to use
         # the per-grid dime rather than the global dime.
@@ -72,10 +171,16 @@ class Elec:
         self.ofrac = PARTITION_OVERLAP
         self.async_ = 0
         self.asyncflag = asyncflag
-        self.cgcent = "mol 1"
-        self.fgcent = "mol 1"
-        self.gcent = "mol 1"
-        self.mol = 1
+        if center is None:
+            center = mol
+        if isinstance(center, int):
+            center = f"mol {center}"
+        else:
+            center = " ".join(f"{coord:.4f}" for coord in center)
+        self.cgcent = center
+        self.fgcent = center
+        self.gcent = center
+        self.mol = mol
         self.lpbe = True
         self.npbe = False
         self.bcfl = "sdh"
@@ -104,51 +209,41 @@ class Elec:
     def __str__(self):
         # TODO: Should Elec be allowed to print dimensions and lengths of 0?
         #       Right now, code succeeds, but with 0-dimensions implies no data
-        text = f"elec {self.label}\n"
-        text += f"    {self.method}\n"
-        text += f"    dime {int(self.dime[0])} {int(self.dime[1])} "
-        text += f"{int(self.dime[2])}\n"
-        if self.method == str(ApbsCalcType.MG_AUTO):
-            text += f"    cglen {self.cglen[0]:.4f} {self.cglen[1]:.4f} "
-            text += f"{self.cglen[2]:.4f}\n"
-            text += f"    fglen {self.fglen[0]:.4f} {self.fglen[1]:.4f} "
-            text += f"{self.fglen[2]:.4f}\n"
-            text += f"    cgcent {self.cgcent}\n"
-            text += f"    fgcent {self.fgcent}\n"
-        elif self.method == str(ApbsCalcType.MG_MANUAL):
-            text += f"    glen {self.glen[0]:.3f} {self.glen[1]:.3f} "
-            text += f"{self.glen[2]:.3f}\n"
-            text += f"    gcent {self.gcent}\n"
-        elif self.method == str(ApbsCalcType.MG_PARA):
-            text += f"    pdime {int(self.pdime[0])} {int(self.pdime[1])} "
-            text += f"{int(self.pdime[2])}\n"
-            text += f"    ofrac {self.ofrac:.1f}\n"
-            text += f"    cglen {self.cglen[0]:.4f} {self.cglen[1]:.4f} "
-            text += f"{self.cglen[2]:.4f}\n"
-            text += f"    fglen {self.fglen[0]:.4f} {self.fglen[1]:.4f} "
-            text += f"{self.fglen[2]:.4f}\n"
-            text += f"    cgcent {self.cgcent}\n"
-            text += f"    fgcent {self.fgcent}\n"
-            if self.asyncflag:
-                text += f"    async {self.async_}\n"
-        text += f"    mol {int(self.mol)}\n"
-        text += "    lpbe\n" if self.lpbe else "    npbe\n"
-        text += f"    bcfl {self.bcfl}\n"
-        if self.istrng > 0:
-            for ion in self.ion:
-                text += f"    ion charge {ion[0]:.2f} conc {self.istrng:.3f} "
-                text += f"radius {ion[1]:.4f}\n"
-        text += f"    pdie {self.pdie:.4f}\n"
-        text += f"    sdie {self.sdie:.4f}\n"
-        text += f"    srfm {self.srfm}\n"
-        text += f"    chgm {self.chgm}\n"
-        text += f"    sdens {self.sdens:.2f}\n"
-        text += f"    srad {self.srad:.2f}\n"
-        text += f"    swin {self.swin:.2f}\n"
-        text += f"    temp {self.temp:.2f}\n"
-        text += f"    calcenergy {self.calcenergy}\n"
-        text += f"    calcforce {self.calcforce}\n"
-        for write in self.write:
-            text += f"    write {write[0]} {write[1]} {write[2]}\n"
-        text += "end\n"
-        return text
+        # Formatting the static parts once per distinct setup and filling in
+        # the rest is several times faster when rendering many inputs.
+        template, fields = _compile_template(
+            self.method,
+            tuple(self.pdime),
+            self.ofrac,
+            self.asyncflag,
+            self.async_,
+            self.mol,
+            self.lpbe,
+            self.bcfl,
+            tuple(map(tuple, self.ion)) if self.istrng > 0 else (),
+            self.pdie,
+            self.sdie,
+            self.srfm,
+            self.chgm,
+            self.sdens,
+            self.srad,
+            self.swin,
+            self.temp,
+            self.calcenergy,
+            self.calcforce,
+        )
+        values = []
+        for field in fields:
+            value = getattr(self, field)
+            if field in _VECTOR_FIELDS:
+                values += (value[0], value[1], value[2])
+            elif field == "write":
+                values.append(
+                    "".join(
+                        f"    write {write[0]} {write[1]} {write[2]}\n"
+                        for write in value
+                    )
+                )
+            else:
+                values.append(value)
+        return template % tuple(values)
@@ -3,7 +3,12 @@
 .. codeauthor::  Todd Dolinsky
 .. codeauthor::  Nathan Baker
 """
+import csv
+import itertools
+import json
 import logging
+import os
+import struct
 import sys
 from argparse import (
     ArgumentDefaultsHelpFormatter,
@@ -11,15 +16,20 @@ from argparse import (
     ArgumentParser,
     Namespace,
 )
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
 from pdb2pqr.process_cli import check_file
+from .cost_model import CostModel
+from .io import read_pqr_arrays
 from .psize import Psize
 from .config import (
     ApbsCalcType,
+    BoundaryCondition,
     FilePermission,
     LogLevels,
+    ProcGridObjective,
     COARSE_GRID_FACTOR,
     FINE_GRID_ADD,
     GRID_SPACING,
@@ -27,12 +37,27 @@ from .config import (
     MEMORY_CEILING_MB,
     PARTITION_OVERLAP,
     FOCUS_FACTOR,
+    SOLUTE_DIELECTRIC,
+    SOLVENT_DIELECTRIC,
     TITLE_STR,
 )
 from .elec import Elec
 
 _LOGGER = logging.getLogger(__name__)
 
+#: Leading bytes of a bundle of async input files
+INPUT_BUNDLE_MAGIC = b"PDB2PQR-INPUT-BUNDLE-1\n"
+
+#: Parameters that a sweep can vary, in the order of the manifest columns,
+#: with their default values
+SWEEP_PARAMETERS = {
+    "space": GRID_SPACING,
+    "istrng": 0.0,
+    "pdie": SOLUTE_DIELECTRIC,
+    "sdie": SOLVENT_DIELECTRIC,
+    "bcfl": str(BoundaryCondition.SDH),
+}
+
 
 class Input:
     """Each object of this class is one APBS input file."""
@@ -72,28 +97,30 @@ class Input:
         self.asyncflag = asyncflag
         # Initialize variables to default elec values
         elec1 = Elec(pqr_stem, method, size, asyncflag, istrng, potdx)
+        self.elecs: List[Elec] = [elec1]
         if not potdx:
             elec2 = Elec(pqr_stem, method, size, asyncflag, istrng, potdx)
             setattr(elec2, "sdie", 2.0)
             setattr(elec2, "write", [])
-        else:
-            elec2 = ""
-        self.elecs: List[Elec] = [elec1, elec2]
-        if not potdx:
+            self.elecs.append(elec2)
             self.prints = ["print elecEnergy 2 - 1 end"]
         else:
             self.prints = ["print elecEnergy 1 end"]
 
+    @property
+    def pqrnames(self) -> List[str]:
+        """Names of the PQR files read, in molecule ID order."""
+        return [self.pqrname]
+
     def __str__(self):
-        text = "read\n"
-        text += f"    mol pqr {self.pqrname}\n"
-        text += "end\n"
-        for elec in self.elecs:
-            text += str(elec)
-        for prints in self.prints:
-            text += prints
-        text += "\nquit\n"
-        return text
+        return (
+            "read\n"
+            + "".join([f"    mol pqr {name}\n" for name in self.pqrnames])
+            + "end\n"
+            + "".join([str(elec) for elec in self.elecs])
+            + "".join(self.prints)
+            + "\nquit\n"
+        )
 
     def print_input_files(self, output_path) -> List[str]:
         """Generate the input file(s) associated with this object.
@@ -128,49 +155,388 @@ class Input:
         return file_list
 
 
-def split_input(filename: Path, stem: str = None) -> List[str]:
-    """Split the parallel input file into multiple async file names.
+class ComplexInput(Input):
+    """APBS input for a complex and its components on identical grids.
 
-    :param filename:  the path to the original parallel input file
-    :type filename:  str
-    :param stem:  an optional file prefix for name
-    :type stem:  str
+    The complex is molecule 1 and the components follow in order.  Every
+    ELEC statement uses the grid sized for the complex and centered on it,
+    so the energies (and potential maps) can be subtracted directly, as in
+    binding energy calculations.
+    """
 
-    :return: List of file paths which were generated
-    :rtype: List[str]
+    def __init__(
+        self,
+        pqrpath,
+        component_paths: List[str],
+        size: Psize,
+        method: str = str(ApbsCalcType.MG_AUTO),
+        asyncflag: bool = False,
+        istrng: float = 0,
+        potdx: bool = False,
+    ):
+        """Initialize the input file class.
+
+        :param pqrpath:  path to PQR file of the complex
+        :type pqrpath:  str
+        :param component_paths:  paths to PQR files of the components
+            (e.g., receptor and ligand)
+        :type component_paths:  [str]
+        :param size:  parameter sizing object for the complex
+        :type size:  Psize
+        :param method:  solution method (e.g., mg-para, mg-auto, etc.)
+        :type method:  str
+        :param asyncflag:  perform an asynchronous parallel focusing
+            calculation
+        :type asyncflag:  bool
+        :param istrng:  ionic strength/concentration (M)
+        :type istring:  float
+        :param potdx:  whether to write out potential information in DX
+            format, to a map named after each PQR file
+        :type potdx:  bool
+        """
+        self.pqrpath = Path(pqrpath)
+        self.pqrname = self.pqrpath.name
+        self.pqrpaths = [self.pqrpath]
+        self.pqrpaths += [Path(path) for path in component_paths]
+        self.asyncflag = asyncflag
+        names = [path.stem for path in self.pqrpaths]
+        if len(set(names)) < len(names):
+            names = [f"mol{mol}" for mol in range(1, len(names) + 1)]
+        self.elecs: List[Elec] = []
+        for mol, (path, name) in enumerate(zip(self.pqrpaths, names), 1):
+            elec = Elec(
+                path.stem, method, size, asyncflag, istrng, potdx, mol, 1
+            )
+            elec.label = f"name {name}"
+            if not potdx:
+                # The default map name would be overwritten by each ELEC
+                elec.write = []
+            self.elecs.append(elec)
+        self.prints = [f"print elecEnergy {' - '.join(names)} end"]
+
+    @property
+    def pqrnames(self) -> List[str]:
+        """Names of the PQR files read, in molecule ID order."""
+        return [path.name for path in self.pqrpaths]
+
+
+def _split_template(text: str, filename) -> Tuple[List[bytes], int]:
+    """Find where a parallel input file needs ``async`` statements.
+
+    :param text:  contents of the parallel input file
+    :type text:  str
+    :param filename:  path of the parallel input file, for errors
+    :type filename:  str
+    :return:  the encoded text around each ``mg-para`` line (ending with
+        that line, except for the last piece) and the number of processors
+    :rtype:  (List[bytes], int)
+    :raises RuntimeError:  if the file has no processor grid
     """
     nproc = 0
-    file_list = []
-    with open(filename, "rt", encoding="utf-8") as file_:
-        text = ""
-        while True:
-            line = file_.readline()
-            if not line:
-                break
-            text += line
-            line = line.strip()
-            if line.startswith("pdime"):  # Get # Procs
-                words = line.split()
-                nproc = int(words[1]) * int(words[2]) * int(words[3])
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("pdime"):  # Get # Procs
+            words = line.split()
+            nproc = int(words[1]) * int(words[2]) * int(words[3])
     if nproc == 0:
         errstr = f"{filename} is not a valid APBS parallel input file!\n"
         errstr = errstr + (
             "The inputgen script was unable to asynchronize this file!"
         )
         raise RuntimeError(errstr)
+    pieces = text.split("mg-para\n")
+    pieces = [piece + "mg-para\n" for piece in pieces[:-1]] + pieces[-1:]
+    return [piece.encode("utf-8") for piece in pieces], nproc
+
+
+def _async_input(pieces: List[bytes], iproc: int) -> bytes:
+    """Assemble the input file of one processor.
+
+    :param pieces:  text around each ``mg-para`` line from
+        :func:`_split_template`
+    :type pieces:  List[bytes]
+    :param iproc:  processor index
+    :type iproc:  int
+    :return:  encoded input file
+    :rtype:  bytes
+    """
+    return f"    async {iproc}\n".encode("utf-8").join(pieces)
 
-    for iproc in range(nproc):
-        if stem is None:
-            stem = filename.stem
-        outname = filename.parent / f"{stem}-PE{iproc}.in"
-        outtext = text.replace("mg-para\n", f"mg-para\n    async {iproc}\n")
-        with open(outname, "w", encoding="utf-8") as outfile:
-            outfile.write(outtext)
-        file_list.append(outname)
 
+def split_input(
+    filename: Path, stem: str = None, jobs: int = 1, bundle: bool = False
+) -> List[str]:
+    """Split the parallel input file into multiple async file names.
+
+    The parallel input file is read once and each processor's file is
+    assembled from the shared text around its ``mg-para`` lines.
+
+    :param filename:  the path to the original parallel input file
+    :type filename:  str
+    :param stem:  an optional file prefix for name
+    :type stem:  str
+    :param jobs:  number of threads writing files
+    :type jobs:  int
+    :param bundle:  write a single indexed bundle (see :func:`read_bundle`)
+        named ``<stem>-PE.bundle`` instead of one file per processor
+    :type bundle:  bool
+
+    :return: List of file paths which were generated
+    :rtype: List[str]
+    """
+    filename = Path(filename)
+    with open(filename, "rt", encoding="utf-8") as file_:
+        text = file_.read()
+    pieces, nproc = _split_template(text, filename)
+    if stem is None:
+        stem = filename.stem
+    if bundle:
+        bundle_path = filename.parent / f"{stem}-PE.bundle"
+        _write_bundle(bundle_path, pieces, nproc, stem)
+        return [bundle_path]
+
+    file_list = [
+        filename.parent / f"{stem}-PE{iproc}.in" for iproc in range(nproc)
+    ]
+
+    def write_input(iproc: int):
+        with open(file_list[iproc], "wb") as outfile:
+            outfile.write(_async_input(pieces, iproc))
+
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(write_input, range(nproc)))
+    else:
+        for iproc in range(nproc):
+            write_input(iproc)
     return file_list
 
 
+def _write_bundle(bundle_path: Path, pieces: List[bytes], nproc: int, stem):
+    """Write the input files of all processors to one indexed file.
+
+    The file holds :const:`INPUT_BUNDLE_MAGIC`, the size of a JSON index as
+    a little-endian 32-bit integer, the index (a list of ``[name, offset,
+    length]`` entries, with byte offsets from the end of the index) and the
+    concatenated input files.
+
+    :param bundle_path:  path of bundle to write
+    :type bundle_path:  Path
+    :param pieces:  text around each ``mg-para`` line from
+        :func:`_split_template`
+    :type pieces:  List[bytes]
+    :param nproc:  number of processors
+    :type nproc:  int
+    :param stem:  prefix of the input file names
+    :type stem:  str
+    """
+    inputs = [_async_input(pieces, iproc) for iproc in range(nproc)]
+    index = []
+    offset = 0
+    for iproc, data in enumerate(inputs):
+        index.append([f"{stem}-PE{iproc}.in", offset, len(data)])
+        offset += len(data)
+    index_bytes = json.dumps(index).encode("utf-8")
+    with open(bundle_path, "wb") as bundle_file:
+        bundle_file.write(INPUT_BUNDLE_MAGIC)
+        bundle_file.write(struct.pack("<I", len(index_bytes)))
+        bundle_file.write(index_bytes)
+        bundle_file.writelines(inputs)
+
+
+def read_bundle(bundle_path: Path, names: List[str] = None) -> Dict[str, str]:
+    """Read input files from a bundle written by :func:`split_input`.
+
+    :param bundle_path:  path of bundle
+    :type bundle_path:  Path
+    :param names:  names of the input files to read (all if ``None``)
+    :type names:  List[str]
+    :return:  contents of each input file by name, in bundle order
+    :rtype:  Dict[str, str]
+    :raises ValueError:  if the file is not a bundle or lacks a name
+    """
+    with open(bundle_path, "rb") as bundle_file:
+        if bundle_file.read(len(INPUT_BUNDLE_MAGIC)) != INPUT_BUNDLE_MAGIC:
+            raise ValueError(f"{bundle_path} is not an input bundle.")
+        (index_size,) = struct.unpack("<I", bundle_file.read(4))
+        index = json.loads(bundle_file.read(index_size).decode("utf-8"))
+        start = bundle_file.tell()
+        if names is not None:
+            wanted = set(names)
+            index = [entry for entry in index if entry[0] in wanted]
+            missing = wanted - {entry[0] for entry in index}
+            if missing:
+                raise ValueError(
+                    f"{bundle_path} has no {', '.join(sorted(missing))}."
+                )
+        inputs = {}
+        for name, offset, length in index:
+            bundle_file.seek(start + offset)
+            inputs[name] = bundle_file.read(length).decode("utf-8")
+    return inputs
+
+
+def write_sweep(
+    pqrpath,
+    sweep: Dict[str, list],
+    method: str = str(ApbsCalcType.MG_AUTO),
+    asyncflag: bool = False,
+    potdx: bool = False,
+    output_dir=None,
+    **kwargs,
+) -> Path:
+    """Write input files for every combination of parameter values.
+
+    The PQR file is read once and sized once per grid spacing; every other
+    combination only changes the ELEC statements.  The inputs are numbered
+    ``<stem>-<n>.in`` and listed with their parameters in the manifest
+    ``<stem>-sweep.csv``.  With ``asyncflag``, each listed input is the
+    parallel input and its ``-PE<n>.in`` files are written next to it.  The
+    reference ELEC statement of each input (without ``potdx``) uses the
+    swept solute dielectric as its solvent dielectric.
+
+    :param pqrpath:  path to PQR file
+    :type pqrpath:  str
+    :param sweep:  values of each of the :data:`SWEEP_PARAMETERS`; missing
+        parameters keep their default values
+    :type sweep:  Dict[str, list]
+    :param method:  solution method (e.g., mg-para, mg-auto, etc.)
+    :type method:  str
+    :param asyncflag:  perform an asynchronous parallel focusing
+        calculation
+    :type asyncflag:  bool
+    :param potdx:  whether to write out potential information in DX format;
+        each input writes a map named after itself
+    :type potdx:  bool
+    :param output_dir:  directory for the inputs and manifest (the PQR
+        file directory if ``None``); the inputs read the PQR file by its
+        path relative to this directory
+    :type output_dir:  str
+    :param kwargs:  keyword arguments for :class:`Psize` other than
+        ``space``
+    :return:  path of the manifest
+    :rtype:  Path
+    :raises ValueError:  for unknown parameters
+    """
+    unknown = set(sweep) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(
+            f"Cannot sweep {', '.join(sorted(unknown))}; choose from "
+            f"{', '.join(SWEEP_PARAMETERS)}."
+        )
+    pqrpath = Path(pqrpath)
+    if output_dir is None:
+        output_dir = pqrpath.parent
+    output_dir = Path(output_dir).resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    values = [
+        list(sweep.get(name, [default]))
+        for name, default in SWEEP_PARAMETERS.items()
+    ]
+    num_inputs = 1
+    for value_list in values:
+        num_inputs *= len(value_list)
+    width = len(str(num_inputs - 1))
+    with open(pqrpath, "rb") as pqr_file:
+        columns = read_pqr_arrays(pqr_file)
+    # The inputs are run from their own directory
+    pqrname = Path(os.path.relpath(pqrpath.resolve(), output_dir)).as_posix()
+
+    manifest_path = output_dir / f"{pqrpath.stem}-sweep.csv"
+    with open(
+        manifest_path, "wt", encoding="utf-8", newline=""
+    ) as manifest_file:
+        writer = csv.writer(manifest_file)
+        writer.writerow(["input"] + list(SWEEP_PARAMETERS))
+        index = 0
+        for space in values[0]:
+            size = Psize(space=space, **kwargs)
+            size.run_arrays(columns)
+            input_ = Input(pqrpath, size, method, asyncflag, 0.0, potdx)
+            input_.pqrname = pqrname
+            elecs = input_.elecs
+            for istrng, pdie, sdie, bcfl in itertools.product(*values[1:]):
+                input_path = (
+                    output_dir / f"{pqrpath.stem}-{index:0{width}d}.in"
+                )
+                for elec in elecs:
+                    elec.istrng = istrng
+                    elec.pdie = pdie
+                    elec.sdie = pdie
+                    elec.bcfl = bcfl
+                elecs[0].sdie = sdie
+                if potdx:
+                    elecs[0].write = [["pot", "dx", input_path.stem]]
+                if asyncflag:
+                    input_path = Path(input_.print_input_files(input_path)[0])
+                else:
+                    with open(
+                        input_path, "wt", encoding="utf-8"
+                    ) as input_file:
+                        input_file.write(str(input_))
+                writer.writerow(
+                    [input_path.name, space, istrng, pdie, sdie, bcfl]
+                )
+                index += 1
+    _LOGGER.info("Wrote %d inputs listed in %s.", num_inputs, manifest_path)
+    return manifest_path
+
+
+def generate_inputs(
+    atoms,
+    pqrpath=None,
+    method: str = str(ApbsCalcType.MG_AUTO),
+    asyncflag: bool = False,
+    istrng: float = 0.0,
+    potdx: bool = False,
+    **kwargs,
+) -> List[str]:
+    """Generate the text of APBS input files without writing any files.
+
+    This is the library entry point for callers that size many molecules
+    in one process: atom arrays already in memory are sized directly and
+    nothing is checked, logged or written.
+
+    :param atoms:  atom arrays as accepted by :meth:`Psize.run_arrays`, or
+        the path of a PQR file to read them from
+    :type atoms:  Dict[str, numpy.ndarray] or str
+    :param pqrpath:  path of the PQR file the inputs read (``atoms`` if it
+        is a path, otherwise ``mol.pqr``)
+    :type pqrpath:  str
+    :param method:  solution method (e.g., mg-para, mg-auto, etc.)
+    :type method:  str
+    :param asyncflag:  generate the input of each processor of an
+        asynchronous parallel focusing calculation
+    :type asyncflag:  bool
+    :param istrng:  ionic strength/concentration (M)
+    :type istrng:  float
+    :param potdx:  whether to write out potential information in DX format
+    :type potdx:  bool
+    :param kwargs:  keyword arguments for :class:`Psize`
+    :return:  the input file, or with ``asyncflag`` the input file of each
+        processor in order
+    :rtype:  List[str]
+    :raises RuntimeError:  if ``asyncflag`` is given for a method without a
+        processor grid
+    """
+    if isinstance(atoms, (str, Path)):
+        if pqrpath is None:
+            pqrpath = atoms
+        with open(atoms, "rb") as pqr_file:
+            atoms = read_pqr_arrays(pqr_file)
+    if pqrpath is None:
+        pqrpath = "mol.pqr"
+    size = Psize(**kwargs)
+    size.run_arrays(atoms)
+    input_ = Input(pqrpath, size, method, False, istrng, potdx)
+    if not asyncflag:
+        return [str(input_)]
+    pieces, nproc = _split_template(str(input_), pqrpath)
+    return [
+        _async_input(pieces, iproc).decode("utf-8") for iproc in range(nproc)
+    ]
+
+
 def get_cli_args(args_str: str = None) -> Namespace:
     """Define and parse command line arguments via argparse.
 
@@ -205,6 +571,20 @@ def get_cli_args(args_str: str = None) -> Namespace:
             "async input files."
         ),
     )
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help=(
+            "with --split, write the async input files to one indexed "
+            "bundle instead of one file per processor."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of threads writing async input files with --split.",
+    )
     parser.add_argument(
         "--potdx",
         action="store_true",
@@ -281,6 +661,74 @@ def get_cli_args(args_str: str = None) -> Namespace:
         default=0.0,
         help="Ionic strength (M); Na+ and Cl- ions will be used",
     )
+    parser.add_argument(
+        "--cost-model",
+        default=None,
+        help=(
+            "CSV file of past APBS runs to calibrate a model that predicts "
+            "memory and run time (see pdb2pqr.cost_model); with mg-para, "
+            "the processor grid with the shortest predicted run time is used"
+        ),
+    )
+    parser.add_argument(
+        "--max-procs",
+        type=int,
+        default=None,
+        help="maximum total processors for mg-para with --cost-model",
+    )
+    parser.add_argument(
+        "--components",
+        nargs="+",
+        default=None,
+        help=(
+            "PQR files of the components of the complex in filename (e.g., "
+            "receptor and ligand) to calculate on the grid of the complex "
+            "in one input"
+        ),
+    )
+    parser.add_argument(
+        "--sweep-space",
+        type=float,
+        nargs="+",
+        default=None,
+        help="sweep over these fine mesh resolutions",
+    )
+    parser.add_argument(
+        "--sweep-istrng",
+        type=float,
+        nargs="+",
+        default=None,
+        help="sweep over these ionic strengths (M)",
+    )
+    parser.add_argument(
+        "--sweep-pdie",
+        type=float,
+        nargs="+",
+        default=None,
+        help="sweep over these solute dielectric constants",
+    )
+    parser.add_argument(
+        "--sweep-sdie",
+        type=float,
+        nargs="+",
+        default=None,
+        help="sweep over these solvent dielectric constants",
+    )
+    parser.add_argument(
+        "--sweep-bcfl",
+        nargs="+",
+        default=None,
+        choices=BoundaryCondition.values(),
+        help="sweep over these boundary conditions",
+    )
+    parser.add_argument(
+        "--sweep-dir",
+        default=None,
+        help=(
+            "directory for the sweep inputs and their manifest; the PQR "
+            "file directory if omitted"
+        ),
+    )
     parser.add_argument("filename")
 
     args = None
@@ -301,24 +749,79 @@ def main():
     check_file(args.filename)
 
     filename = Path(args.filename)
+    sweep = {
+        name: getattr(args, f"sweep_{name}")
+        for name in SWEEP_PARAMETERS
+        if getattr(args, f"sweep_{name}") is not None
+    }
+    size_kwargs = {
+        name: getattr(args, name)
+        for name in ["cfac", "fadd", "gmemfac", "gmemceil", "ofrac", "redfac"]
+    }
     if args.split:
-        split_input(filename)
+        split_input(filename, jobs=args.jobs, bundle=args.bundle)
+    elif sweep:
+        sweep.setdefault("space", [args.space])
+        sweep.setdefault("istrng", [args.istrng])
+        write_sweep(
+            filename,
+            sweep,
+            method=args.method,
+            asyncflag=args.asynch,
+            potdx=args.potdx,
+            output_dir=args.sweep_dir,
+            **size_kwargs,
+        )
     else:
         output_path = filename.parent / Path(f"{filename.stem}.in")
 
         check_file(
             output_path, permission=FilePermission.WRITE, overwrite=False
         )
-        psize = Psize()
+        cost_model = None
+        if args.cost_model is not None:
+            check_file(args.cost_model)
+            cost_model = CostModel.from_csv(args.cost_model)
+        psize = Psize(space=args.space, cost_model=cost_model, **size_kwargs)
         psize.run_psize(args.filename)
-        input_ = Input(
-            args.filename,
-            psize,
-            args.method,
-            args.asynch,
-            args.istrng,
-            args.potdx,
-        )
+        if cost_model is not None:
+            if args.method == str(ApbsCalcType.MG_PARA):
+                try:
+                    psize.search_proc_grid(
+                        max_procs=args.max_procs,
+                        objective=str(ProcGridObjective.TIME),
+                        top=1,
+                    )
+                except ValueError as err:
+                    _LOGGER.error("Unable to find a processor grid: %s", err)
+                    sys.exit(1)
+            cost = psize.predict_cost()
+            _LOGGER.info(
+                "Predicted %.3f MB per processor and %.1f s run time.",
+                cost["memory"],
+                cost["time"],
+            )
+        if args.components is not None:
+            for component in args.components:
+                check_file(component)
+            input_ = ComplexInput(
+                args.filename,
+                args.components,
+                psize,
+                args.method,
+                args.asynch,
+                args.istrng,
+                args.potdx,
+            )
+        else:
+            input_ = Input(
+                args.filename,
+                psize,
+                args.method,
+                args.asynch,
+                args.istrng,
+                args.potdx,
+            )
         input_.print_input_files(output_path)
 
 
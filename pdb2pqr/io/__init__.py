@@ -4,9 +4,27 @@ from pathlib import Path
 from typing import List, Tuple
 
 from .factory import input_factory
-from .reader_pqr import read_pqr  # noqa: F401
+from .reader_pqr import read_pqr, read_pqr_arrays  # noqa: F401
 from .reader_qcd import read_qcd  # noqa: F401
-from .dx import read_dx, write_cube  # noqa: F401
+from .dx import (  # noqa: F401
+    check_grid_compatibility,
+    convert_dx_to_cube,
+    downsample_dx,
+    dx_cache_path,
+    dx_statistics,
+    interpolate_dx,
+    merge_dx,
+    open_dx,
+    read_dx,
+    read_dx_cache,
+    read_dx_header,
+    read_dx_region,
+    reduce_dx,
+    resample_dx,
+    write_cube,
+    write_dx,
+    write_dx_cache,
+)
 
 
 def read_input(inputfile_path: str) -> Tuple[List[str], List[str]]:
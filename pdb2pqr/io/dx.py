@@ -1,34 +1,94 @@
 """Read and write functions to support dx2cube.py"""
 
+import gzip
+import io
+import json
+import logging
+import os
+import struct
+import sys
+from functools import lru_cache
 from io import FileIO
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 
-def read_dx(dx_file: FileIO):
-    """Read DX-format volumetric information.
+from ..config import (
+    CUBE_BLOCK_LINES,
+    DX_CACHE_SUFFIX,
+    DX_CHUNK_SIZE,
+    DX_GZIP_LEVEL,
+    GRID_SAMPLE_CHUNK,
+    GridInterpolation,
+    GridMergePolicy,
+    GridOperation,
+    GridOutOfBounds,
+)
 
-    The OpenDX file format is defined at
-    <https://www.idvbook.com/wp-content/uploads/2010/12/opendx.pdf`.
+_LOGGER = logging.getLogger(__name__)
 
-    .. note:: This function is not a general-format OpenDX file parser and
-       makes many assumptions about the input data type, grid structure, etc.
+#: Leading bytes of a binary DX grid cache file
+DX_CACHE_MAGIC = b"PDB2PQR-GRID-1\n"
+#: Byte alignment of the values in a binary DX grid cache file
+DX_CACHE_ALIGN = 64
+#: Number of values on each line of Cube data
+CUBE_VALUES_PER_LINE = 6
 
-    .. todo:: This function should be moved into the APBS code base.
+#: Number of values on each line of DX data
+DX_VALUES_PER_LINE = 3
 
-    :param dx_file:  file object for DX file, ready for reading as text
+_CUBE_VALUE_FORMAT = "% -13.5E"
+_DX_VALUE_FORMAT = "%12.6e"
+
+#: Leading bytes of a gzip-compressed file
+GZIP_MAGIC = b"\x1f\x8b"
+#: Byte order keywords of binary DX data
+_DX_BYTE_ORDERS = {"msb": ">", "lsb": "<"}
+#: Array types of binary DX data
+_DX_BINARY_TYPES = {"float": "f4", "double": "f8"}
+
+#: Keywords of the lines that follow the DX data section
+_DX_TRAILER_WORDS = ("attribute", "object", "component")
+
+
+def _read_dx_header(
+    dx_file: FileIO,
+) -> Tuple[dict, str, Optional[Tuple[np.dtype, int]]]:
+    """Read the header lines of a DX file.
+
+    Reading stops at the first line of grid data, which is returned so that
+    the caller can continue parsing the data section.  If the data are
+    binary, reading stops just after the ``data follows`` line instead and
+    the type and number of the binary values are returned.
+
+    :param dx_file:  file object for DX file, ready for reading as text or
+        bytes
     :type dx_file:  file
-    :returns:  dictionary with data from DX file
-    :rtype:  dict
+    :returns:  dictionary with header data from DX file (with ``values`` set
+        to ``None``), the first line of grid data as read from the file
+        (empty if the file has no data or the data are binary) and the
+        binary data type and number of values (``None`` for text data)
+    :rtype:  (dict, str, (numpy.dtype, int))
     :raises ValueError:  on parsing error
     """
     dx_dict = {
         "grid spacing": [],
-        "values": [],
+        "values": None,
         "number of grid points": None,
         "lower left corner": None,
     }
-    for line in dx_file:
-        words = [w.strip() for w in line.split()]
-        if words[0] in ["#", "attribute", "component"]:
+    while True:
+        line = dx_file.readline()
+        if not line:
+            return dx_dict, line, None
+        if isinstance(line, bytes):
+            words = line.decode("utf-8").split()
+        else:
+            words = line.split()
+        if not words:
+            continue
+        if words[0].startswith("#") or words[0] in ["attribute", "component"]:
             pass
         elif words[0] == "object":
             if words[1] == "1":
@@ -37,6 +97,14 @@ def read_dx(dx_file: FileIO):
                     int(words[6]),
                     int(words[7]),
                 )
+            binary = _binary_data_type(words)
+            if binary is not None:
+                if not isinstance(line, bytes):
+                    raise ValueError(
+                        "DX file with binary data must be opened in binary "
+                        "mode."
+                    )
+                return dx_dict, line[:0], binary
         elif words[0] == "origin":
             dx_dict["lower left corner"] = [
                 float(words[1]),
@@ -47,11 +115,575 @@ def read_dx(dx_file: FileIO):
             spacing = [float(words[1]), float(words[2]), float(words[3])]
             dx_dict["grid spacing"].append(spacing)
         else:
-            for word in words:
-                dx_dict["values"].append(float(word))
+            return dx_dict, line, None
+
+
+def _binary_data_type(words: List[str]) -> Optional[Tuple[np.dtype, int]]:
+    """Get the type of binary data described by a DX ``object`` line.
+
+    :param words:  words of the ``object`` line
+    :type words:  [str]
+    :returns:  type and number of the binary values that follow the line, or
+        ``None`` if the line does not introduce binary data
+    :rtype:  (numpy.dtype, int)
+    :raises ValueError:  if the binary data type is not supported
+    """
+    if words[-2:] != ["data", "follows"]:
+        return None
+    if "binary" not in words and "ieee" not in words:
+        return None
+    byte_order = "="
+    for word in words:
+        byte_order = _DX_BYTE_ORDERS.get(word, byte_order)
+    try:
+        array_type = words[words.index("type") + 1]
+        num_values = int(words[words.index("items") + 1])
+        value_type = _DX_BINARY_TYPES[array_type]
+    except (ValueError, IndexError, KeyError) as err:
+        raise ValueError(
+            f"Unsupported binary DX data: {' '.join(words)}"
+        ) from err
+    return np.dtype(byte_order + value_type), num_values
+
+
+def _find_dx_trailer(text: str) -> int:
+    """Find the first line after the data section in a block of DX text.
+
+    :param text:  block of text from the data section of a DX file
+    :type text:  str
+    :returns:  offset of the first trailing line, or -1 if there is none
+    :rtype:  int
+    """
+    if text.lstrip(" \t").startswith(_DX_TRAILER_WORDS):
+        return 0
+    offsets = [text.find(f"\n{word}") for word in _DX_TRAILER_WORDS]
+    offsets = [offset for offset in offsets if offset >= 0]
+    return min(offsets) if offsets else -1
+
+
+def _iter_dx_data(
+    dx_file: FileIO,
+    first_line: str,
+    dtype=np.float64,
+    chunk_size: int = DX_CHUNK_SIZE,
+    binary: Optional[Tuple[np.dtype, int]] = None,
+) -> Iterator[np.ndarray]:
+    """Iterate over the data section of a DX file in blocks of values.
+
+    Each block is roughly ``chunk_size`` characters of text converted in bulk
+    by NumPy; iteration stops at the trailing ``attribute``/``object``/
+    ``component`` lines that follow the data.  Binary data are read in
+    blocks of roughly ``chunk_size`` bytes instead.
+
+    :param dx_file:  file object for DX file, positioned after the header
+    :type dx_file:  file
+    :param first_line:  first line of grid data, as returned by
+        :func:`_read_dx_header`
+    :type first_line:  str
+    :param dtype:  floating point type for the values
+    :type dtype:  numpy.dtype
+    :param chunk_size:  approximate number of characters converted at a time
+    :type chunk_size:  int
+    :param binary:  binary data type and number of values, as returned by
+        :func:`_read_dx_header`, or ``None`` for text data
+    :type binary:  (numpy.dtype, int)
+    :returns:  iterator over one-dimensional arrays of grid values
+    :rtype:  Iterator[numpy.ndarray]
+    """
+    if binary is not None:
+        yield from _iter_dx_binary(dx_file, *binary, dtype, chunk_size)
+        return
+    pending = (
+        first_line.decode("utf-8")
+        if isinstance(first_line, bytes)
+        else first_line
+    )
+    while True:
+        block = dx_file.read(chunk_size)
+        if block:
+            # Finish the partial line so that no number is split in two
+            block += dx_file.readline()
+        if isinstance(block, bytes):
+            block = block.decode("utf-8")
+        text = pending + block
+        pending = ""
+        trailer = _find_dx_trailer(text)
+        if trailer >= 0:
+            text = text[:trailer]
+        if text and not text.isspace():
+            yield np.fromstring(text, dtype=dtype, sep=" ")
+        if trailer >= 0 or not block:
+            return
+
+
+def _iter_dx_binary(
+    dx_file: FileIO,
+    file_dtype: np.dtype,
+    num_values: int,
+    dtype=np.float64,
+    chunk_size: int = DX_CHUNK_SIZE,
+) -> Iterator[np.ndarray]:
+    """Iterate over binary DX data in blocks of values.
+
+    :param dx_file:  file object for DX file opened in binary mode,
+        positioned at the start of the data
+    :type dx_file:  file
+    :param file_dtype:  type of the values in the file
+    :type file_dtype:  numpy.dtype
+    :param num_values:  number of values in the file
+    :type num_values:  int
+    :param dtype:  floating point type for the values
+    :type dtype:  numpy.dtype
+    :param chunk_size:  approximate number of bytes read at a time
+    :type chunk_size:  int
+    :returns:  iterator over one-dimensional arrays of grid values
+    :rtype:  Iterator[numpy.ndarray]
+    :raises ValueError:  if the data end early
+    """
+    step = max(1, chunk_size // file_dtype.itemsize)
+    for start in range(0, num_values, step):
+        count = min(step, num_values - start)
+        block = dx_file.read(count * file_dtype.itemsize)
+        if len(block) != count * file_dtype.itemsize:
+            raise ValueError(
+                f"DX file has {start + len(block) // file_dtype.itemsize} "
+                f"binary grid values; expected {num_values}."
+            )
+        yield np.frombuffer(block, dtype=file_dtype).astype(dtype)
+
+
+def _parse_dx(dx_file: FileIO, dtype=np.float64) -> dict:
+    """Parse a DX file into a dictionary with an array of grid values.
+
+    :param dx_file:  file object for DX file, ready for reading as text
+    :type dx_file:  file
+    :param dtype:  floating point type for the grid values
+    :type dtype:  numpy.dtype
+    :returns:  dictionary with data from DX file
+    :rtype:  dict
+    :raises ValueError:  on parsing error
+    """
+    dx_dict, line, binary = _read_dx_header(dx_file)
+    num_points = dx_dict["number of grid points"]
+    if num_points is None:
+        raise ValueError("DX file is missing the gridpositions counts.")
+    values = np.empty(num_points, dtype=dtype)
+    flat_values = values.reshape(-1)
+    count = 0
+    for chunk in _iter_dx_data(
+        dx_file, line, dtype=dtype, chunk_size=DX_CHUNK_SIZE, binary=binary
+    ):
+        end = count + chunk.size
+        if end > flat_values.size:
+            raise ValueError(
+                f"DX file has more than {flat_values.size} grid values."
+            )
+        flat_values[count:end] = chunk
+        count = end
+    if count != flat_values.size:
+        raise ValueError(
+            f"DX file has {count} grid values; expected {flat_values.size}."
+        )
+    dx_dict["values"] = values
+    return dx_dict
+
+
+def read_dx(
+    dx_file: FileIO,
+    dtype=np.float64,
+    as_list: bool = False,
+    cache: bool = False,
+):
+    """Read DX-format volumetric information.
+
+    The OpenDX file format is defined at
+    <https://www.idvbook.com/wp-content/uploads/2010/12/opendx.pdf`.
+
+    The grid values are converted in bulk into an array preallocated from the
+    ``object 1`` gridpositions counts, with shape ``(nx, ny, nz)`` in the
+    row-major (z fastest) order of the file.
+
+    With ``cache`` enabled, the grid is also stored in a binary sidecar file
+    next to the DX file (see :func:`dx_cache_path`).  Later reads
+    memory-map that file instead of parsing the text, as long as the size
+    and modification time of the DX file are unchanged.
+
+    .. note:: This function is not a general-format OpenDX file parser and
+       makes many assumptions about the input data type, grid structure, etc.
+
+    .. todo:: This function should be moved into the APBS code base.
+
+    :param dx_file:  file object for DX file, ready for reading as text
+    :type dx_file:  file
+    :param dtype:  floating point type for the grid values (e.g.,
+        :class:`numpy.float64` or :class:`numpy.float32`)
+    :type dtype:  numpy.dtype
+    :param as_list:  return the grid values as a flat list of floats instead
+        of an array, for callers that need the old representation
+    :type as_list:  bool
+    :param cache:  read from (or create) the binary sidecar grid file
+    :type cache:  bool
+    :returns:  dictionary with data from DX file
+    :rtype:  dict
+    :raises ValueError:  on parsing error
+    """
+    dx_dict = None
+    dx_path = (
+        Path(dx_file.name) if cache and hasattr(dx_file, "name") else None
+    )
+    if cache and dx_path is None:
+        _LOGGER.warning("Cannot cache DX data read from an unnamed file.")
+    if dx_path is not None:
+        cache_path = dx_cache_path(dx_path)
+        try:
+            dx_dict = read_dx_cache(cache_path, source_path=dx_path)
+            if dx_dict["values"].dtype != np.dtype(dtype):
+                _LOGGER.debug("Ignoring %s with other dtype.", cache_path)
+                dx_dict = None
+        except FileNotFoundError:
+            pass
+        except ValueError as err:
+            _LOGGER.debug("Ignoring DX cache %s: %s", cache_path, err)
+    if dx_dict is None:
+        dx_dict = _parse_dx(dx_file, dtype=dtype)
+        if dx_path is not None:
+            try:
+                write_dx_cache(cache_path, dx_dict, source_path=dx_path)
+            except OSError as err:
+                _LOGGER.warning("Unable to write %s: %s", cache_path, err)
+    if as_list:
+        dx_dict["values"] = np.ravel(dx_dict["values"]).tolist()
     return dx_dict
 
 
+def read_dx_header(dx_file: FileIO) -> dict:
+    """Read only the header of a DX file.
+
+    Reading stops after the header lines, so the grid geometry of a large
+    file is available without parsing any of its data.
+
+    :param dx_file:  file object for DX file, ready for reading as text
+    :type dx_file:  file
+    :returns:  dictionary with data from DX file as produced by
+        :func:`read_dx`, with ``values`` set to ``None``
+    :rtype:  dict
+    :raises ValueError:  on parsing error
+    """
+    dx_dict, _, _ = _read_dx_header(dx_file)
+    if dx_dict["number of grid points"] is None:
+        raise ValueError("DX file is missing the gridpositions counts.")
+    return dx_dict
+
+
+def _grid_geometry(dx_dict: dict) -> Tuple[np.ndarray, np.ndarray, tuple]:
+    """Get the origin, spacing and size of an axis-aligned grid.
+
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx` or :func:`read_dx_header`
+    :type dx_dict:  dict
+    :returns:  lower left corner, grid spacing along each axis and number of
+        grid points along each axis
+    :rtype:  (numpy.ndarray, numpy.ndarray, (int, int, int))
+    :raises ValueError:  if the grid axes are not aligned with x, y and z
+    """
+    deltas = np.asarray(dx_dict["grid spacing"], dtype=np.float64)
+    spacing = np.diag(deltas).copy() if deltas.shape == (3, 3) else None
+    if spacing is None or np.any(deltas != np.diag(spacing)):
+        raise ValueError("Only axis-aligned DX grids are supported.")
+    origin = np.asarray(dx_dict["lower left corner"], dtype=np.float64)
+    return origin, spacing, tuple(dx_dict["number of grid points"])
+
+
+def _find_line_offsets(
+    raw_file, start: int, lines: List[int], block_size: int = DX_CHUNK_SIZE
+) -> List[int]:
+    """Find the byte offsets at which given lines of a file begin.
+
+    Only newlines are counted, which is much cheaper than converting the
+    numbers on the skipped lines.
+
+    :param raw_file:  file object opened for reading bytes
+    :type raw_file:  file
+    :param start:  byte offset of line 0
+    :type start:  int
+    :param lines:  increasing line numbers, counted from ``start``
+    :type lines:  [int]
+    :param block_size:  number of bytes scanned at a time
+    :type block_size:  int
+    :returns:  byte offset of the start of each requested line
+    :rtype:  [int]
+    :raises ValueError:  if the file has fewer lines than requested
+    """
+    offsets = []
+    targets = iter(lines)
+    target = next(targets, None)
+    line = 0
+    position = start
+    raw_file.seek(start)
+    while target is not None:
+        if target == line:
+            offsets.append(position)
+            target = next(targets, None)
+            continue
+        block = raw_file.read(block_size)
+        if not block:
+            if target == line + 1:
+                # Last line without a trailing newline
+                line += 1
+                continue
+            raise ValueError(f"DX file has fewer than {target} data lines.")
+        num_newlines = block.count(b"\n")
+        if line + num_newlines < target:
+            line += num_newlines
+            position += len(block)
+            continue
+        index = -1
+        while line < target:
+            index = block.index(b"\n", index + 1)
+            line += 1
+        # Rescan the rest of the block for later targets
+        position += index + 1
+        raw_file.seek(position)
+    return offsets
+
+
+def read_dx_region(dx_file: FileIO, bounds, dtype=np.float64) -> dict:
+    """Read the part of a DX grid that covers a box.
+
+    The grid values are stored with z varying fastest, so the points with a
+    given x index form one contiguous slab of the data section.  Only the
+    slabs that intersect the box are converted; the preceding data are
+    skipped by counting newlines.  The returned sub-grid includes every grid
+    point inside the box plus the neighboring points needed to enclose it.
+
+    :param dx_file:  file object for DX file, opened for reading as text or
+        bytes; its position is undefined afterwards
+    :type dx_file:  file
+    :param bounds:  lower and upper corners of the box, in Ångströms
+    :type bounds:  ((float, float, float), (float, float, float))
+    :param dtype:  floating point type for the grid values
+    :type dtype:  numpy.dtype
+    :returns:  dictionary of volumetric data for the sub-grid, as produced by
+        :func:`read_dx`
+    :rtype:  dict
+    :raises ValueError:  on parsing error or if the box misses the grid
+    """
+    raw_file = getattr(dx_file, "buffer", dx_file)
+    raw_file.seek(0)
+    dx_dict, first_line, binary = _read_dx_header(raw_file)
+    if dx_dict["number of grid points"] is None:
+        raise ValueError("DX file is missing the gridpositions counts.")
+    origin, spacing, num_points = _grid_geometry(dx_dict)
+    lower = np.floor((np.asarray(bounds[0]) - origin) / spacing).astype(int)
+    upper = np.ceil((np.asarray(bounds[1]) - origin) / spacing).astype(int)
+    lower = np.maximum(lower, 0)
+    upper = np.minimum(upper, np.asarray(num_points) - 1)
+    if np.any(upper < lower):
+        raise ValueError(f"Box {bounds} does not overlap the DX grid.")
+
+    slab_size = num_points[1] * num_points[2]
+    first_value = lower[0] * slab_size
+    end_value = (upper[0] + 1) * slab_size
+    if binary is not None:
+        values = _read_dx_binary_range(
+            raw_file, *binary, first_value, end_value, dtype
+        )
+        return _region_dict(dx_dict, values, origin, spacing, lower, upper)
+
+    # Locate the x-slabs from the number of values on each data line
+    if isinstance(first_line, str):
+        first_line = first_line.encode("utf-8")
+    data_start = raw_file.tell() - len(first_line)
+    per_line = len(first_line.split())
+    if per_line == 0:
+        raise ValueError("DX file has no grid data.")
+    first_data_line = first_value // per_line
+    end_data_line = -(-end_value // per_line)
+    start_offset, end_offset = _find_line_offsets(
+        raw_file,
+        data_start,
+        [first_data_line, end_data_line],
+        block_size=DX_CHUNK_SIZE,
+    )
+    raw_file.seek(start_offset)
+    text = raw_file.read(end_offset - start_offset).decode("utf-8")
+    values = np.fromstring(text, dtype=dtype, sep=" ")
+    skip = first_value - first_data_line * per_line
+    stop = skip + end_value - first_value
+    values = values[skip:stop]
+    if values.size != end_value - first_value:
+        raise ValueError("DX file has fewer grid values than expected.")
+    return _region_dict(dx_dict, values, origin, spacing, lower, upper)
+
+
+def _read_dx_binary_range(
+    raw_file: FileIO,
+    file_dtype: np.dtype,
+    num_values: int,
+    first_value: int,
+    end_value: int,
+    dtype=np.float64,
+) -> np.ndarray:
+    """Read a range of values from the binary data section of a DX file.
+
+    :param raw_file:  file object for DX file opened in binary mode,
+        positioned at the start of the data
+    :type raw_file:  file
+    :param file_dtype:  type of the values in the file
+    :type file_dtype:  numpy.dtype
+    :param num_values:  number of values in the file
+    :type num_values:  int
+    :param first_value:  index of the first value to read
+    :type first_value:  int
+    :param end_value:  index after the last value to read
+    :type end_value:  int
+    :param dtype:  floating point type for the values
+    :type dtype:  numpy.dtype
+    :returns:  one-dimensional array of grid values
+    :rtype:  numpy.ndarray
+    :raises ValueError:  if the data end early
+    """
+    if end_value > num_values:
+        raise ValueError("DX file has fewer grid values than expected.")
+    raw_file.seek(first_value * file_dtype.itemsize, os.SEEK_CUR)
+    num_bytes = (end_value - first_value) * file_dtype.itemsize
+    block = raw_file.read(num_bytes)
+    if len(block) != num_bytes:
+        raise ValueError("DX file has fewer grid values than expected.")
+    return np.frombuffer(block, dtype=file_dtype).astype(dtype)
+
+
+def _region_dict(
+    dx_dict: dict, values: np.ndarray, origin, spacing, lower, upper
+) -> dict:
+    """Build the sub-grid dictionary for :func:`read_dx_region`.
+
+    :param dx_dict:  header data from the DX file
+    :type dx_dict:  dict
+    :param values:  values of the x-slabs that intersect the box
+    :type values:  numpy.ndarray
+    :param origin:  lower left corner of the full grid
+    :type origin:  numpy.ndarray
+    :param spacing:  grid spacing of the full grid
+    :type spacing:  numpy.ndarray
+    :param lower:  lowest grid index inside the box along each axis
+    :type lower:  numpy.ndarray
+    :param upper:  highest grid index inside the box along each axis
+    :type upper:  numpy.ndarray
+    :returns:  dictionary of volumetric data for the sub-grid
+    :rtype:  dict
+    """
+    num_points = dx_dict["number of grid points"]
+    values = values.reshape(-1, num_points[1], num_points[2])
+    values = values[
+        :, slice(lower[1], upper[1] + 1), slice(lower[2], upper[2] + 1)
+    ]
+    dx_dict["values"] = np.ascontiguousarray(values)
+    dx_dict["number of grid points"] = values.shape
+    dx_dict["lower left corner"] = list(origin + lower * spacing)
+    return dx_dict
+
+
+def dx_cache_path(dx_path: Path) -> Path:
+    """Return the path of the binary grid cache for a DX file.
+
+    :param dx_path:  path to DX file
+    :type dx_path:  Path
+    :returns:  path to the sidecar cache file
+    :rtype:  Path
+    """
+    dx_path = Path(dx_path)
+    return dx_path.with_name(dx_path.name + DX_CACHE_SUFFIX)
+
+
+def write_dx_cache(cache_path: Path, dx_dict: dict, source_path: Path = None):
+    """Write grid data to a binary cache file.
+
+    The file holds a short JSON header (grid geometry, data type and, if
+    given, the size and modification time of the source DX file) followed by
+    the raw values in C order, aligned so that they can be memory-mapped by
+    :func:`read_dx_cache`.  The file is written under a temporary name and
+    then moved into place, so readers never see a partial cache.
+
+    :param cache_path:  path to the cache file to write
+    :type cache_path:  Path
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx`
+    :type dx_dict:  dict
+    :param source_path:  DX file the data were read from
+    :type source_path:  Path
+    """
+    cache_path = Path(cache_path)
+    values = np.asarray(dx_dict["values"])
+    values = values.reshape(dx_dict["number of grid points"])
+    header = {
+        "number of grid points": list(values.shape),
+        "lower left corner": list(dx_dict["lower left corner"]),
+        "grid spacing": [list(delta) for delta in dx_dict["grid spacing"]],
+        "dtype": values.dtype.str,
+    }
+    if source_path is not None:
+        stat = Path(source_path).stat()
+        header["source size"] = stat.st_size
+        header["source mtime"] = stat.st_mtime_ns
+    header_bytes = json.dumps(header).encode("utf-8")
+    offset = len(DX_CACHE_MAGIC) + 4 + len(header_bytes)
+    header_bytes += b" " * (-offset % DX_CACHE_ALIGN)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as cache_file:
+            cache_file.write(DX_CACHE_MAGIC)
+            cache_file.write(struct.pack("<I", len(header_bytes)))
+            cache_file.write(header_bytes)
+            cache_file.write(np.ascontiguousarray(values).data)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def read_dx_cache(cache_path: Path, source_path: Path = None) -> dict:
+    """Memory-map grid data from a binary cache file.
+
+    :param cache_path:  path to cache file written by :func:`write_dx_cache`
+    :type cache_path:  Path
+    :param source_path:  if given, the DX file the cache must be up to date
+        with
+    :type source_path:  Path
+    :returns:  dictionary of volumetric data as produced by :func:`read_dx`,
+        with the values as a read-only :class:`numpy.memmap`
+    :rtype:  dict
+    :raises ValueError:  if the file is not a grid cache or is out of date
+    """
+    with open(cache_path, "rb") as cache_file:
+        magic = cache_file.read(len(DX_CACHE_MAGIC))
+        if magic != DX_CACHE_MAGIC:
+            raise ValueError(f"{cache_path} is not a DX grid cache.")
+        (header_size,) = struct.unpack("<I", cache_file.read(4))
+        header = json.loads(cache_file.read(header_size).decode("utf-8"))
+    if source_path is not None:
+        stat = Path(source_path).stat()
+        if (
+            header.get("source size") != stat.st_size
+            or header.get("source mtime") != stat.st_mtime_ns
+        ):
+            raise ValueError(f"{cache_path} is out of date.")
+    num_points = tuple(header["number of grid points"])
+    values = np.memmap(
+        cache_path,
+        dtype=np.dtype(header["dtype"]),
+        mode="r",
+        offset=len(DX_CACHE_MAGIC) + 4 + header_size,
+        shape=num_points,
+    )
+    return {
+        "grid spacing": header["grid spacing"],
+        "values": values,
+        "number of grid points": num_points,
+        "lower left corner": header["lower left corner"],
+    }
+
+
 def write_cube(
     cube_file: FileIO,
     data_dict: dict,
@@ -73,6 +705,29 @@ def write_cube(
     :param comment:  comment for Cube file
     :type comment:  str
     """
+    _write_cube_header(cube_file, data_dict, atom_list, comment)
+    values = np.ravel(data_dict["values"])
+    step = CUBE_VALUES_PER_LINE * CUBE_BLOCK_LINES
+    _write_cube_values(
+        cube_file, np.split(values, range(step, values.size, step))
+    )
+
+
+def _write_cube_header(
+    cube_file: FileIO, data_dict: dict, atom_list: list, comment: str
+):
+    """Write the header and atom lines of a Cube file.
+
+    :param cube_file:  file object ready for writing text data
+    :type cube_file:  file
+    :param data_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx` (the values are not used)
+    :type data_dict:  dict
+    :param atom_list:  atoms to list in the Cube file
+    :type atom_list:  [Atom]
+    :param comment:  comment for Cube file
+    :type comment:  str
+    """
     cube_file.write(f"{comment}\n")
     cube_file.write("OUTER LOOP: X, MIDDLE LOOP: Y, INNER LOOP: Z\n")
     num_atoms = len(atom_list)
@@ -95,13 +750,811 @@ def write_cube(
             f"{atom.serial:>4} {atom.charge:>11.6f} {atom.x:>11.6f} "
             f"{atom.y:>11.6f} {atom.z:>11.6f}\n"
         )
-    stride = 6
-    values = data_dict["values"]
-    for i in range(0, len(values), 6):
-        if i + stride < len(values):
-            imax = i + 6
-            words = [f"{val:< 13.5E}" for val in values[i:imax]]
-            cube_file.write(" ".join(words) + "\n")
+
+
+def convert_dx_to_cube(
+    dx_file: FileIO,
+    cube_file: FileIO,
+    atom_list: list,
+    comment: str = "CPMD CUBE FILE.",
+):
+    """Convert a DX file to a Cube file without loading the whole grid.
+
+    The header is read first and the Cube header and atom lines are written
+    from it; the grid values are then converted from DX to Cube text one
+    block at a time.  Both formats store the values with z varying fastest,
+    so the blocks can be passed through in file order and memory use does
+    not grow with the size of the grid.  The output is identical to that of
+    :func:`read_dx` followed by :func:`write_cube`.
+
+    :param dx_file:  file object for DX file, ready for reading as text
+    :type dx_file:  file
+    :param cube_file:  file object ready for writing text data
+    :type cube_file:  file
+    :param atom_list:  atoms to list in the Cube file
+    :type atom_list:  [Atom]
+    :param comment:  comment for Cube file
+    :type comment:  str
+    :raises ValueError:  on parsing error
+    """
+    dx_dict, line, binary = _read_dx_header(dx_file)
+    num_points = dx_dict["number of grid points"]
+    if num_points is None:
+        raise ValueError("DX file is missing the gridpositions counts.")
+    expected = num_points[0] * num_points[1] * num_points[2]
+    _write_cube_header(cube_file, dx_dict, atom_list, comment)
+    count = 0
+
+    def counted_chunks():
+        nonlocal count
+        for chunk in _iter_dx_data(
+            dx_file, line, chunk_size=DX_CHUNK_SIZE, binary=binary
+        ):
+            count += chunk.size
+            if count > expected:
+                raise ValueError(
+                    f"DX file has more than {expected} grid values."
+                )
+            yield chunk
+
+    _write_cube_values(cube_file, counted_chunks())
+    if count != expected:
+        raise ValueError(
+            f"DX file has {count} grid values; expected {expected}."
+        )
+
+
+@lru_cache(maxsize=8)
+def _block_format(num_values: int, value_format: str, per_line: int) -> str:
+    """Return a %-format string for a block of grid values.
+
+    :param num_values:  number of values in the block
+    :type num_values:  int
+    :param value_format:  %-format for a single value
+    :type value_format:  str
+    :param per_line:  number of values on each line
+    :type per_line:  int
+    :returns:  format string laying out the values ``per_line`` to a line,
+        separated by spaces, without a trailing newline
+    :rtype:  str
+    """
+    full_lines, remainder = divmod(num_values, per_line)
+    lines = [" ".join([value_format] * per_line)] * full_lines
+    if remainder:
+        lines.append(" ".join([value_format] * remainder))
+    return "\n".join(lines)
+
+
+def _write_cube_values(cube_file: FileIO, chunks: Iterable[np.ndarray]):
+    """Write the data section of a Cube file.
+
+    Values are laid out six per line in the ``% -13.5E`` format, with no
+    newline after the last line.  Each block of lines is formatted with a
+    single ``%`` operation and written at once.
+
+    :param cube_file:  file object ready for writing text data
+    :type cube_file:  file
+    :param chunks:  one-dimensional arrays of values in grid order, of any
+        size
+    :type chunks:  Iterable[numpy.ndarray]
+    """
+    written = False
+    carry = np.empty(0)
+    for chunk in chunks:
+        if carry.size:
+            chunk = np.concatenate((carry, chunk))
+        num_full = chunk.size - chunk.size % CUBE_VALUES_PER_LINE
+        carry = chunk[num_full:]
+        step = CUBE_VALUES_PER_LINE * CUBE_BLOCK_LINES
+        for start in range(0, num_full, step):
+            stop = min(start + step, num_full)
+            block = chunk[start:stop]
+            if written:
+                cube_file.write("\n")
+            block_format = _block_format(
+                block.size, _CUBE_VALUE_FORMAT, CUBE_VALUES_PER_LINE
+            )
+            cube_file.write(block_format % tuple(block.tolist()))
+            written = True
+    if carry.size:
+        if written:
+            cube_file.write("\n")
+        block_format = _block_format(
+            carry.size, _CUBE_VALUE_FORMAT, CUBE_VALUES_PER_LINE
+        )
+        cube_file.write(block_format % tuple(carry.tolist()))
+
+
+def open_dx(dx_path: Path, mode: str = "rb") -> FileIO:
+    """Open a DX file, compressed with gzip or not.
+
+    Files opened for reading are decompressed if they start with the gzip
+    magic bytes; files opened for writing are compressed (at
+    :const:`~pdb2pqr.config.DX_GZIP_LEVEL`) if their name ends in ``.gz``.
+    Text modes use UTF-8.  Binary mode is needed to read DX files with
+    binary data.
+
+    :param dx_path:  path to DX file
+    :type dx_path:  Path
+    :param mode:  mode for :func:`open`, e.g. ``rb`` or ``wt``
+    :type mode:  str
+    :returns:  file object for the DX file
+    :rtype:  file
+    """
+    dx_path = Path(dx_path)
+    if "r" in mode:
+        with open(dx_path, "rb") as dx_file:
+            compressed = dx_file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    else:
+        compressed = dx_path.suffix == ".gz"
+    encoding = None if "b" in mode else "utf-8"
+    if compressed:
+        if "b" not in mode and "t" not in mode:
+            mode += "t"
+        return gzip.open(
+            dx_path, mode, compresslevel=DX_GZIP_LEVEL, encoding=encoding
+        )
+    return open(dx_path, mode, encoding=encoding)
+
+
+def write_dx(
+    dx_file: FileIO,
+    dx_dict: dict,
+    comment: str = "Data from PDB2PQR",
+    binary: bool = False,
+):
+    """Write a DX-format data file in the layout used by APBS.
+
+    Values are written three per line in the ``%12.6e`` format, formatting
+    blocks of lines with a single ``%`` operation.  With ``binary`` enabled,
+    the values are instead written as raw IEEE numbers in native byte order
+    (``type double`` or ``type float`` according to the values) after a
+    ``binary data follows`` line, which is much faster and smaller and is
+    read back by :func:`read_dx`.
+
+    :param dx_file:  file object ready for writing text or (required for
+        binary data) bytes, e.g. from :func:`open_dx`
+    :type dx_file:  file
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx`
+    :type dx_dict:  dict
+    :param comment:  comment for the DX file header
+    :type comment:  str
+    :param binary:  write the values as binary data
+    :type binary:  bool
+    :raises ValueError:  if the values do not match the grid or binary data
+        are written to a text file
+    """
+    num_points = tuple(dx_dict["number of grid points"])
+    values = np.ravel(dx_dict["values"])
+    if values.size != num_points[0] * num_points[1] * num_points[2]:
+        raise ValueError(
+            f"Grid has {values.size} values; expected {num_points}."
+        )
+    text_mode = isinstance(dx_file, io.TextIOBase)
+    if binary and text_mode:
+        raise ValueError("Binary DX data must be written in binary mode.")
+
+    def write(text: str):
+        dx_file.write(text if text_mode else text.encode("utf-8"))
+
+    counts = f"{num_points[0]} {num_points[1]} {num_points[2]}"
+    origin = dx_dict["lower left corner"]
+    write(f"# {comment}\n#\n")
+    write(f"object 1 class gridpositions counts {counts}\n")
+    write(f"origin {origin[0]:12.6e} {origin[1]:12.6e} {origin[2]:12.6e}\n")
+    for delta in dx_dict["grid spacing"]:
+        write(f"delta {delta[0]:12.6e} {delta[1]:12.6e} {delta[2]:12.6e}\n")
+    write(f"object 2 class gridconnections counts {counts}\n")
+    if binary:
+        array_type = "float" if values.dtype == np.float32 else "double"
+        file_dtype = np.dtype(_DX_BINARY_TYPES[array_type])
+        byte_order = "lsb" if sys.byteorder == "little" else "msb"
+        write(
+            f"object 3 class array type {array_type} rank 0 items "
+            f"{values.size} {byte_order} binary data follows\n"
+        )
+        step = max(1, DX_CHUNK_SIZE // file_dtype.itemsize)
+        for start in range(0, values.size, step):
+            stop = start + step
+            block = values[start:stop].astype(file_dtype, copy=False)
+            dx_file.write(block.tobytes())
+        write("\n")
+    else:
+        write(
+            "object 3 class array type double rank 0 items "
+            f"{values.size} data follows\n"
+        )
+        step = DX_VALUES_PER_LINE * CUBE_BLOCK_LINES
+        for start in range(0, values.size, step):
+            stop = start + step
+            block = values[start:stop]
+            block_format = _block_format(
+                block.size, _DX_VALUE_FORMAT, DX_VALUES_PER_LINE
+            )
+            write(block_format % tuple(block.tolist()))
+            write("\n")
+    write('attribute "dep" string "positions"\n')
+    write('object "regular positions regular connections" class field\n')
+    write('component "positions" value 1\n')
+    write('component "connections" value 2\n')
+    write('component "data" value 3\n')
+
+
+def check_grid_compatibility(
+    reference: dict, other: dict, tolerance: float = 1e-6
+):
+    """Check that two grids have the same points.
+
+    :param reference:  dictionary of volumetric data as produced by
+        :func:`read_dx` or :func:`read_dx_header`
+    :type reference:  dict
+    :param other:  dictionary of volumetric data to compare
+    :type other:  dict
+    :param tolerance:  largest allowed difference in origin and spacing
+        (in Ångströms)
+    :type tolerance:  float
+    :raises ValueError:  if the grids differ
+    """
+    ref_counts = tuple(reference["number of grid points"])
+    other_counts = tuple(other["number of grid points"])
+    if ref_counts != other_counts:
+        raise ValueError(
+            f"Grid counts differ: {ref_counts} != {other_counts}."
+        )
+    for key in ["lower left corner", "grid spacing"]:
+        ref_value = np.asarray(reference[key], dtype=np.float64)
+        other_value = np.asarray(other[key], dtype=np.float64)
+        if ref_value.shape != other_value.shape or not np.allclose(
+            ref_value, other_value, rtol=0, atol=tolerance
+        ):
+            raise ValueError(
+                f"Grid {key} differs: {ref_value.tolist()} != "
+                f"{other_value.tolist()}."
+            )
+
+
+def reduce_dx(
+    dx_paths: List[Path],
+    operation: str = str(GridOperation.ADD),
+    scale: float = 1.0,
+    dtype=np.float64,
+    cache: bool = False,
+) -> dict:
+    """Combine several DX grids point by point.
+
+    The headers of all files are checked with
+    :func:`check_grid_compatibility` before any data are read.  The grids
+    are then read one at a time into a single accumulator, so memory use is
+    that of two grids however many files are combined.
+
+    :param dx_paths:  paths to DX files
+    :type dx_paths:  [Path]
+    :param operation:  ``add`` (sum of all grids), ``subtract`` (first grid
+        minus the others), ``mean``, ``min`` or ``max``
+    :type operation:  str
+    :param scale:  factor by which the result is multiplied
+    :type scale:  float
+    :param dtype:  floating point type for the result
+    :type dtype:  numpy.dtype
+    :param cache:  read the grids through their binary caches (see
+        :func:`read_dx`)
+    :type cache:  bool
+    :returns:  dictionary of volumetric data for the result, as produced by
+        :func:`read_dx`
+    :rtype:  dict
+    :raises ValueError:  for an unknown operation or incompatible grids
+    """
+    if operation not in GridOperation.values():
+        raise ValueError(
+            f"Operation, '{operation}', must be one of "
+            f"{GridOperation.values()}."
+        )
+    if not dx_paths:
+        raise ValueError("No DX files to combine.")
+    headers = []
+    for dx_path in dx_paths:
+        with open_dx(dx_path) as dx_file:
+            headers.append(read_dx_header(dx_file))
+        try:
+            check_grid_compatibility(headers[0], headers[-1])
+        except ValueError as err:
+            raise ValueError(f"{dx_path}: {err}") from err
+
+    combine = {
+        str(GridOperation.ADD): np.add,
+        str(GridOperation.SUBTRACT): np.subtract,
+        str(GridOperation.MEAN): np.add,
+        str(GridOperation.MIN): np.minimum,
+        str(GridOperation.MAX): np.maximum,
+    }[operation]
+    result = None
+    for dx_path in dx_paths:
+        _LOGGER.debug("Reading DX from %s...", dx_path)
+        with open_dx(dx_path) as dx_file:
+            values = read_dx(dx_file, dtype=dtype, cache=cache)["values"]
+        if result is None:
+            result = np.array(values, dtype=dtype)
         else:
-            words = [f"{val:< 13.5E}" for val in values[i:]]
-            cube_file.write(" ".join(words))
+            combine(result, values, out=result)
+        del values
+    if operation == str(GridOperation.MEAN):
+        result /= len(dx_paths)
+    if scale != 1.0:
+        result *= scale
+
+    dx_dict = dict(headers[0])
+    dx_dict["values"] = result
+    return dx_dict
+
+
+def _owned_ranges(starts: np.ndarray, stops: np.ndarray) -> List[tuple]:
+    """Split one axis of a partitioned grid between its partitions.
+
+    Each overlap between neighboring partitions is divided at its midpoint,
+    which is where the partition boundaries lie before the overlap is added.
+
+    :param starts:  first global index of each partition, increasing
+    :type starts:  numpy.ndarray
+    :param stops:  one past the last global index of each partition
+    :type stops:  numpy.ndarray
+    :returns:  (start, stop) global indices owned by each partition
+    :rtype:  [(int, int)]
+    """
+    owned = []
+    for pos, (start, stop) in enumerate(zip(starts, stops)):
+        if pos > 0:
+            start = max(start, (starts[pos] + stops[pos - 1]) // 2)
+        if pos < len(starts) - 1:
+            stop = min(stop, (starts[pos + 1] + stops[pos]) // 2)
+        owned.append((int(start), int(stop)))
+    return owned
+
+
+def merge_dx(
+    dx_paths: List[Path],
+    policy: str = str(GridMergePolicy.OWNER),
+    pdime=None,
+    dtype=np.float64,
+    tolerance: float = 1e-3,
+) -> dict:
+    """Merge the sub-grids of a parallel focusing calculation.
+
+    An ``mg-para`` calculation split over a ``pdime`` processor grid writes
+    one DX file per processor, each covering its part of the global grid
+    plus an ``ofrac`` overlap with its neighbors.  The headers are read
+    first to place every sub-grid on the global grid; the global array is
+    then allocated once and the sub-grids are read and copied into it one
+    at a time.  Points that no sub-grid covers are set to NaN.
+
+    Overlaps are resolved by ``policy``:
+
+    * ``owner``:  each point is taken from the sub-grid that owns it in the
+      partition without overlap (the overlaps are split at their
+      midpoints); this needs the sub-grids to form a regular layout
+    * ``mean``:  average of all sub-grids covering the point (this needs an
+      extra one-byte counter per global grid point)
+    * ``first`` or ``last``:  value from the first or last file, in the
+      order given, covering the point
+
+    :param dx_paths:  paths to the DX files of the sub-grids
+    :type dx_paths:  [Path]
+    :param policy:  how to resolve overlaps
+    :type policy:  str
+    :param pdime:  number of processors along each axis, checked against
+        the layout found from the headers if given
+    :type pdime:  (int, int, int)
+    :param dtype:  floating point type for the merged values
+    :type dtype:  numpy.dtype
+    :param tolerance:  largest allowed misalignment of a sub-grid with the
+        global grid, as a fraction of the grid spacing
+    :type tolerance:  float
+    :returns:  dictionary of volumetric data for the global grid, as
+        produced by :func:`read_dx`
+    :rtype:  dict
+    :raises ValueError:  for an unknown policy or inconsistent sub-grids
+    """
+    if policy not in GridMergePolicy.values():
+        raise ValueError(
+            f"Policy, '{policy}', must be one of {GridMergePolicy.values()}."
+        )
+    if not dx_paths:
+        raise ValueError("No DX files to merge.")
+    headers = []
+    for dx_path in dx_paths:
+        with open_dx(dx_path) as dx_file:
+            headers.append(read_dx_header(dx_file))
+    geometry = [_grid_geometry(header) for header in headers]
+    spacing = geometry[0][1]
+    for dx_path, (_, other_spacing, _) in zip(dx_paths, geometry):
+        if not np.allclose(other_spacing, spacing, rtol=tolerance, atol=0):
+            raise ValueError(
+                f"{dx_path}: grid spacing {other_spacing.tolist()} differs "
+                f"from {spacing.tolist()}."
+            )
+
+    # Place each sub-grid on the global grid
+    origins = np.array([origin for origin, _, _ in geometry])
+    global_origin = origins.min(axis=0)
+    position = (origins - global_origin) / spacing
+    starts = np.rint(position).astype(np.intp)
+    if np.any(np.abs(position - starts) > tolerance):
+        raise ValueError("Sub-grids do not lie on a common grid.")
+    stops = starts + np.array([num_points for _, _, num_points in geometry])
+    global_points = tuple(int(num) for num in stops.max(axis=0))
+
+    # Find the processor layout from the distinct sub-grid positions
+    owned = [None] * len(dx_paths)
+    layout = [np.unique(starts[:, axis]) for axis in range(3)]
+    regular = len(dx_paths) == np.prod([len(axis) for axis in layout])
+    if pdime is not None and (
+        not regular
+        or [len(axis) for axis in layout] != [int(num) for num in pdime]
+    ):
+        raise ValueError(
+            f"Sub-grid layout {[len(axis) for axis in layout]} does not "
+            f"match pdime {list(pdime)}."
+        )
+    if policy == str(GridMergePolicy.OWNER):
+        if not regular:
+            raise ValueError(
+                "The owner policy needs sub-grids in a regular layout."
+            )
+        axis_owned = []
+        for axis in range(3):
+            axis_starts = layout[axis]
+            axis_stops = np.array(
+                [
+                    stops[starts[:, axis] == start, axis].max()
+                    for start in axis_starts
+                ]
+            )
+            axis_owned.append(
+                dict(zip(axis_starts, _owned_ranges(axis_starts, axis_stops)))
+            )
+        owned = [
+            [axis_owned[axis][starts[idx, axis]] for axis in range(3)]
+            for idx in range(len(dx_paths))
+        ]
+
+    _LOGGER.info("Allocating global grid of %s points.", global_points)
+    values = np.full(global_points, np.nan, dtype=dtype)
+    counts = None
+    if policy == str(GridMergePolicy.MEAN):
+        values[...] = 0.0
+        counts = np.zeros(global_points, dtype=np.uint8)
+    order = range(len(dx_paths))
+    if policy == str(GridMergePolicy.FIRST):
+        order = reversed(order)
+    for idx in order:
+        _LOGGER.debug("Reading DX from %s...", dx_paths[idx])
+        with open_dx(dx_paths[idx]) as dx_file:
+            sub_values = read_dx(dx_file, dtype=dtype)["values"]
+        ranges = owned[idx] or [
+            (starts[idx, axis], stops[idx, axis]) for axis in range(3)
+        ]
+        global_slice = tuple(slice(start, stop) for start, stop in ranges)
+        sub_slice = tuple(
+            slice(start - starts[idx, axis], stop - starts[idx, axis])
+            for axis, (start, stop) in enumerate(ranges)
+        )
+        if counts is not None:
+            values[global_slice] += sub_values[sub_slice]
+            counts[global_slice] += 1
+        else:
+            values[global_slice] = sub_values[sub_slice]
+        del sub_values
+    if counts is not None:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values /= counts
+        values[counts == 0] = np.nan
+
+    return {
+        "grid spacing": headers[0]["grid spacing"],
+        "values": values,
+        "number of grid points": global_points,
+        "lower left corner": global_origin.tolist(),
+    }
+
+
+def dx_statistics(dx_dict: dict, mask=None) -> dict:
+    """Summarize the values of a grid.
+
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx`
+    :type dx_dict:  dict
+    :param mask:  boolean array with the shape of the grid selecting the
+        points to include (all points if ``None``)
+    :type mask:  numpy.ndarray
+    :returns:  dictionary with the ``count``, ``min``, ``max``, ``mean`` and
+        ``std`` of the selected finite values
+    :rtype:  dict
+    """
+    values = np.asarray(dx_dict["values"])
+    selected = np.isfinite(values)
+    if mask is not None:
+        selected &= np.asarray(mask, dtype=bool).reshape(values.shape)
+    values = values[selected]
+    if values.size == 0:
+        return {
+            "count": 0,
+            "min": np.nan,
+            "max": np.nan,
+            "mean": np.nan,
+            "std": np.nan,
+        }
+    return {
+        "count": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean(dtype=np.float64)),
+        "std": float(values.std(dtype=np.float64)),
+    }
+
+
+def downsample_dx(dx_dict: dict, factor) -> dict:
+    """Reduce the resolution of a grid by averaging blocks of points.
+
+    Each block of ``factor`` points along each axis becomes one point at
+    the center of the block.  Points left over at the upper end of an axis
+    that do not fill a block are dropped.  The grid is processed a few
+    x-slabs (the slowest-varying axis) at a time.
+
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx`
+    :type dx_dict:  dict
+    :param factor:  block size, either one integer for all axes or one per
+        axis
+    :type factor:  int or (int, int, int)
+    :returns:  dictionary of volumetric data for the coarser grid
+    :rtype:  dict
+    :raises ValueError:  if a factor is not positive or exceeds the grid
+    """
+    origin, spacing, num_points = _grid_geometry(dx_dict)
+    factor = np.broadcast_to(np.asarray(factor, dtype=np.intp), (3,))
+    if np.any(factor < 1) or np.any(factor > np.asarray(num_points)):
+        raise ValueError(
+            f"Factor {factor.tolist()} does not fit grid {num_points}."
+        )
+    new_points = tuple(int(num) for num in np.asarray(num_points) // factor)
+    dropped = np.asarray(num_points) - np.asarray(new_points) * factor
+    if np.any(dropped):
+        _LOGGER.debug("Dropping %s points that do not fill a block.", dropped)
+    values = np.asarray(dx_dict["values"]).reshape(num_points)
+    result = np.empty(new_points, dtype=np.result_type(values, np.float32))
+    step = max(1, GRID_SAMPLE_CHUNK // (num_points[1] * num_points[2]))
+    for start in range(0, new_points[0], step):
+        stop = min(start + step, new_points[0])
+        block = values[
+            slice(start * factor[0], stop * factor[0]),
+            slice(new_points[1] * factor[1]),
+            slice(new_points[2] * factor[2]),
+        ]
+        block = block.reshape(
+            stop - start,
+            factor[0],
+            new_points[1],
+            factor[1],
+            new_points[2],
+            factor[2],
+        )
+        result[start:stop] = block.mean(axis=(1, 3, 5))
+    new_spacing = spacing * factor
+    return {
+        "grid spacing": np.diag(new_spacing).tolist(),
+        "values": result,
+        "number of grid points": new_points,
+        "lower left corner": (origin + spacing * (factor - 1) / 2).tolist(),
+    }
+
+
+def _linear_weights(num_old: int, old_spacing: float, new_positions):
+    """Get the 1D linear interpolation weights for points along an axis.
+
+    :param num_old:  number of grid points along the axis
+    :type num_old:  int
+    :param old_spacing:  grid spacing along the axis
+    :type old_spacing:  float
+    :param new_positions:  positions of the new points relative to the
+        first grid point
+    :type new_positions:  numpy.ndarray
+    :returns:  index of the lower neighbor, index of the upper neighbor and
+        weight of the upper neighbor for each new point
+    :rtype:  (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    position = np.clip(new_positions / old_spacing, 0, num_old - 1)
+    lower = np.minimum(np.floor(position).astype(np.intp), max(num_old - 2, 0))
+    upper = np.minimum(lower + 1, num_old - 1)
+    return lower, upper, position - lower
+
+
+def resample_dx(dx_dict: dict, spacing) -> dict:
+    """Resample a grid at a new spacing by trilinear interpolation.
+
+    The new grid starts at the same corner and has as many points as fit
+    within the extent of the original grid.  Trilinear interpolation onto a
+    regular grid is done as three passes of linear interpolation, one per
+    axis, over a few x-slabs (the slowest-varying axis) of the result at a
+    time.
+
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx`
+    :type dx_dict:  dict
+    :param spacing:  new grid spacing (in Ångströms), either one value for
+        all axes or one per axis
+    :type spacing:  float or (float, float, float)
+    :returns:  dictionary of volumetric data for the new grid
+    :rtype:  dict
+    :raises ValueError:  if a spacing is not positive
+    """
+    origin, old_spacing, num_points = _grid_geometry(dx_dict)
+    spacing = np.broadcast_to(np.asarray(spacing, dtype=np.float64), (3,))
+    if np.any(spacing <= 0):
+        raise ValueError(f"Spacing {spacing.tolist()} must be positive.")
+    extent = old_spacing * (np.asarray(num_points) - 1)
+    # Allow for rounding when the new spacing divides the extent evenly
+    new_points = tuple(
+        int(num) for num in np.floor(extent / spacing + 1e-6).astype(int) + 1
+    )
+    weights = [
+        _linear_weights(
+            num_points[axis],
+            old_spacing[axis],
+            spacing[axis] * np.arange(new_points[axis]),
+        )
+        for axis in range(3)
+    ]
+    values = np.asarray(dx_dict["values"]).reshape(num_points)
+    result = np.empty(new_points, dtype=np.result_type(values, np.float32))
+    step = max(1, GRID_SAMPLE_CHUNK // (num_points[1] * num_points[2]))
+    for start in range(0, new_points[0], step):
+        stop = min(start + step, new_points[0])
+        lower, upper, frac = (array[start:stop] for array in weights[0])
+        frac = frac[:, None, None]
+        block = values[lower] * (1 - frac) + values[upper] * frac
+        for axis in (1, 2):
+            lower, upper, frac = weights[axis]
+            shape = [1, 1, 1]
+            shape[axis] = -1
+            frac = frac.reshape(shape)
+            block = (
+                np.take(block, lower, axis=axis) * (1 - frac)
+                + np.take(block, upper, axis=axis) * frac
+            )
+        result[start:stop] = block
+    return {
+        "grid spacing": np.diag(spacing).tolist(),
+        "values": result,
+        "number of grid points": new_points,
+        "lower left corner": origin.tolist(),
+    }
+
+
+def interpolate_dx(
+    dx_dict: dict,
+    coords,
+    method: str = str(GridInterpolation.LINEAR),
+    out_of_bounds: str = str(GridOutOfBounds.FILL),
+    fill_value: float = np.nan,
+    return_outside: bool = False,
+):
+    """Sample a grid at arbitrary points.
+
+    Points are processed in vectorized blocks of
+    :const:`~pdb2pqr.config.GRID_SAMPLE_CHUNK`, so millions of points can
+    be sampled per second without large temporary arrays.
+
+    :param dx_dict:  dictionary of volumetric data as produced by
+        :func:`read_dx`
+    :type dx_dict:  dict
+    :param coords:  coordinates of the points (in Ångströms), shape (N, 3)
+    :type coords:  numpy.ndarray
+    :param method:  ``nearest`` for the value at the nearest grid point or
+        ``linear`` for trilinear interpolation
+    :type method:  str
+    :param out_of_bounds:  ``fill`` to return ``fill_value`` for points
+        outside the grid, ``clip`` to use the nearest point on the grid
+        boundary, or ``raise`` to raise a :class:`ValueError`
+    :type out_of_bounds:  str
+    :param fill_value:  value for points outside the grid with ``fill``
+    :type fill_value:  float
+    :param return_outside:  also return which points lie outside the grid
+    :type return_outside:  bool
+    :returns:  grid values at the points, shape (N,), and with
+        ``return_outside`` a boolean mask of the points outside the grid,
+        shape (N,)
+    :rtype:  numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+    :raises ValueError:  for unknown options or, with ``raise``, points
+        outside the grid
+    """
+    if method not in GridInterpolation.values():
+        raise ValueError(
+            f"Method, '{method}', must be one of "
+            f"{GridInterpolation.values()}."
+        )
+    if out_of_bounds not in GridOutOfBounds.values():
+        raise ValueError(
+            f"Out-of-bounds policy, '{out_of_bounds}', must be one of "
+            f"{GridOutOfBounds.values()}."
+        )
+    origin, spacing, num_points = _grid_geometry(dx_dict)
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    values = np.asarray(dx_dict["values"]).reshape(num_points)
+    result = np.empty(len(coords), dtype=np.result_type(values, np.float32))
+    outside = np.empty(len(coords), dtype=bool)
+    for start in range(0, len(coords), GRID_SAMPLE_CHUNK):
+        stop = start + GRID_SAMPLE_CHUNK
+        result[start:stop], outside[start:stop] = _interpolate_block(
+            values,
+            (coords[start:stop] - origin) / spacing,
+            method,
+            out_of_bounds,
+            fill_value,
+        )
+    if return_outside:
+        return result, outside
+    return result
+
+
+def _interpolate_block(
+    values: np.ndarray,
+    position: np.ndarray,
+    method: str,
+    out_of_bounds: str,
+    fill_value: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sample a grid at points given in fractional grid indices.
+
+    :param values:  grid values, shape (nx, ny, nz)
+    :type values:  numpy.ndarray
+    :param position:  fractional grid indices of the points, shape (N, 3)
+    :type position:  numpy.ndarray
+    :param method:  see :func:`interpolate_dx`
+    :type method:  str
+    :param out_of_bounds:  see :func:`interpolate_dx`
+    :type out_of_bounds:  str
+    :param fill_value:  see :func:`interpolate_dx`
+    :type fill_value:  float
+    :returns:  grid values at the points and a mask of the points outside
+        the grid, each shape (N,)
+    :rtype:  (numpy.ndarray, numpy.ndarray)
+    :raises ValueError:  with ``raise``, for points outside the grid
+    """
+    upper = np.asarray(values.shape) - 1
+    # Allow for rounding in points that lie on the grid boundary
+    tolerance = 1e-6
+    outside = np.any(
+        (position < -tolerance) | (position > upper + tolerance), axis=1
+    )
+    if out_of_bounds == str(GridOutOfBounds.RAISE) and np.any(outside):
+        raise ValueError(
+            f"{np.count_nonzero(outside)} points lie outside the grid."
+        )
+    position = np.clip(position, 0, upper)
+    if method == str(GridInterpolation.NEAREST):
+        index = np.rint(position).astype(np.intp)
+        result = values[index[:, 0], index[:, 1], index[:, 2]]
+    else:
+        lower = np.minimum(np.floor(position).astype(np.intp), upper - 1)
+        lower = np.maximum(lower, 0)
+        frac = position - lower
+        upper_index = np.minimum(lower + 1, upper)
+        result = 0.0
+        for corner_x in (0, 1):
+            index_x = upper_index[:, 0] if corner_x else lower[:, 0]
+            weight_x = frac[:, 0] if corner_x else 1.0 - frac[:, 0]
+            for corner_y in (0, 1):
+                index_y = upper_index[:, 1] if corner_y else lower[:, 1]
+                weight_y = frac[:, 1] if corner_y else 1.0 - frac[:, 1]
+                for corner_z in (0, 1):
+                    index_z = upper_index[:, 2] if corner_z else lower[:, 2]
+                    weight_z = frac[:, 2] if corner_z else 1.0 - frac[:, 2]
+                    result = result + (
+                        weight_x
+                        * weight_y
+                        * weight_z
+                        * values[index_x, index_y, index_z]
+                    )
+    if out_of_bounds == str(GridOutOfBounds.FILL):
+        result = np.where(outside, fill_value, result)
+    return result, outside
@@ -1,13 +1,13 @@
 """This file handles the reading CIF files into appropriate containers."""
 from pathlib import Path
-from typing import List, Tuple
-
-from pdbx import load
-from pdbx.containers import DataContainer
+from typing import TYPE_CHECKING, List, Tuple
 
 from .pdb_record import BaseRecord
 from .reader import Reader
 
+if TYPE_CHECKING:
+    from pdbx.containers import DataContainer
+
 
 class CIFReader(Reader):
     """Factory class to handle reading CIF input files."""
@@ -24,7 +24,9 @@ class CIFReader(Reader):
         :return:  List of PDB and ERROR objects read from input file
         :rtype:  Tuple[List[BaseRecord], List[str]]
         """
-        mmcif_pdbx_data: List[DataContainer] = []
+        from pdbx import load
+
+        mmcif_pdbx_data: List["DataContainer"] = []
         with file_path.open() as fin:
             mmcif_pdbx_data = load(fin)
 
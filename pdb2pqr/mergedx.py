@@ -0,0 +1,114 @@
+"""Merge the DX files of a parallel focusing calculation into one grid."""
+
+from argparse import (
+    ArgumentDefaultsHelpFormatter,
+    ArgumentError,
+    ArgumentParser,
+    Namespace,
+)
+import logging
+import sys
+
+from pdb2pqr.process_cli import check_file
+from .config import (
+    TITLE_STR,
+    VERSION,
+    FilePermission,
+    GridMergePolicy,
+    LogLevels,
+)
+from .io.dx import merge_dx, open_dx, write_dx
+
+_LOGGER = logging.getLogger(f"mergedx {VERSION}")
+
+
+def get_cli_args(args_str: str = None) -> Namespace:
+    """Define and parse command line arguments via argparse.
+
+    :param args_str: String representation of command line arguments
+    :type args_str: str
+
+    :return:  Parsed arguments object
+    :rtype:  argparse.Namespace
+    """
+    desc = f"{TITLE_STR}\nmergedx: merging the per-processor DX files of "
+    desc += "APBS mg-para calculations"
+    parser = ArgumentParser(
+        description=desc,
+        formatter_class=ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "output",
+        type=str,
+        help="Name of the output DX file (compressed if it ends in .gz)",
+    )
+    parser.add_argument(
+        "dx_inputs",
+        type=str,
+        nargs="+",
+        help="Names of the DX files written by each processor",
+    )
+    parser.add_argument(
+        "--policy",
+        default=str(GridMergePolicy.OWNER),
+        choices=GridMergePolicy.values(),
+        help=(
+            "How to resolve overlapping sub-grids: take the processor that "
+            "owns the point, average, or take the first or last file"
+        ),
+    )
+    parser.add_argument(
+        "--pdime",
+        type=int,
+        nargs=3,
+        default=None,
+        help="Processor grid to check the sub-grid layout against",
+    )
+    parser.add_argument(
+        "--binary",
+        action="store_true",
+        default=False,
+        help="Write the grid values as binary data instead of text",
+    )
+    parser.add_argument(
+        "--log-level",
+        help="Set logging level",
+        default=str(LogLevels.INFO),
+        choices=LogLevels.values(),
+        type=str,
+    )
+
+    args = None
+    try:
+        if args_str:
+            return parser.parse_args(args_str.split())
+        args = parser.parse_args()
+    except ArgumentError as err:
+        _LOGGER.error("Cannot parse CLI: %s", err)
+        sys.exit(1)
+    return args
+
+
+def main():
+    """Merge per-processor DX files into a single global grid."""
+    args: Namespace = get_cli_args()
+    for dx_input in args.dx_inputs:
+        check_file(dx_input)
+    check_file(args.output, permission=FilePermission.WRITE, overwrite=False)
+
+    log_level = getattr(logging, args.log_level)
+    logging.basicConfig(level=log_level)
+    _LOGGER.debug("Got arguments: %s", args)
+
+    _LOGGER.info("Merging %d DX files...", len(args.dx_inputs))
+    dx_dict = merge_dx(args.dx_inputs, policy=args.policy, pdime=args.pdime)
+
+    _LOGGER.info("Writing DX to %s...", args.output)
+    with open_dx(args.output, "wb") as dx_file:
+        write_dx(
+            dx_file, dx_dict, comment="Merged by mergedx", binary=args.binary
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,6 @@ from argparse import (
     ArgumentParser,
     Namespace,
 )
-import propka.lib
 from .config import (
     TITLE_STR,
     VERSION,
@@ -45,6 +44,9 @@ def get_cli_args(args_str: str = None) -> Namespace:
     :return:  Parsed arguments object
     :rtype:  argparse.Namespace
     """
+    # PROPKA is only needed for the PDB2PQR options, not by the other tools
+    # that import this module
+    import propka.lib
 
     # Define primary PDB2PQR arguments
     parser = ArgumentParser(
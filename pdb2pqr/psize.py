@@ -8,9 +8,16 @@
 .. codeauthor:: Todd Dolinksy
 .. codeauthor:: Yong Huang
 """
+import os
 import sys
+import csv
+import json
 import logging
+from glob import glob
+from itertools import repeat
 from math import log
+from pathlib import Path
+from time import perf_counter
 from argparse import (
     ArgumentDefaultsHelpFormatter,
     ArgumentError,
@@ -18,14 +25,16 @@ from argparse import (
     Namespace,
 )
 
-from typing import List
-from numpy import ndarray
+from typing import Dict, List, TextIO, Tuple
 
-from .chemistry.structures import Atom
-from .io import read_pqr
-from .process_cli import check_file
+import numpy as np
+
+from .cost_model import CostModel
+from .io import read_pqr_arrays
+from .io.reader_pqr import get_atom_from_pqr_line
+from .process_cli import EmptyFileError, check_file
+from .psize_cache import PsizeCache, content_digest
 from .config import (
-    AtomType,
     BYTES_PER_GRID,
     BYTES_STORED,
     COARSE_GRID_FACTOR,
@@ -36,19 +45,147 @@ from .config import (
     MAX_PDB_ACCURACY,
     MEMORY_CEILING_MB,
     MIN_GRID_POINTS,
+    MIN_LEVELS,
     MIN_MOL_LENGTH,
     PARTITION_OVERLAP,
     PREFIX_CONVERT,
+    PSIZE_CACHE_MAX_BYTES,
     TITLE_STR,
+    ProcGridObjective,
+    ReportFormat,
+    TableFormat,
 )
 
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def principal_axes(coordinates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the principal axes of a set of atom positions.
+
+    :param coordinates:  N x 3 array of atom positions
+    :type coordinates:  numpy.ndarray
+    :return:  rotation matrix whose rows are the principal axes, from the
+        largest to the smallest spread of the positions (with determinant
+        +1), and the centroid of the positions
+    :rtype:  (numpy.ndarray, numpy.ndarray)
+    """
+    center = coordinates.mean(axis=0)
+    _, vectors = np.linalg.eigh(np.cov(coordinates - center, rowvar=False))
+    rotation = vectors[:, ::-1].T
+    # Point each axis along its largest component for a stable result
+    largest = np.abs(rotation).argmax(axis=1)
+    rotation *= np.sign(rotation[np.arange(3), largest])[:, None]
+    if np.linalg.det(rotation) < 0:
+        rotation[2] *= -1
+    return rotation, center
+
+
+def rotate_coordinates(
+    coordinates: np.ndarray, rotation: np.ndarray, center: np.ndarray
+) -> np.ndarray:
+    """Rotate atom positions about a center.
+
+    The new positions are ``rotation @ (x - center) + center``; the inverse
+    transform is ``rotation.T @ (x - center) + center``.
+
+    :param coordinates:  N x 3 array of atom positions
+    :type coordinates:  numpy.ndarray
+    :param rotation:  3 x 3 rotation matrix
+    :type rotation:  numpy.ndarray
+    :param center:  center of rotation
+    :type center:  numpy.ndarray
+    :return:  N x 3 array of rotated positions
+    :rtype:  numpy.ndarray
+    """
+    return (coordinates - center) @ rotation.T + center
+
+
+def write_rotated_pqr(
+    input_path: str, output_path: str, rotation: np.ndarray, center
+):
+    """Write a copy of a PQR file with rotated atom positions.
+
+    The x, y and z fields (the third- to fifth-to-last fields) of each
+    ``ATOM`` and ``HETATM`` line are replaced and all other lines are
+    copied, so the copy holds only the fields PQR defines.  The transform
+    is written next to the PQR file as JSON, with the same name and a
+    ``.json`` suffix, so that results computed for the rotated molecule
+    can be mapped back.
+
+    :param input_path:  path of PQR file to read
+    :type input_path:  str
+    :param output_path:  path of PQR file to write
+    :type output_path:  str
+    :param rotation:  3 x 3 rotation matrix
+    :type rotation:  numpy.ndarray
+    :param center:  center of rotation
+    :type center:  numpy.ndarray
+    :return:  path of the transform file
+    :rtype:  Path
+    :raises ValueError:  for atom lines with fields after the radius
+    """
+    with open(input_path, "rt", encoding="utf-8") as pqr_file:
+        lines = pqr_file.readlines()
+    records = [
+        idx
+        for idx, line in enumerate(lines)
+        if line.startswith(("ATOM", "HETATM"))
+    ]
+    fields = [lines[idx].rsplit(None, 5) for idx in records]
+    for idx, field in zip(records, fields):
+        atom = get_atom_from_pqr_line(lines[idx])
+        parsed = (atom.x, atom.y, atom.z, atom.charge, atom.radius)
+        if parsed != tuple(float(value) for value in field[1:]):
+            raise ValueError(f"Unable to parse line: {lines[idx]}")
+    coordinates = np.array([field[1:4] for field in fields], dtype=float)
+    coordinates = rotate_coordinates(
+        coordinates.reshape(-1, 3), rotation, center
+    )
+    for idx, field, (x, y, z) in zip(records, fields, coordinates):
+        lines[idx] = (
+            f"{field[0]:<30} {x:7.3f} {y:7.3f} {z:7.3f} "
+            f"{field[4]:>7} {field[5]:>6}\n"
+        )
+    with open(output_path, "wt", encoding="utf-8") as pqr_file:
+        pqr_file.writelines(lines)
+    transform_path = Path(output_path).with_suffix(".json")
+    transform = {
+        "description": (
+            "rotated = rotation @ (original - center) + center; "
+            "original = rotation.T @ (rotated - center) + center"
+        ),
+        "rotation": np.asarray(rotation).tolist(),
+        "center": np.asarray(center).tolist(),
+    }
+    with open(transform_path, "wt", encoding="utf-8") as transform_file:
+        json.dump(transform, transform_file, indent=2)
+    return transform_path
+
+
 class Psize:
     """Class for parsing input files and suggesting settings."""
 
+    #: Attributes set by :meth:`run_psize`, as stored in the cache
+    _STATE_ATTRS = [
+        "minlen",
+        "maxlen",
+        "charge",
+        "num_atom",
+        "num_hetatm",
+        "mol_length",
+        "center",
+        "coarse_length",
+        "fine_length",
+        "ngrid",
+        "nsmall",
+        "proc_grid",
+        "nfocus",
+        "rotation",
+        "rotation_center",
+        "original_ngrid",
+    ]
+
     def __init__(
         self,
         cfac=COARSE_GRID_FACTOR,
@@ -58,6 +195,8 @@ class Psize:
         gmemceil=MEMORY_CEILING_MB,
         ofrac=PARTITION_OVERLAP,
         redfac=FOCUS_FACTOR,
+        cost_model: CostModel = None,
+        cache: PsizeCache = None,
     ):
         """Initialize.
 
@@ -82,6 +221,12 @@ class Psize:
         :param redfac:  the maximum factor by which a domain dimension can be
             reduced during focusing
         :type redfac:  float
+        :param cost_model:  model to predict the memory and run time of the
+            calculation, which are then reported and used by
+            :meth:`search_proc_grid`
+        :type cost_model:  CostModel
+        :param cache:  on-disk cache of results for :meth:`run_psize`
+        :type cache:  PsizeCache
         """
         self.minlen = [None, None, None]
         self.maxlen = [None, None, None]
@@ -92,6 +237,8 @@ class Psize:
         self.gmemceil = gmemceil
         self.ofrac = ofrac
         self.redfac = redfac
+        self.cost_model = cost_model
+        self.cache = cache
         self.charge = 0.0
         self.num_atom = 0
         self.num_hetatm = 0
@@ -103,34 +250,102 @@ class Psize:
         self.proc_grid = [0.0, 0.0, 0.0]
         self.nsmall = [0, 0, 0]
         self.nfocus = 0
+        self.rotation = None
+        self.rotation_center = None
+        self.original_ngrid = None
+        self.proc_grid_options = None
 
-    def _parse_input_for_grid_lengths(self, filename: str):
+    def _parse_input_for_grid_lengths(
+        self, filename: str, reorient: bool = False
+    ):
         """Parse a PQR file to set minimum/maximum grid lengths
 
         :param filename: path the PQR file to read
         :type filename: str
+        :param reorient:  size the grid for the molecule rotated onto its
+            principal axes (see :meth:`_reorient`)
+        :type reorient:  bool
         """
-        with open(filename, "r", encoding="utf-8") as fin:
-            atoms: List[Atom] = read_pqr(fin)
-            center = ndarray(shape=(3, len(atoms)))
-            rad = ndarray(shape=(len(atoms)))
+        with open(filename, "rb") as fin:
+            columns = read_pqr_arrays(fin)
+        self._set_grid_lengths_from(columns, reorient)
 
-            for idx, atom in enumerate(atoms):
-                if atom.type == str(AtomType.ATOM):
-                    self.num_atom += 1
-                else:
-                    self.num_hetatm += 1
+    def _set_grid_lengths_from(
+        self, columns: Dict[str, np.ndarray], reorient: bool = False
+    ):
+        """Set minimum/maximum grid lengths, optionally reorienting first.
 
-                x_axis, y_axis, z_axis = 0, 1, 2
-                center[x_axis][idx] = atom.x
-                center[y_axis][idx] = atom.y
-                center[z_axis][idx] = atom.z
+        :param columns:  atom arrays as returned by
+            :func:`~pdb2pqr.io.reader_pqr.read_pqr_arrays`
+        :type columns:  Dict[str, numpy.ndarray]
+        :param reorient:  size the grid for the molecule rotated onto its
+            principal axes (see :meth:`_reorient`)
+        :type reorient:  bool
+        """
+        if reorient and len(columns["hetatm"]) > 1:
+            self._reorient(columns)
+        self._set_grid_lengths(columns)
 
-                rad[idx] = atom.radius
-                self.charge += atom.charge
+    def _set_grid_lengths(self, columns: Dict[str, np.ndarray]):
+        """Set minimum/maximum grid lengths from atom arrays.
 
-            self.minlen = ndarray.min(center - rad, 1)
-            self.maxlen = ndarray.max(center + rad, 1)
+        :param columns:  atom arrays as returned by
+            :func:`~pdb2pqr.io.reader_pqr.read_pqr_arrays`
+        :type columns:  Dict[str, numpy.ndarray]
+        """
+        hetatm = columns["hetatm"]
+        self.num_hetatm = int(hetatm.sum())
+        self.num_atom = len(hetatm) - self.num_hetatm
+        self.charge = float(columns["charges"].sum())
+        if len(hetatm) == 0:
+            self.minlen = [0.0, 0.0, 0.0]
+            self.maxlen = [0.0, 0.0, 0.0]
+            return
+        coordinates = columns["coordinates"]
+        radii = columns["radii"][:, None]
+        self.minlen = (coordinates - radii).min(axis=0)
+        self.maxlen = (coordinates + radii).max(axis=0)
+
+    def _reorient(self, columns: Dict[str, np.ndarray]):
+        """Rotate atom arrays onto the principal axes of the molecule.
+
+        An elongated or diagonal molecule then fits a smaller axis-aligned
+        grid.  The grid points needed without the rotation are kept in
+        :attr:`original_ngrid` to report the savings.  The rotation is only
+        kept if it reduces the grid points; otherwise (for example, for a
+        molecule already aligned with the axes, or with degenerate
+        principal axes) :attr:`rotation` stays ``None``.
+
+        :param columns:  atom arrays as returned by
+            :func:`~pdb2pqr.io.reader_pqr.read_pqr_arrays`; the coordinates
+            are replaced by the rotated ones if the rotation is kept
+        :type columns:  Dict[str, numpy.ndarray]
+        """
+        sizes = []
+        rotation, center = principal_axes(columns["coordinates"])
+        rotated = rotate_coordinates(columns["coordinates"], rotation, center)
+        for coordinates in [columns["coordinates"], rotated]:
+            size = Psize(
+                cfac=self.cfac,
+                fadd=self.fadd,
+                space=self.space,
+                gmemfac=self.gmemfac,
+                gmemceil=self.gmemceil,
+                ofrac=self.ofrac,
+                redfac=self.redfac,
+            )
+            size._set_grid_lengths(dict(columns, coordinates=coordinates))
+            size._set_all()
+            sizes.append(size)
+        original, trial = sizes
+        if np.prod(trial.ngrid) >= np.prod(original.ngrid):
+            _LOGGER.info(
+                "Not reorienting: the principal axes do not shrink the grid."
+            )
+            return
+        self.original_ngrid = list(original.ngrid)
+        self.rotation, self.rotation_center = rotation, center
+        columns["coordinates"] = rotated
 
     def _set_length(self, maxlen, minlen) -> List[float]:
         """Compute molecular dimensions, adjusting for zero-length values.
@@ -226,7 +441,7 @@ class Psize:
         nsmall = [ngrid[i] for i in range(3)]
         while 1:
             nsmem = (
-                BYTES_PER_GRID
+                self.gmemfac
                 * nsmall[0]
                 * nsmall[1]
                 * nsmall[2]
@@ -237,7 +452,7 @@ class Psize:
                 break
             i = nsmall.index(max(nsmall))
             nsmall[i] = (MIN_GRID_POINTS - 1) * (
-                (nsmall[i] - 1) / (MIN_GRID_POINTS - 1) - 1
+                (nsmall[i] - 1) // (MIN_GRID_POINTS - 1) - 1
             ) + 1
             if nsmall[i] <= 0:
                 _LOGGER.error("You picked a memory ceiling that is too small")
@@ -259,11 +474,149 @@ class Psize:
         """
         zofac = 1 + 2 * self.ofrac
         for i in range(3):
-            self.proc_grid[i] = ngrid[i] / float(nsmall[i])
-            if self.proc_grid[i] > 1:
+            self.proc_grid[i] = 1
+            if ngrid[i] > nsmall[i]:
                 self.proc_grid[i] = int(zofac * ngrid[i] / nsmall[i] + 1.0)
         return self.proc_grid
 
+    def search_proc_grid(
+        self,
+        max_procs: int = None,
+        objective: str = str(ProcGridObjective.PROCESSORS),
+        top: int = 5,
+    ) -> List[dict]:
+        """Search the parallel focusing setups for the best processor grid.
+
+        Unlike :meth:`_set_smallest`, which shrinks the largest dimension one
+        multigrid step at a time, every combination of per-processor grid
+        sizes (``nsmall``) that fits under the memory ceiling is considered,
+        with the processor grid (``pdime``) that each one needs.  Setups are
+        ranked by total processors (then points per processor) or by
+        estimated wall time (then total processors).  With a cost model, its
+        predictions are used for the memory and wall time; otherwise the
+        wall time is taken as proportional to the points per processor.  The
+        best setup replaces the current ``nsmall`` and processor grid.  Must
+        be called after the grid has been sized.
+
+        :param max_procs:  maximum total number of processors (core budget)
+        :type max_procs:  int
+        :param objective:  ``processors`` or ``time``
+        :type objective:  str
+        :param top:  number of setups to return
+        :type top:  int
+        :return:  best setups, each with ``nsmall``, ``pdime``, ``nproc``,
+            ``nfocus``, ``memory`` (MB per processor), ``time`` (predicted
+            seconds, or ``None`` without a cost model) and ``spacing``
+        :rtype:  List[dict]
+        :raises ValueError:  if no setup fits the memory ceiling and budget
+        """
+        objective = ProcGridObjective(objective)
+        ngrid = np.array(self.ngrid)
+        sizes = [
+            np.arange(MIN_GRID_POINTS, num + 1, MIN_GRID_POINTS - 1)
+            for num in ngrid
+        ]
+        nsmall = np.stack(
+            [grid.ravel() for grid in np.meshgrid(*sizes, indexing="ij")],
+            axis=1,
+        )
+        zofac = 1 + 2 * self.ofrac
+        pdime = np.where(
+            nsmall < ngrid,
+            (zofac * ngrid / nsmall + 1.0).astype(int),
+            1,
+        )
+        points = nsmall.prod(axis=1)
+        nproc = pdime.prod(axis=1)
+        unique_pdime, inverse = np.unique(pdime, axis=0, return_inverse=True)
+        nfocus = np.array(
+            [
+                self._focus_levels(self.fine_length, row, self.coarse_length)
+                for row in unique_pdime
+            ]
+        )[inverse.ravel()]
+        if self.cost_model is None:
+            memory = self.gmemfac * points / PREFIX_CONVERT / PREFIX_CONVERT
+            time = None
+            cost = points
+        else:
+            predicted = self.cost_model.predict(
+                nsmall, pdime, nfocus, MIN_LEVELS
+            )
+            memory = predicted["memory"]
+            time = cost = predicted["time"]
+        valid = memory < self.gmemceil
+        if max_procs is not None:
+            valid &= nproc <= max_procs
+        if not valid.any():
+            raise ValueError(
+                f"No processor grid fits {self.gmemceil} MB per processor "
+                f"with at most {max_procs} processors."
+            )
+        if objective == ProcGridObjective.PROCESSORS:
+            order = np.lexsort((cost[valid], nproc[valid]))
+        else:
+            order = np.lexsort((nproc[valid], cost[valid]))
+        options = []
+        for idx in np.flatnonzero(valid)[order[:top]]:
+            option_nsmall = [int(num) for num in nsmall[idx]]
+            option_pdime = [int(num) for num in pdime[idx]]
+            options.append(
+                {
+                    "nsmall": option_nsmall,
+                    "pdime": option_pdime,
+                    "nproc": int(nproc[idx]),
+                    "nfocus": int(nfocus[idx]),
+                    "memory": float(memory[idx]),
+                    "time": None if time is None else float(time[idx]),
+                    "spacing": self._parallel_spacing(
+                        option_nsmall, option_pdime
+                    ),
+                }
+            )
+        self.proc_grid_options = options
+        self.nsmall = list(options[0]["nsmall"])
+        self.proc_grid = list(options[0]["pdime"])
+        self.nfocus = options[0]["nfocus"]
+        return options
+
+    def _global_points(self, nsmall, nproc) -> List[int]:
+        """Compute the global grid points of a parallel focusing calculation.
+
+        :param nsmall:  number of grid points on each processor
+        :type nsmall:  [int, int, int]
+        :param nproc:  number of processors in each direction
+        :type nproc:  [int, int, int]
+        :return:  global grid points in each direction (``xglob``,
+            ``yglob`` and ``zglob``)
+        :rtype:  [int, int, int]
+        """
+        nglob = []
+        for i in range(3):
+            if nproc[i] == 1:
+                nglob.append(int(nsmall[i]))
+            else:
+                nglob.append(
+                    int(nproc[i])
+                    * round(
+                        nsmall[i] / (1 + 2 * self.ofrac - MAX_PDB_ACCURACY)
+                    )
+                )
+        return nglob
+
+    def _parallel_spacing(self, nsmall, nproc) -> List[float]:
+        """Compute the fine mesh spacing of a parallel focusing calculation.
+
+        :param nsmall:  number of grid points on each processor
+        :type nsmall:  [int, int, int]
+        :param nproc:  number of processors in each direction
+        :type nproc:  [int, int, int]
+        :return:  fine mesh spacing in each direction
+        :rtype:  [float, float, float]
+        """
+        nglob = self._global_points(nsmall, nproc)
+        return [self.fine_length[i] / (nglob[i] - 1) for i in range(3)]
+
     def _set_focus(self, fine_length, nproc, coarse_length):
         """Calculate the number of levels of focusing required for each
         processor subdomain.
@@ -275,6 +628,20 @@ class Psize:
         :param coarse_length:  coarse grid length
         :type coarse_length:  [float, float, float]
         """
+        self.nfocus = self._focus_levels(fine_length, nproc, coarse_length)
+
+    def _focus_levels(self, fine_length, nproc, coarse_length) -> int:
+        """Calculate the number of levels of focusing for a processor grid.
+
+        :param fine_length:  fine grid length
+        :type fine_length:  [float, float, float]
+        :param nproc:  number of processors in each dimension
+        :type nproc:  [int, int, int]
+        :param coarse_length:  coarse grid length
+        :type coarse_length:  [float, float, float]
+        :return:  number of focusing operations
+        :rtype:  int
+        """
         nfoc = [0, 0, 0]
         for i in range(3):
             nfoc[i] = int(
@@ -289,7 +656,7 @@ class Psize:
             nfocus = nfoc[2]
         if nfocus > 0:
             nfocus = nfocus + 1
-        self.nfocus = nfocus
+        return nfocus
 
     def _set_all(self):
         """Set up all of the things calculated individually above."""
@@ -314,14 +681,214 @@ class Psize:
         """Get Smallest"""
         return self.nsmall
 
-    def run_psize(self, filename):
+    def run_psize(self, filename, reorient: bool = False):
         """Parse input PQR file and set parameters.
 
+        With a cache, a result stored for the same atoms and parameters is
+        restored instead of computed.
+
         :param filename:  path of PQR file
         :type filename:  str
+        :param reorient:  size the grid for the molecule rotated onto its
+            principal axes
+        :type reorient:  bool
         """
-        self._parse_input_for_grid_lengths(filename)
+        if self.cache is None:
+            self._parse_input_for_grid_lengths(filename, reorient=reorient)
+            self._set_all()
+            return
+        params = self._cache_params(reorient)
+        state = self.cache.get_file(filename, params)
+        if state is not None:
+            self._set_state(state)
+            return
+        with open(filename, "rb") as fin:
+            columns = read_pqr_arrays(fin)
+        digest = content_digest(columns)
+        state = self.cache.get(digest, params)
+        if state is not None:
+            self.cache.link(filename, digest)
+            self._set_state(state)
+            return
+        self._set_grid_lengths_from(columns, reorient)
         self._set_all()
+        self.cache.put(digest, params, self._get_state(), pqr_path=filename)
+
+    def run_arrays(
+        self, columns: Dict[str, np.ndarray], reorient: bool = False
+    ):
+        """Set parameters from atom arrays already in memory.
+
+        Unlike :meth:`run_psize`, no file is read and the cache is not
+        used.
+
+        :param columns:  atom arrays as returned by
+            :func:`~pdb2pqr.io.reader_pqr.read_pqr_arrays`; ``charges`` and
+            ``hetatm`` may be omitted
+        :type columns:  Dict[str, numpy.ndarray]
+        :param reorient:  size the grid for the molecule rotated onto its
+            principal axes
+        :type reorient:  bool
+        """
+        coordinates = np.asarray(columns["coordinates"], dtype=float)
+        num_atoms = len(coordinates)
+        columns = {
+            "coordinates": coordinates.reshape(num_atoms, 3),
+            "radii": np.asarray(columns["radii"], dtype=float),
+            "charges": np.asarray(
+                columns.get("charges", np.zeros(num_atoms)), dtype=float
+            ),
+            "hetatm": np.asarray(
+                columns.get("hetatm", np.zeros(num_atoms, dtype=bool)),
+                dtype=bool,
+            ),
+        }
+        self._set_grid_lengths_from(columns, reorient)
+        self._set_all()
+
+    def _cache_params(self, reorient: bool) -> dict:
+        """Return the parameters that determine the result of a run.
+
+        :param reorient:  whether the molecule is reoriented
+        :type reorient:  bool
+        :return:  sizing parameters
+        :rtype:  dict
+        """
+        return {
+            "cfac": self.cfac,
+            "fadd": self.fadd,
+            "space": self.space,
+            "gmemfac": self.gmemfac,
+            "gmemceil": self.gmemceil,
+            "ofrac": self.ofrac,
+            "redfac": self.redfac,
+            "reorient": bool(reorient),
+        }
+
+    def _get_state(self) -> dict:
+        """Return the results of :meth:`run_psize` for the cache.
+
+        :return:  JSON-serializable results
+        :rtype:  dict
+        """
+        state = {}
+        for attr in self._STATE_ATTRS:
+            value = getattr(self, attr)
+            if isinstance(value, np.ndarray):
+                value = value.tolist()
+            elif isinstance(value, list):
+                value = [
+                    num.tolist() if isinstance(num, np.generic) else num
+                    for num in value
+                ]
+            state[attr] = value
+        return state
+
+    def _set_state(self, state: dict):
+        """Restore the results of :meth:`run_psize` from the cache.
+
+        :param state:  results from :meth:`_get_state`
+        :type state:  dict
+        """
+        for attr in self._STATE_ATTRS:
+            value = state[attr]
+            if attr in ["rotation", "rotation_center"] and value is not None:
+                value = np.array(value)
+            setattr(self, attr, value)
+
+    def to_dict(self) -> dict:
+        """Return the results as a dictionary.
+
+        Lengths are in Angstroms and memory and storage in MB.  Sections of
+        the report that do not apply (reorientation, predicted cost and
+        processor grid alternatives) are ``None``.
+
+        :return:  ``num_atom``, ``num_hetatm``, ``charge``, ``minlen``,
+            ``maxlen``, ``mol_length``, ``center``, ``coarse_length``,
+            ``fine_length``, ``ngrid``, ``parallel`` (whether a parallel
+            focusing calculation is set up), ``sequential_memory``,
+            ``memory_ceiling``, ``pdime``, ``nproc``, ``nsmall``, ``nglob``
+            (the global grid points ``xglob``, ``yglob`` and ``zglob``),
+            ``spacing`` (fine mesh spacing), ``memory_per_proc``,
+            ``nfocus``, ``storage`` (ASCII grid storage), ``reorientation``,
+            ``cost`` and ``proc_grid_options``
+        :rtype:  dict
+        """
+        ngrid = [int(num) for num in self.ngrid]
+        nsmall = [int(num) for num in self.nsmall]
+        pdime = [int(num) for num in self.proc_grid]
+        nproc = pdime[0] * pdime[1] * pdime[2]
+        parallel = nproc > 1
+        if parallel:
+            nglob = self._global_points(nsmall, pdime)
+            ntot = nsmall[0] * nsmall[1] * nsmall[2]
+        else:
+            nglob = ngrid
+            ntot = ngrid[0] * ngrid[1] * ngrid[2]
+        values = {
+            "num_atom": self.num_atom,
+            "num_hetatm": self.num_hetatm,
+            "charge": float(self.charge),
+            "minlen": [float(num) for num in self.minlen],
+            "maxlen": [float(num) for num in self.maxlen],
+            "mol_length": [float(num) for num in self.mol_length],
+            "center": [float(num) for num in self.center],
+            "coarse_length": [float(num) for num in self.coarse_length],
+            "fine_length": [float(num) for num in self.fine_length],
+            "ngrid": ngrid,
+            "parallel": parallel,
+            "sequential_memory": self.gmemfac
+            * ngrid[0]
+            * ngrid[1]
+            * ngrid[2]
+            / PREFIX_CONVERT
+            / PREFIX_CONVERT,
+            "memory_ceiling": self.gmemceil,
+            "pdime": pdime,
+            "nproc": nproc,
+            "nsmall": nsmall,
+            "nglob": nglob,
+            "spacing": [
+                self.fine_length[i] / (nglob[i] - 1) for i in range(3)
+            ],
+            "memory_per_proc": self.gmemfac
+            * ntot
+            / PREFIX_CONVERT
+            / PREFIX_CONVERT,
+            "nfocus": self.nfocus,
+            "storage": BYTES_STORED
+            * nproc
+            * ntot
+            / PREFIX_CONVERT
+            / PREFIX_CONVERT,
+            "reorientation": None,
+            "cost": None,
+            "proc_grid_options": self.proc_grid_options,
+        }
+        if self.rotation is not None:
+            original = self.original_ngrid
+            npts = ngrid[0] * ngrid[1] * ngrid[2]
+            original_npts = original[0] * original[1] * original[2]
+            saved = original_npts - npts
+            values["reorientation"] = {
+                "rotation": np.asarray(self.rotation).tolist(),
+                "center": np.asarray(self.rotation_center).tolist(),
+                "original_ngrid": [int(num) for num in original],
+                "saved_points": saved,
+                "saved_fraction": saved / original_npts,
+                "saved_memory": self.gmemfac
+                * saved
+                / PREFIX_CONVERT
+                / PREFIX_CONVERT,
+            }
+        if self.cost_model is not None:
+            cost = self.predict_cost()
+            values["cost"] = {
+                "calibrated": self.cost_model.calibrated,
+                "memory": cost["memory"],
+                "time": cost["time"],
+            }
+        return values
 
     def __str__(self) -> str:
         """Return a string with the formatted results.
@@ -329,121 +896,360 @@ class Psize:
         :return:  string with formatted results
         :rtype:  str
         """
+        if self.num_atom == 0:
+            return "No ATOM entries in file!\n\n"
+        values = self.to_dict()
+        maxlen = values["maxlen"]
+        minlen = values["minlen"]
+        mol_length = values["mol_length"]
+        coarse_length = values["coarse_length"]
+        fine_length = values["fine_length"]
+        center = values["center"]
+        ngrid = values["ngrid"]
+        nsmall = values["nsmall"]
+        nproc = values["pdime"]
+        spacing = values["spacing"]
+        gmem = values["sequential_memory"]
+        # Print the calculated entries
         str_ = "\n"
-        if self.num_atom > 0:
-            maxlen = self.maxlen
-            minlen = self.minlen
-            charge = self.charge
-            mol_length = self.mol_length
-            coarse_length = self.coarse_length
-            fine_length = self.fine_length
-            center = self.center
-            ngrid = self.ngrid
-            nsmall = self.nsmall
-            nproc = self.proc_grid
-            nfocus = self.nfocus
-            # Compute memory requirements
-            nsmem = (
-                BYTES_PER_GRID
-                * nsmall[0]
-                * nsmall[1]
-                * nsmall[2]
-                / PREFIX_CONVERT
-                / PREFIX_CONVERT
-            )
-            gmem = (
-                BYTES_PER_GRID
-                * ngrid[0]
-                * ngrid[1]
-                * ngrid[2]
-                / PREFIX_CONVERT
-                / PREFIX_CONVERT
-            )
-            # Print the calculated entries
-            str_ += "######## MOLECULE INFO ########\n"
-            str_ += f"Number of ATOM entries = {self.num_atom}\n"
-            str_ += f"Number of HETATM entries (ignored) = {self.num_hetatm}\n"
-            str_ += f"Total charge = {charge:.3f} e\n"
-            str_ += f"Dimensions = {mol_length[0]:.3f} Å x "
-            str_ += f"{mol_length[1]:.3f} Å x {mol_length[2]:.3f} Å\n"
-            str_ += f"Center = {center[0]:.3f} Å x {center[1]:.3f} Å x "
-            str_ += f"{center[2]:.3f} Å\n"
-            str_ += f"Lower corner = {minlen[0]:.3f} Å x {minlen[1]:.3f} Å x "
-            str_ += f"{minlen[2]:.3f} Å\n"
-            str_ += f"Upper corner = {maxlen[0]:.3f} Å x {maxlen[1]:.3f} Å x "
-            str_ += f"{maxlen[2]:.3f} Å\n"
-            str_ += "\n"
-            str_ += "######## GENERAL CALCULATION INFO ########\n"
-            str_ += f"Course grid dims = {coarse_length[0]:.3f} Å x "
-            str_ += f"{coarse_length[1]:.3f} Å x "
-            str_ += f"{coarse_length[2]:.3f} Å\n"
-            str_ += f"Fine grid dims = {fine_length[0]:.3f} Å x "
-            str_ += f"{fine_length[1]:.3f} Å x "
-            str_ += f"{fine_length[2]:.3f} Å\n"
-            str_ += f"Num. fine grid pts. = {ngrid[0]:d} Å x "
-            str_ += f"{ngrid[1]:d} Å x "
-            str_ += f"{ngrid[2]:d} Å\n"
-            str_ += "\n"
+        str_ += "######## MOLECULE INFO ########\n"
+        str_ += f"Number of ATOM entries = {self.num_atom}\n"
+        str_ += f"Number of HETATM entries (ignored) = {self.num_hetatm}\n"
+        str_ += f"Total charge = {values['charge']:.3f} e\n"
+        str_ += f"Dimensions = {mol_length[0]:.3f} Å x "
+        str_ += f"{mol_length[1]:.3f} Å x {mol_length[2]:.3f} Å\n"
+        str_ += f"Center = {center[0]:.3f} Å x {center[1]:.3f} Å x "
+        str_ += f"{center[2]:.3f} Å\n"
+        str_ += f"Lower corner = {minlen[0]:.3f} Å x {minlen[1]:.3f} Å x "
+        str_ += f"{minlen[2]:.3f} Å\n"
+        str_ += f"Upper corner = {maxlen[0]:.3f} Å x {maxlen[1]:.3f} Å x "
+        str_ += f"{maxlen[2]:.3f} Å\n"
+        str_ += "\n"
+        str_ += "######## GENERAL CALCULATION INFO ########\n"
+        str_ += f"Course grid dims = {coarse_length[0]:.3f} Å x "
+        str_ += f"{coarse_length[1]:.3f} Å x "
+        str_ += f"{coarse_length[2]:.3f} Å\n"
+        str_ += f"Fine grid dims = {fine_length[0]:.3f} Å x "
+        str_ += f"{fine_length[1]:.3f} Å x "
+        str_ += f"{fine_length[2]:.3f} Å\n"
+        str_ += f"Num. fine grid pts. = {ngrid[0]:d} Å x "
+        str_ += f"{ngrid[1]:d} Å x "
+        str_ += f"{ngrid[2]:d} Å\n"
+        str_ += "\n"
+        if values["parallel"]:
             if gmem > self.gmemceil:
                 str_ += f"Parallel solve required ({gmem:.3f} MB > "
-                str_ += f"{self.gmemceil:.3f} MB)\n"
-                str_ += "Total processors required = "
-                str_ += f"{nproc[0] * nproc[1] * nproc[2]}\n"
-                str_ += f"Proc. grid = {nproc[0]:d} x {nproc[1]:d} x "
-                str_ += f"{nproc[2]:d}\n"
-                str_ += f"Grid pts. on each proc. = {nsmall[0]:d} x "
-                str_ += f"{nsmall[1]:d} x {nsmall[2]:d}\n"
-                xglob = nproc[0] * round(
-                    nsmall[0] / (1 + 2 * self.ofrac - MAX_PDB_ACCURACY)
-                )
-                yglob = nproc[1] * round(
-                    nsmall[1] / (1 + 2 * self.ofrac - MAX_PDB_ACCURACY)
-                )
-                zglob = nproc[2] * round(
-                    nsmall[2] / (1 + 2 * self.ofrac - MAX_PDB_ACCURACY)
-                )
-                if nproc[0] == 1:
-                    xglob = nsmall[0]
-                if nproc[1] == 1:
-                    yglob = nsmall[1]
-                if nproc[2] == 1:
-                    zglob = nsmall[2]
-                str_ += "Fine mesh spacing = "
-                str_ += f"{fine_length[0] / (xglob - 1):g} x "
-                str_ += f"{fine_length[1] / (yglob - 1):g} x "
-                str_ += f"{fine_length[2] / (zglob - 1):g} A\n"
-                str_ += "Estimated mem. required for parallel solve = "
-                str_ += f"{nsmem:.3f} MB/proc.\n"
-                ntot = nsmall[0] * nsmall[1] * nsmall[2]
             else:
-                str_ += "Fine mesh spacing = "
-                str_ += f"{fine_length[0] / (ngrid[0] - 1):g} x "
-                str_ += f"{fine_length[1] / (ngrid[1] - 1):g} x "
-                str_ += f"{fine_length[2] / (ngrid[2] - 1):g} A\n"
-                str_ += "Estimated mem. required for sequential solve = "
-                str_ += f"{gmem:.3f} MB\n"
-                ntot = ngrid[0] * ngrid[1] * ngrid[2]
-            str_ += f"Number of focusing operations = {nfocus}\n"
-            str_ += "\n"
-            str_ += "######## ESTIMATED REQUIREMENTS ########\n"
-            str_ += "Memory per processor = "
-            str_ += f"{BYTES_PER_GRID * ntot / PREFIX_CONVERT / PREFIX_CONVERT:.3f} MB\n"
-            str_ += "Grid storage requirements (ASCII) = "
-            grid_storage_req = (
-                BYTES_STORED
-                * nproc[0]
-                * nproc[1]
-                * nproc[2]
-                * ntot
-                / PREFIX_CONVERT
-                / PREFIX_CONVERT
-            )
-            str_ += f"{grid_storage_req:.3f} MB\n"
-            str_ += "\n"
+                str_ += f"Parallel solve selected ({gmem:.3f} MB <= "
+            str_ += f"{self.gmemceil:.3f} MB)\n"
+            str_ += f"Total processors required = {values['nproc']}\n"
+            str_ += f"Proc. grid = {nproc[0]:d} x {nproc[1]:d} x "
+            str_ += f"{nproc[2]:d}\n"
+            str_ += f"Grid pts. on each proc. = {nsmall[0]:d} x "
+            str_ += f"{nsmall[1]:d} x {nsmall[2]:d}\n"
+            str_ += "Fine mesh spacing = "
+            str_ += f"{spacing[0]:g} x {spacing[1]:g} x {spacing[2]:g} A\n"
+            str_ += "Estimated mem. required for parallel solve = "
+            str_ += f"{values['memory_per_proc']:.3f} MB/proc.\n"
         else:
-            str_ = "No ATOM entries in file!\n\n"
+            str_ += "Fine mesh spacing = "
+            str_ += f"{spacing[0]:g} x {spacing[1]:g} x {spacing[2]:g} A\n"
+            str_ += "Estimated mem. required for sequential solve = "
+            str_ += f"{gmem:.3f} MB\n"
+        str_ += f"Number of focusing operations = {values['nfocus']}\n"
+        str_ += "\n"
+        str_ += "######## ESTIMATED REQUIREMENTS ########\n"
+        str_ += "Memory per processor = "
+        str_ += f"{values['memory_per_proc']:.3f} MB\n"
+        str_ += "Grid storage requirements (ASCII) = "
+        str_ += f"{values['storage']:.3f} MB\n"
+        str_ += "\n"
+        if values["reorientation"] is not None:
+            str_ += self._reorientation_str(values["reorientation"])
+        if values["cost"] is not None:
+            str_ += self._cost_str(values["cost"])
+        if values["proc_grid_options"] is not None:
+            str_ += self._proc_grid_options_str()
         return str_
 
+    @staticmethod
+    def _reorientation_str(reorientation: dict) -> str:
+        """Return a string describing the principal-axis rotation.
+
+        :param reorientation:  ``reorientation`` entry of :meth:`to_dict`
+        :type reorientation:  dict
+        :return:  string with formatted rotation and grid savings
+        :rtype:  str
+        """
+        original = reorientation["original_ngrid"]
+        saved = reorientation["saved_points"]
+        str_ = "######## PRINCIPAL AXIS REORIENTATION ########\n"
+        for axis, row in zip("xyz", reorientation["rotation"]):
+            str_ += f"New {axis} axis = {row[0]:.6f} x {row[1]:.6f} x "
+            str_ += f"{row[2]:.6f}\n"
+        center = reorientation["center"]
+        str_ += f"Rotation center = {center[0]:.3f} Å x {center[1]:.3f} Å x "
+        str_ += f"{center[2]:.3f} Å\n"
+        str_ += f"Num. fine grid pts. without reorientation = {original[0]:d} "
+        str_ += f"x {original[1]:d} x {original[2]:d}\n"
+        str_ += f"Grid points saved = {saved:d} "
+        str_ += f"({100.0 * reorientation['saved_fraction']:.1f}%)\n"
+        str_ += f"Memory saved = {reorientation['saved_memory']:.3f} MB\n"
+        str_ += "\n"
+        return str_
+
+    def predict_cost(self) -> dict:
+        """Predict the memory and run time of the sized calculation.
+
+        :return:  predicted ``memory`` (MB per processor) and ``time`` (s)
+            from the cost model (or the default model if none was given)
+        :rtype:  dict
+        """
+        cost_model = self.cost_model
+        if cost_model is None:
+            cost_model = CostModel((0.0, self.gmemfac / PREFIX_CONVERT**2))
+        nproc = self.proc_grid
+        dime = self.ngrid
+        if nproc[0] * nproc[1] * nproc[2] > 1:
+            dime = self.nsmall
+        return cost_model.predict(dime, nproc, self.nfocus, MIN_LEVELS)
+
+    @staticmethod
+    def _cost_str(cost: dict) -> str:
+        """Return a string with the predicted cost of the calculation.
+
+        :param cost:  ``cost`` entry of :meth:`to_dict`
+        :type cost:  dict
+        :return:  string with formatted predictions
+        :rtype:  str
+        """
+        kind = "calibrated" if cost["calibrated"] else "default"
+        str_ = "######## PREDICTED COST ########\n"
+        str_ += f"Cost model = {kind}\n"
+        str_ += f"Predicted memory per processor = {cost['memory']:.3f} MB\n"
+        str_ += f"Predicted run time = {cost['time']:.1f} s\n"
+        str_ += "\n"
+        return str_
+
+    def _proc_grid_options_str(self) -> str:
+        """Return a string listing the processor grid search results.
+
+        :return:  string with formatted setups
+        :rtype:  str
+        """
+        str_ = "######## PROCESSOR GRID ALTERNATIVES ########\n"
+        for rank, option in enumerate(self.proc_grid_options, start=1):
+            nsmall = option["nsmall"]
+            pdime = option["pdime"]
+            spacing = option["spacing"]
+            str_ += f"{rank}. Proc. grid = {pdime[0]:d} x {pdime[1]:d} x "
+            str_ += f"{pdime[2]:d} ({option['nproc']} procs.), "
+            str_ += f"grid pts. on each proc. = {nsmall[0]:d} x "
+            str_ += f"{nsmall[1]:d} x {nsmall[2]:d}, "
+            str_ += f"{option['memory']:.3f} MB/proc., "
+            if option["time"] is not None:
+                str_ += f"{option['time']:.1f} s, "
+            str_ += f"spacing = {spacing[0]:g} x {spacing[1]:g} x "
+            str_ += f"{spacing[2]:g} A\n"
+        str_ += "\n"
+        return str_
+
+
+#: Columns of the batch sizing table in CSV output, in order; list-valued
+#: columns are split into ``_x``, ``_y`` and ``_z`` columns.  JSONL output
+#: has every entry of :meth:`Psize.to_dict`.
+BATCH_FIELDS = [
+    "path",
+    "num_atom",
+    "num_hetatm",
+    "charge",
+    "minlen",
+    "maxlen",
+    "mol_length",
+    "center",
+    "coarse_length",
+    "fine_length",
+    "ngrid",
+    "parallel",
+    "nsmall",
+    "pdime",
+    "nproc",
+    "nglob",
+    "spacing",
+    "nfocus",
+    "sequential_memory",
+    "memory_per_proc",
+    "storage",
+    "seconds",
+    "error",
+]
+
+
+def _size_file(path: str, options: dict) -> dict:
+    """Size the calculation for one PQR file of a batch.
+
+    Errors, including unexpected ones from malformed or degenerate input,
+    are reported in the result rather than raised so that one bad file
+    does not stop the others.
+
+    :param path:  path of PQR file
+    :type path:  str
+    :param options:  ``psize`` keyword arguments for :class:`Psize`,
+        ``reorient`` for :meth:`Psize.run_psize` and ``search`` keyword
+        arguments for :meth:`Psize.search_proc_grid` (or ``None``)
+    :type options:  dict
+    :return:  row of the batch table
+    :rtype:  dict
+    """
+    row = dict.fromkeys(BATCH_FIELDS)
+    row["path"] = str(path)
+    start = perf_counter()
+    try:
+        check_file(path)
+        psize = Psize(**options["psize"])
+        psize.run_psize(path, reorient=options["reorient"])
+        if psize.num_atom == 0:
+            raise ValueError("No ATOM entries in file!")
+        if options["search"] is not None:
+            psize.search_proc_grid(**options["search"])
+        row.update(psize.to_dict())
+    except (EmptyFileError, OSError, ValueError) as err:
+        row["error"] = str(err)
+    except Exception as err:
+        row["error"] = f"{type(err).__name__}: {err}"
+    row["seconds"] = perf_counter() - start
+    return row
+
+
+def read_manifest(manifest_path: str) -> List[Path]:
+    """Read the PQR files to size from a batch manifest.
+
+    Each non-blank line that does not start with ``#`` holds a PQR path or
+    glob pattern.  Relative paths are relative to the manifest.
+
+    :param manifest_path:  path to manifest file
+    :type manifest_path:  str
+    :return:  PQR paths
+    :rtype:  [Path]
+    """
+    manifest_path = Path(manifest_path)
+    base_dir = manifest_path.parent
+    paths = []
+    with open(manifest_path, "rt", encoding="utf-8") as manifest_file:
+        for line in manifest_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            pattern = str(base_dir / line)
+            if any(char in line for char in "*?["):
+                matches = sorted(glob(pattern))
+                if not matches:
+                    _LOGGER.warning("No PQR files match %s", pattern)
+                paths.extend(Path(path) for path in matches)
+            else:
+                paths.append(Path(pattern))
+    return paths
+
+
+def size_batch(
+    paths: List[str],
+    jobs: int = None,
+    reorient: bool = False,
+    search: dict = None,
+    **kwargs,
+) -> List[dict]:
+    """Size the calculations for many PQR files across a pool of processes.
+
+    Files are handed to the workers in chunks to keep the overhead low for
+    thousands of small files.  A file that cannot be sized is logged and
+    reported without stopping the others.
+
+    :param paths:  paths of PQR files
+    :type paths:  [str]
+    :param jobs:  number of worker processes (all CPUs if ``None``)
+    :type jobs:  int
+    :param reorient:  size the grids for the molecules rotated onto their
+        principal axes
+    :type reorient:  bool
+    :param search:  keyword arguments for :meth:`Psize.search_proc_grid`,
+        or ``None`` to keep the default processor grids
+    :type search:  dict
+    :param kwargs:  keyword arguments for :class:`Psize`
+    :return:  one row per file with ``path``, the entries of
+        :meth:`Psize.to_dict`, ``seconds`` and ``error`` (``None`` on
+        success); only the :data:`BATCH_FIELDS` are set on failure
+    :rtype:  [dict]
+    """
+    # multiprocessing is slow to import and only needed for batches
+    from concurrent.futures import ProcessPoolExecutor
+
+    options = {"psize": kwargs, "reorient": reorient, "search": search}
+    workers = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (4 * workers))
+    rows = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(
+            _size_file, paths, repeat(options), chunksize=chunksize
+        )
+        try:
+            for row in results:
+                rows.append(row)
+        except Exception as err:
+            # Only a crashed worker (BrokenProcessPool) gets here; report
+            # the files it left unsized
+            num_sized = len(rows)
+            for path in paths[num_sized:]:
+                row = dict.fromkeys(BATCH_FIELDS)
+                row["path"] = str(path)
+                row["error"] = f"{type(err).__name__}: {err}"
+                rows.append(row)
+    for row in rows:
+        if row["error"] is not None:
+            _LOGGER.error("Unable to size %s: %s", row["path"], row["error"])
+    return rows
+
+
+def write_table(
+    rows: List[dict],
+    table_file: TextIO,
+    table_format: str = str(TableFormat.CSV),
+):
+    """Write batch sizing results as a machine-readable table.
+
+    :param rows:  rows as returned by :func:`size_batch`
+    :type rows:  [dict]
+    :param table_file:  file to write
+    :type table_file:  TextIO
+    :param table_format:  ``csv`` (one column per axis for list values) or
+        ``jsonl`` (one JSON object per line)
+    :type table_format:  str
+    """
+    table_format = TableFormat(table_format)
+    if table_format == TableFormat.JSONL:
+        for row in rows:
+            table_file.write(json.dumps(row) + "\n")
+        return
+    fieldnames = []
+    for field in BATCH_FIELDS:
+        if any(isinstance(row[field], list) for row in rows):
+            fieldnames += [f"{field}_{axis}" for axis in "xyz"]
+        else:
+            fieldnames.append(field)
+    writer = csv.DictWriter(
+        table_file, fieldnames=fieldnames, extrasaction="ignore"
+    )
+    writer.writeheader()
+    for row in rows:
+        flat = {}
+        for field, value in row.items():
+            if f"{field}_x" in fieldnames:
+                value = value or [None, None, None]
+                for axis, num in zip("xyz", value):
+                    flat[f"{field}_{axis}"] = num
+            else:
+                flat[field] = value
+        writer.writerow(flat)
+
 
 def get_cli_args(args_str: str = None) -> Namespace:
     """Build argument parser.
@@ -523,23 +1329,205 @@ def get_cli_args(args_str: str = None) -> Namespace:
             "can be reduced during focusing"
         ),
     )
-    parser.add_argument("mol_path", help="Path to PQR file.")
+    parser.add_argument(
+        "--reorient",
+        action="store_true",
+        default=False,
+        help=(
+            "Size the grid for the molecule rotated onto its principal axes "
+            "and report the savings"
+        ),
+    )
+    parser.add_argument(
+        "--rotated-pqr",
+        default=None,
+        help=(
+            "With --reorient, write the rotated molecule to this PQR file "
+            "and the transform to the same name with a .json suffix"
+        ),
+    )
+    parser.add_argument(
+        "--search-proc-grid",
+        action="store_true",
+        default=False,
+        help=(
+            "Search all parallel focusing setups that fit the memory "
+            "ceiling for the best processor grid and list the alternatives"
+        ),
+    )
+    parser.add_argument(
+        "--max-procs",
+        default=None,
+        type=int,
+        help="Maximum total number of processors for --search-proc-grid",
+    )
+    parser.add_argument(
+        "--proc-objective",
+        default=str(ProcGridObjective.PROCESSORS),
+        choices=ProcGridObjective.values(),
+        help=(
+            "Minimize total processors or estimated wall time (points per "
+            "processor; use with --max-procs) in --search-proc-grid"
+        ),
+    )
+    parser.add_argument(
+        "--num-alternatives",
+        default=5,
+        type=int,
+        help="Number of setups listed by --search-proc-grid",
+    )
+    parser.add_argument(
+        "--cost-model",
+        default=None,
+        help=(
+            "CSV file of past APBS runs to calibrate a model that predicts "
+            "memory and run time (see pdb2pqr.cost_model)"
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        default=str(ReportFormat.TEXT),
+        choices=ReportFormat.values(),
+        help="Format of the report for a single PQR file",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=(
+            "Directory of an on-disk cache of results, keyed by the atom "
+            "data and sizing parameters"
+        ),
+    )
+    parser.add_argument(
+        "--cache-size",
+        default=PSIZE_CACHE_MAX_BYTES / PREFIX_CONVERT / PREFIX_CONVERT,
+        type=float,
+        help="Size limit of --cache-dir in MB",
+    )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        help=(
+            "Size the PQR files listed in this manifest (one path or glob "
+            "per line) and write a table instead of the report"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        default=None,
+        type=int,
+        help="Number of worker processes in batch mode; all CPUs if omitted",
+    )
+    parser.add_argument(
+        "--table-format",
+        default=str(TableFormat.CSV),
+        choices=TableFormat.values(),
+        help="Format of the table written in batch mode",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="File for the table written in batch mode; stdout if omitted",
+    )
+    parser.add_argument(
+        "mol_paths",
+        nargs="*",
+        metavar="mol_path",
+        help=(
+            "Path to PQR file. Several paths (or --batch) size each file "
+            "and write a table."
+        ),
+    )
 
     args = None
     try:
         if args_str:
-            return parser.parse_args(args_str.split())
-        args = parser.parse_args()
+            args = parser.parse_args(args_str.split())
+        else:
+            args = parser.parse_args()
     except ArgumentError as err:
         _LOGGER.error("Cannot parse CLI: %s", err)
         sys.exit(1)
+    if args.batch is None and not args.mol_paths:
+        parser.error("mol_path or --batch is required")
+    args.mol_path = None
+    if args.batch is None and len(args.mol_paths) == 1:
+        args.mol_path = args.mol_paths[0]
     return args
 
 
+def _run_batch(args: Namespace, cost_model: CostModel, cache: PsizeCache):
+    """Size many PQR files and write the table.
+
+    :param args:  command-line arguments
+    :type args:  argparse.Namespace
+    :param cost_model:  model to predict memory and run time
+    :type cost_model:  CostModel
+    :param cache:  on-disk cache of results
+    :type cache:  PsizeCache
+    """
+    paths = list(args.mol_paths)
+    if args.batch is not None:
+        check_file(args.batch)
+        paths += read_manifest(args.batch)
+    search = None
+    if args.search_proc_grid:
+        search = {
+            "max_procs": args.max_procs,
+            "objective": args.proc_objective,
+            "top": args.num_alternatives,
+        }
+    start = perf_counter()
+    rows = size_batch(
+        paths,
+        jobs=args.jobs,
+        reorient=args.reorient,
+        search=search,
+        cfac=args.cfac,
+        fadd=args.fadd,
+        space=args.space,
+        gmemfac=args.gmemfac,
+        gmemceil=args.gmemceil,
+        ofrac=args.ofrac,
+        redfac=args.redfac,
+        cost_model=cost_model,
+        cache=cache,
+    )
+    if args.output is None:
+        write_table(rows, sys.stdout, args.table_format)
+    else:
+        with open(
+            args.output, "wt", encoding="utf-8", newline=""
+        ) as table_file:
+            write_table(rows, table_file, args.table_format)
+    num_failed = sum(row["error"] is not None for row in rows)
+    _LOGGER.info(
+        "Sized %d of %d PQR files in %.3f s",
+        len(rows) - num_failed,
+        len(rows),
+        perf_counter() - start,
+    )
+    if num_failed:
+        sys.exit(1)
+
+
 def main():
     """Main driver for module."""
     args: Namespace = get_cli_args()
 
+    cost_model = None
+    if args.cost_model is not None:
+        check_file(args.cost_model)
+        cost_model = CostModel.from_csv(args.cost_model)
+    cache = None
+    if args.cache_dir is not None:
+        cache = PsizeCache(
+            args.cache_dir,
+            max_bytes=int(args.cache_size * PREFIX_CONVERT * PREFIX_CONVERT),
+        )
+    if args.mol_path is None:
+        _run_batch(args, cost_model, cache)
+        return
     psize = Psize(
         cfac=args.cfac,
         fadd=args.fadd,
@@ -548,12 +1536,46 @@ def main():
         gmemceil=args.gmemceil,
         ofrac=args.ofrac,
         redfac=args.redfac,
+        cost_model=cost_model,
+        cache=cache,
     )
 
     check_file(args.mol_path)
-    psize.run_psize(args.mol_path)
+    psize.run_psize(args.mol_path, reorient=args.reorient)
+    if args.search_proc_grid:
+        psize.search_proc_grid(
+            max_procs=args.max_procs,
+            objective=args.proc_objective,
+            top=args.num_alternatives,
+        )
 
-    print(psize)
+    if args.format == str(ReportFormat.JSON):
+        print(json.dumps(psize.to_dict(), indent=2))
+    else:
+        print(psize)
+    if args.rotated_pqr is not None:
+        if psize.rotation is None:
+            if args.reorient:
+                _LOGGER.warning(
+                    "Not writing %s: reorienting does not shrink the grid.",
+                    args.rotated_pqr,
+                )
+            else:
+                _LOGGER.warning(
+                    "Not writing %s without --reorient.", args.rotated_pqr
+                )
+            return
+        transform_path = write_rotated_pqr(
+            args.mol_path,
+            args.rotated_pqr,
+            psize.rotation,
+            psize.rotation_center,
+        )
+        _LOGGER.info(
+            "Wrote rotated molecule to %s and transform to %s.",
+            args.rotated_pqr,
+            transform_path,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+"""Persistent on-disk cache of :mod:`psize` results.
+
+Results are stored as small JSON files keyed by a hash of the atom data that
+determine the grid (coordinates, radii, charges and record types) and the
+sizing parameters, so an edited file whose atoms are unchanged (for example,
+only its ``REMARK`` lines differ) still hits the cache.  A second, cheaper
+key made from the path, size and modification time of a file lets a
+repeated call skip reading the file altogether.  When the cache grows past
+its size limit, the least recently used files are deleted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from .config import PSIZE_CACHE_MAX_BYTES
+
+_LOGGER = logging.getLogger(__name__)
+
+#: Version of the cached results; change it when their meaning changes
+PSIZE_CACHE_VERSION = 3
+
+
+def content_digest(columns: Dict[str, np.ndarray]) -> str:
+    """Hash the atom data that determine the size of a calculation.
+
+    :param columns:  atom arrays as returned by
+        :func:`~pdb2pqr.io.reader_pqr.read_pqr_arrays`
+    :type columns:  Dict[str, numpy.ndarray]
+    :return:  hexadecimal SHA-256 digest
+    :rtype:  str
+    """
+    digest = hashlib.sha256()
+    for key in ["coordinates", "radii", "charges", "hetatm"]:
+        values = np.ascontiguousarray(columns[key])
+        digest.update(key.encode("utf-8"))
+        digest.update(str(values.shape).encode("utf-8"))
+        digest.update(values.astype(values.dtype.newbyteorder("<")).data)
+    return digest.hexdigest()
+
+
+def _hash_json(value) -> str:
+    """Hash a JSON-serializable value.
+
+    :param value:  value to hash
+    :return:  hexadecimal SHA-256 digest
+    :rtype:  str
+    """
+    text = json.dumps(value, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PsizeCache:
+    """Directory of cached :class:`~pdb2pqr.psize.Psize` results."""
+
+    def __init__(self, directory, max_bytes: int = PSIZE_CACHE_MAX_BYTES):
+        """Initialize.
+
+        :param directory:  cache directory (created if needed)
+        :type directory:  str
+        :param max_bytes:  size limit of the cache in bytes
+        :type max_bytes:  int
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, digest: str, params: dict) -> Path:
+        """Return the path of the result for atom data and parameters.
+
+        :param digest:  digest of atom data from :func:`content_digest`
+        :type digest:  str
+        :param params:  sizing parameters
+        :type params:  dict
+        :return:  path of result file
+        :rtype:  Path
+        """
+        key = _hash_json([PSIZE_CACHE_VERSION, digest, params])
+        return self.directory / f"result-{key}.json"
+
+    def _file_path(self, pqr_path) -> Optional[Path]:
+        """Return the path of the digest recorded for a PQR file.
+
+        :param pqr_path:  path of PQR file
+        :type pqr_path:  str
+        :return:  path of digest file, or ``None`` if the PQR file cannot
+            be found
+        :rtype:  Path
+        """
+        try:
+            stat = os.stat(pqr_path)
+        except OSError:
+            return None
+        key = _hash_json(
+            [str(Path(pqr_path).resolve()), stat.st_size, stat.st_mtime_ns]
+        )
+        return self.directory / f"file-{key}.txt"
+
+    @staticmethod
+    def _read(path: Path) -> Optional[str]:
+        """Read a cache file and mark it as recently used.
+
+        :param path:  path of cache file
+        :type path:  Path
+        :return:  contents, or ``None`` if the file is missing
+        :rtype:  str
+        """
+        try:
+            with open(path, "rt", encoding="utf-8") as cache_file:
+                text = cache_file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return text
+
+    def _write(self, path: Path, text: str):
+        """Write a cache file without exposing partial contents.
+
+        :param path:  path of cache file
+        :type path:  Path
+        :param text:  contents
+        :type text:  str
+        """
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wt", encoding="utf-8") as cache_file:
+                cache_file.write(text)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def get(self, digest: str, params: dict) -> Optional[dict]:
+        """Look up the result for atom data and parameters.
+
+        :param digest:  digest of atom data from :func:`content_digest`
+        :type digest:  str
+        :param params:  sizing parameters
+        :type params:  dict
+        :return:  cached result, or ``None`` on a miss
+        :rtype:  dict
+        """
+        text = self._read(self._entry_path(digest, params))
+        if text is None:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            _LOGGER.warning("Ignoring corrupt psize cache entry.")
+            return None
+
+    def get_file(self, pqr_path, params: dict) -> Optional[dict]:
+        """Look up the result for an unchanged PQR file without reading it.
+
+        :param pqr_path:  path of PQR file
+        :type pqr_path:  str
+        :param params:  sizing parameters
+        :type params:  dict
+        :return:  cached result, or ``None`` on a miss
+        :rtype:  dict
+        """
+        file_path = self._file_path(pqr_path)
+        if file_path is None:
+            return None
+        digest = self._read(file_path)
+        if digest is None:
+            return None
+        return self.get(digest.strip(), params)
+
+    def put(self, digest: str, params: dict, result: dict, pqr_path=None):
+        """Store the result for atom data and parameters.
+
+        :param digest:  digest of atom data from :func:`content_digest`
+        :type digest:  str
+        :param params:  sizing parameters
+        :type params:  dict
+        :param result:  JSON-serializable result
+        :type result:  dict
+        :param pqr_path:  PQR file the atom data were read from, to record
+            for :meth:`get_file`
+        :type pqr_path:  str
+        """
+        self._write(self._entry_path(digest, params), json.dumps(result))
+        self.link(pqr_path, digest)
+        self.evict()
+
+    def link(self, pqr_path, digest: str):
+        """Record the digest of the atom data in a PQR file.
+
+        :param pqr_path:  path of PQR file (ignored if ``None``)
+        :type pqr_path:  str
+        :param digest:  digest of atom data from :func:`content_digest`
+        :type digest:  str
+        """
+        if pqr_path is None:
+            return
+        file_path = self._file_path(pqr_path)
+        if file_path is not None:
+            self._write(file_path, digest)
+
+    def evict(self):
+        """Delete the least recently used files until under the limit."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith((".json", ".txt")):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+        _LOGGER.debug("Evicted psize cache entries down to %d bytes", total)
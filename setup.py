@@ -110,8 +110,11 @@ setup(
         "console_scripts": [
             "pdb2pqr=pdb2pqr.pdb2pqr:main",
             "dx2cube=pdb2pqr.dx2cube:main",
+            "dxpot=pdb2pqr.dxpot:main",
+            "mergedx=pdb2pqr.mergedx:main",
             "psize=pdb2pqr.psize:main",
             "inputgen=pdb2pqr.inputgen:main",
+            "apbsrun=pdb2pqr.apbsrun:main",
         ]
     },
 )
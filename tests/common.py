@@ -9,3 +9,46 @@ OUTPUT_DIR = DATA_DIR / "output"
 def get_ref_output(filename: str) -> str:
     with open(f"{REF_DIR}/{filename}", encoding="utf-8") as fin:
         return fin.read()
+
+
+def write_test_dx(path, values, origin=(0.0, 0.0, 0.0), spacing=0.5):
+    """Write a grid in the DX layout produced by APBS.
+
+    :param path:  path of the DX file to create
+    :type path:  pathlib.Path
+    :param values:  grid values with shape (nx, ny, nz)
+    :type values:  numpy.ndarray
+    :param origin:  lower left corner of the grid
+    :type origin:  (float, float, float)
+    :param spacing:  grid spacing along each axis
+    :type spacing:  float
+    """
+    num_x, num_y, num_z = values.shape
+    flat = list(values.ravel())
+    with open(path, "wt", encoding="utf-8") as dx_file:
+        dx_file.write("# Data from APBS\n#\n# POTENTIAL (kT/e)\n#\n")
+        dx_file.write(
+            f"object 1 class gridpositions counts {num_x} {num_y} {num_z}\n"
+        )
+        dx_file.write(f"origin {origin[0]:e} {origin[1]:e} {origin[2]:e}\n")
+        dx_file.write(f"delta {spacing:e} 0.000000e+00 0.000000e+00\n")
+        dx_file.write(f"delta 0.000000e+00 {spacing:e} 0.000000e+00\n")
+        dx_file.write(f"delta 0.000000e+00 0.000000e+00 {spacing:e}\n")
+        dx_file.write(
+            f"object 2 class gridconnections counts {num_x} {num_y} {num_z}\n"
+        )
+        dx_file.write(
+            f"object 3 class array type double rank 0 items {len(flat)} "
+            "data follows\n"
+        )
+        for start in range(0, len(flat), 3):
+            stop = start + 3
+            dx_file.write(" ".join(f"{val:e}" for val in flat[start:stop]))
+            dx_file.write("\n")
+        dx_file.write('attribute "dep" string "positions"\n')
+        dx_file.write(
+            'object "regular positions regular connections" class field\n'
+        )
+        dx_file.write('component "positions" value 1\n')
+        dx_file.write('component "connections" value 2\n')
+        dx_file.write('component "data" value 3\n')
@@ -0,0 +1,109 @@
+"""Tests for running APBS inputs with a stand-in executable."""
+
+import json
+import sys
+import pytest
+
+from pdb2pqr.apbsrun import estimate_memory, get_cli_args, run_inputs
+from pdb2pqr.config import BYTES_PER_GRID
+
+#: Stand-in for APBS: fails the first time for inputs containing "flaky",
+#: sleeps for inputs containing "slow" and records its start and end times
+STUB = f"""#!{sys.executable}
+import sys, time
+from pathlib import Path
+
+start = time.time()
+input_path = Path(sys.argv[1])
+text = input_path.read_text()
+marker = input_path.with_suffix(".tried")
+if "flaky" in text and not marker.exists():
+    marker.touch()
+    print("failed", input_path.name)
+    sys.exit(3)
+if "slow" in text:
+    time.sleep(30)
+time.sleep(0.2)
+print("ran", input_path.name)
+input_path.with_suffix(".times").write_text(f"{{start}} {{time.time()}}")
+"""
+
+
+@pytest.fixture
+def stub(tmp_path):
+    """Write the stand-in executable."""
+    stub_path = tmp_path / "apbs_stub"
+    stub_path.write_text(STUB)
+    stub_path.chmod(0o755)
+    return stub_path
+
+
+def write_input(directory, name, comment="", dime=65):
+    """Write a minimal input file with the given per-processor grid."""
+    input_path = directory / name
+    input_path.write_text(
+        f"# {comment}\nelec\n    mg-para\n    dime {dime} {dime} {dime}\n"
+        "end\nquit\n"
+    )
+    return input_path
+
+
+def test_estimate_memory(tmp_path):
+    """Test the memory prediction from the input grid."""
+    input_path = write_input(tmp_path, "mol-PE0.in", dime=97)
+    assert estimate_memory(input_path) == pytest.approx(
+        BYTES_PER_GRID * 97**3 / 1024 / 1024
+    )
+
+
+def test_run_inputs(stub, tmp_path):
+    """Test retries, timeouts and memory-aware concurrency."""
+    inputs = [
+        write_input(tmp_path, "mol-PE0.in"),
+        write_input(tmp_path, "mol-PE1.in", "flaky"),
+        write_input(tmp_path, "mol-PE2.in", "slow"),
+    ]
+    args = get_cli_args(
+        f"--apbs {stub} --jobs 3 --timeout 1 --retries 1 "
+        f"{' '.join(str(path) for path in inputs)}"
+    )
+    report = run_inputs(
+        args.inputs,
+        executable=args.apbs,
+        jobs=args.jobs,
+        timeout=args.timeout,
+        retries=args.retries,
+    )
+    assert json.loads(json.dumps(report)) == report
+    assert (report["succeeded"], report["failed"]) == (2, 1)
+    tasks = report["tasks"]
+    assert [task["status"] for task in tasks] == [
+        "succeeded",
+        "succeeded",
+        "failed",
+    ]
+    assert [len(task["attempts"]) for task in tasks] == [1, 2, 2]
+    assert tasks[1]["attempts"][0]["returncode"] == 3
+    assert all(attempt["timed_out"] for attempt in tasks[2]["attempts"])
+    with open(tasks[0]["log"]) as log_file:
+        assert log_file.read() == "ran mol-PE0.in\n"
+    # The output of the failed attempt is kept before that of the retry
+    with open(tasks[1]["log"]) as log_file:
+        assert log_file.read() == (
+            "failed mol-PE1.in\n\n=== apbsrun: attempt 2 ===\n"
+            "ran mol-PE1.in\n"
+        )
+
+    # Each input needs about 52 MB, so only one fits in 60 MB at a time
+    inputs = [write_input(tmp_path, f"big-PE{idx}.in") for idx in range(3)]
+    report = run_inputs(inputs, executable=str(stub), jobs=3, memory_limit=60)
+    assert report["succeeded"] == 3
+    times = sorted(
+        [float(num) for num in path.with_suffix(".times").read_text().split()]
+        for path in inputs
+    )
+    for (_, end), (start, _) in zip(times, times[1:]):
+        assert start >= end
+
+    report = run_inputs(inputs[:1], executable=str(tmp_path / "missing"))
+    assert report["failed"] == 1
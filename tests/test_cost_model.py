@@ -0,0 +1,109 @@
+"""Tests for the APBS cost model."""
+
+import csv
+import numpy as np
+import pytest
+
+from pdb2pqr.config import BYTES_PER_GRID
+from pdb2pqr.cost_model import CostModel
+from pdb2pqr.psize import Psize
+from .common import INPUT_DIR, get_ref_output
+
+#: Memory and time coefficients used to generate runs
+MEMORY_COEFS = [12.0, 1.5e-4]
+TIME_COEFS = [0.8, 4.0e-6, 0.05]
+
+
+def write_runs(csv_path, num_runs=12):
+    """Write a CSV file of runs generated from known coefficients."""
+    rng = np.random.default_rng(6)
+    truth = CostModel(MEMORY_COEFS, TIME_COEFS)
+    with open(csv_path, "wt", encoding="utf-8", newline="") as csv_file:
+        writer = csv.DictWriter(
+            csv_file,
+            fieldnames=[
+                "nx",
+                "ny",
+                "nz",
+                "nlev",
+                "nfocus",
+                "px",
+                "py",
+                "pz",
+                "memory_mb",
+                "seconds",
+            ],
+        )
+        writer.writeheader()
+        for idx in range(num_runs):
+            dime = rng.choice([33, 65, 97, 129, 161], size=3)
+            pdime = rng.integers(1, 4, size=3)
+            nfocus = int(rng.integers(0, 4))
+            cost = truth.predict(dime, pdime, nfocus)
+            writer.writerow(
+                {
+                    "nx": dime[0],
+                    "ny": dime[1],
+                    "nz": dime[2],
+                    "nlev": 4,
+                    "nfocus": nfocus,
+                    "px": pdime[0],
+                    "py": pdime[1],
+                    "pz": pdime[2],
+                    # Leave some runs without a memory measurement
+                    "memory_mb": cost["memory"] if idx % 3 else "",
+                    "seconds": cost["time"],
+                }
+            )
+
+
+def test_default_cost_model():
+    """Test that the default memory estimate matches psize."""
+    cost = CostModel().predict([65, 97, 33])
+    assert cost["memory"] == pytest.approx(
+        BYTES_PER_GRID * 65 * 97 * 33 / 1024 / 1024
+    )
+    assert cost["time"] > 0
+    costs = CostModel().predict([[65, 97, 33], [33, 33, 33]])
+    np.testing.assert_allclose(
+        costs["memory"],
+        [cost["memory"], CostModel().predict([33] * 3)["memory"]],
+    )
+
+
+def test_cost_model_from_csv(tmp_path):
+    """Test calibrating the model from past runs."""
+    csv_path = tmp_path / "runs.csv"
+    write_runs(csv_path)
+    model = CostModel.from_csv(csv_path)
+    assert model.calibrated
+    np.testing.assert_allclose(model.memory_coefs, MEMORY_COEFS)
+    np.testing.assert_allclose(model.time_coefs, TIME_COEFS)
+    write_runs(csv_path, num_runs=2)
+    with pytest.raises(ValueError, match="Need at least"):
+        CostModel.from_csv(csv_path)
+
+
+def test_psize_cost_model():
+    """Test reporting and optimizing predicted run time in psize."""
+    plain = Psize()
+    plain.run_psize(INPUT_DIR / "dx2cube.pqr")
+    assert str(plain) == get_ref_output("psize_1.out")
+
+    model = CostModel(MEMORY_COEFS, TIME_COEFS)
+    model.calibrated = True
+    psize = Psize(cost_model=model)
+    psize.run_psize(INPUT_DIR / "dx2cube.pqr")
+    text = str(psize)
+    assert text.startswith(get_ref_output("psize_1.out").rstrip("\n"))
+    cost = model.predict(psize.ngrid, nfocus=psize.nfocus)
+    assert "Cost model = calibrated\n" in text
+    assert f"Predicted run time = {cost['time']:.1f} s\n" in text
+
+    psize = Psize(gmemceil=100, cost_model=model)
+    psize.run_psize(INPUT_DIR / "dx2cube.pqr")
+    options = psize.search_proc_grid(max_procs=16, objective="time", top=10)
+    times = [option["time"] for option in options]
+    assert times == sorted(times)
+    assert all(option["memory"] < 100 for option in options)
+    assert psize.predict_cost()["time"] == pytest.approx(times[0])
@@ -0,0 +1,430 @@
+"""Tests for reading and writing OpenDX grid files."""
+
+import os
+import numpy as np
+import pytest
+
+from pdb2pqr.io import (
+    check_grid_compatibility,
+    downsample_dx,
+    dx_cache_path,
+    dx_statistics,
+    interpolate_dx,
+    open_dx,
+    read_dx,
+    read_dx_cache,
+    read_dx_header,
+    read_dx_region,
+    reduce_dx,
+    resample_dx,
+    write_cube,
+    write_dx,
+)
+from pdb2pqr.io.reader_pqr import get_atom_from_pqr_line
+from .common import write_test_dx
+
+
+@pytest.fixture
+def dx_grid(tmp_path):
+    """Create a small DX file with distinct values at every grid point."""
+    values = np.arange(4 * 5 * 7, dtype=np.float64).reshape(4, 5, 7) - 70.5
+    dx_path = tmp_path / "grid.dx"
+    write_test_dx(dx_path, values, origin=(-1.0, 2.0, 3.5), spacing=0.25)
+    return dx_path, values
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_read_dx(dx_grid, dtype):
+    """Test bulk conversion of DX values into a shaped array."""
+    dx_path, values = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        dx_dict = read_dx(dx_file, dtype=dtype)
+    assert dx_dict["number of grid points"] == (4, 5, 7)
+    assert dx_dict["lower left corner"] == [-1.0, 2.0, 3.5]
+    assert dx_dict["grid spacing"] == [
+        [0.25, 0.0, 0.0],
+        [0.0, 0.25, 0.0],
+        [0.0, 0.0, 0.25],
+    ]
+    assert dx_dict["values"].dtype == dtype
+    np.testing.assert_array_equal(dx_dict["values"], values.astype(dtype))
+
+
+def test_read_dx_as_list(dx_grid):
+    """Test the flat list representation of DX values."""
+    dx_path, values = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        dx_dict = read_dx(dx_file, as_list=True)
+    assert dx_dict["values"] == list(values.ravel())
+
+
+def test_read_dx_chunks(dx_grid, monkeypatch):
+    """Test that values split across conversion blocks are read intact."""
+    monkeypatch.setattr("pdb2pqr.io.dx.DX_CHUNK_SIZE", 7)
+    dx_path, values = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        dx_dict = read_dx(dx_file)
+    np.testing.assert_array_equal(dx_dict["values"], values)
+
+
+def test_read_dx_truncated(dx_grid, tmp_path):
+    """Test that a DX file with missing values is rejected."""
+    dx_path, _ = dx_grid
+    lines = dx_path.read_text().splitlines(keepends=True)
+    bad_path = tmp_path / "bad.dx"
+    bad_path.write_text("".join(lines[:12] + lines[-5:]))
+    with open(bad_path, "rt", encoding="utf-8") as dx_file:
+        with pytest.raises(ValueError, match="expected 140"):
+            read_dx(dx_file)
+
+
+def test_read_dx_cache(dx_grid):
+    """Test that cached DX reads memory-map the sidecar grid."""
+    dx_path, values = dx_grid
+    cache_path = dx_cache_path(dx_path)
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        first = read_dx(dx_file, cache=True)
+    assert cache_path.is_file()
+    assert not isinstance(first["values"], np.memmap)
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        second = read_dx(dx_file, cache=True)
+    assert isinstance(second["values"], np.memmap)
+    np.testing.assert_array_equal(second["values"], values)
+    for key in ["number of grid points", "lower left corner", "grid spacing"]:
+        assert list(second[key]) == list(first[key])
+
+
+def test_read_dx_cache_stale(dx_grid):
+    """Test that a changed DX file invalidates its cache."""
+    dx_path, values = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        read_dx(dx_file, cache=True)
+    mtime = dx_path.stat().st_mtime_ns
+    write_test_dx(dx_path, 2 * values, origin=(-1.0, 2.0, 3.5), spacing=0.25)
+    os.utime(dx_path, ns=(mtime + 10**9, mtime + 10**9))
+    with pytest.raises(ValueError, match="out of date"):
+        read_dx_cache(dx_cache_path(dx_path), source_path=dx_path)
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        dx_dict = read_dx(dx_file, cache=True)
+    np.testing.assert_array_equal(dx_dict["values"], 2 * values)
+    cached = read_dx_cache(dx_cache_path(dx_path), source_path=dx_path)
+    np.testing.assert_array_equal(cached["values"], 2 * values)
+
+
+def test_read_dx_header(dx_grid):
+    """Test reading the grid geometry without the data."""
+    dx_path, _ = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        header = read_dx_header(dx_file)
+    assert header["values"] is None
+    assert header["number of grid points"] == (4, 5, 7)
+    assert header["lower left corner"] == [-1.0, 2.0, 3.5]
+
+
+@pytest.mark.parametrize(
+    "bounds, index",
+    [
+        pytest.param(
+            ((-0.9, 2.3, 3.9), (-0.3, 2.6, 4.6)),
+            np.s_[0:4, 1:4, 1:6],
+            id="interior",
+        ),
+        pytest.param(
+            ((-0.5, -10.0, 4.0), (10.0, 2.0, 4.0)),
+            np.s_[2:4, 0:1, 2:3],
+            id="clipped",
+        ),
+        pytest.param(
+            ((-5.0, -5.0, -5.0), (5.0, 5.0, 5.0)),
+            np.s_[:, :, :],
+            id="everything",
+        ),
+    ],
+)
+@pytest.mark.parametrize("mode", ["rt", "rb"])
+def test_read_dx_region(dx_grid, monkeypatch, bounds, index, mode):
+    """Test reading the x-slabs of a DX grid that cover a box."""
+    monkeypatch.setattr("pdb2pqr.io.dx.DX_CHUNK_SIZE", 16)
+    dx_path, values = dx_grid
+    with open(dx_path, mode) as dx_file:
+        region = read_dx_region(dx_file, bounds)
+    expected = values[index]
+    assert region["number of grid points"] == expected.shape
+    np.testing.assert_array_equal(region["values"], expected)
+    corner = np.array([-1.0, 2.0, 3.5]) + 0.25 * np.array(
+        [index[axis].start or 0 for axis in range(3)]
+    )
+    np.testing.assert_allclose(region["lower left corner"], corner)
+
+
+def test_read_dx_region_outside(dx_grid):
+    """Test that a box that misses the grid is rejected."""
+    dx_path, _ = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        with pytest.raises(ValueError, match="does not overlap"):
+            read_dx_region(dx_file, ((10.0, 10.0, 10.0), (11.0, 11.0, 11.0)))
+
+
+def write_cube_reference(cube_file, values):
+    """Write Cube data values one at a time, as done before vectorization."""
+    for i in range(0, len(values), 6):
+        stop = i + 6
+        if stop < len(values):
+            words = [f"{val:< 13.5E}" for val in values[i:stop]]
+            cube_file.write(" ".join(words) + "\n")
+        else:
+            words = [f"{val:< 13.5E}" for val in values[i:]]
+            cube_file.write(" ".join(words))
+
+
+@pytest.mark.parametrize("num_values", [1, 5, 6, 7, 36, 140, 1001])
+@pytest.mark.parametrize("block_lines", [1, 4, 8192])
+def test_write_cube(tmp_path, monkeypatch, num_values, block_lines):
+    """Test that block-formatted Cube data match the per-value layout."""
+    monkeypatch.setattr("pdb2pqr.io.dx.CUBE_BLOCK_LINES", block_lines)
+    rng = np.random.default_rng(num_values)
+    values = rng.normal(scale=1e3, size=num_values)
+    values[::7] = 0.0
+    values[::11] *= 1e-120
+    dx_dict = {
+        "grid spacing": [[0.5, 0, 0], [0, 0.5, 0], [0, 0, 0.5]],
+        "values": values,
+        "number of grid points": (num_values, 1, 1),
+        "lower left corner": [1.0, -2.0, 3.0],
+    }
+    atom = get_atom_from_pqr_line(
+        "ATOM      1  N   THR A   1      -1.000   2.000   3.500  0.1  2.0"
+    )
+    cube_path = tmp_path / "test.cube"
+    with open(cube_path, "wt", encoding="utf-8") as cube_file:
+        write_cube(cube_file, dx_dict, [atom])
+    lines = cube_path.read_text(encoding="utf-8").split("\n")
+    assert lines[:7] == [
+        "CPMD CUBE FILE.",
+        "OUTER LOOP: X, MIDDLE LOOP: Y, INNER LOOP: Z",
+        "   1    1.000000   -2.000000    3.000000",
+        f"{-num_values:>4}    0.500000    0.000000    0.000000",
+        "  -1    0.000000    0.500000    0.000000",
+        "  -1    0.000000    0.000000    0.500000",
+        "   1    0.100000   -1.000000    2.000000    3.500000",
+    ]
+    with open(tmp_path / "reference.cube", "wt", encoding="utf-8") as ref:
+        write_cube_reference(ref, list(values))
+    expected = (tmp_path / "reference.cube").read_text(encoding="utf-8")
+    assert "\n".join(lines[7:]) == expected
+
+
+@pytest.fixture
+def linear_grid():
+    """Create a grid holding a linear function of position."""
+    origin = np.array([-1.0, 2.0, 3.5])
+    axes = [
+        origin[axis] + 0.5 * np.arange(num)
+        for axis, num in [(0, 4), (1, 5), (2, 3)]
+    ]
+    x, y, z = np.meshgrid(*axes, indexing="ij")
+    return {
+        "grid spacing": [[0.5, 0, 0], [0, 0.5, 0], [0, 0, 0.5]],
+        "values": 2.0 * x - 3.0 * y + 0.5 * z + 1.0,
+        "number of grid points": x.shape,
+        "lower left corner": list(origin),
+    }
+
+
+def test_interpolate_dx_linear(linear_grid):
+    """Test that trilinear interpolation reproduces a linear function."""
+    rng = np.random.default_rng(2)
+    coords = np.array([-1.0, 2.0, 3.5]) + rng.uniform(
+        0, 1, size=(1000, 3)
+    ) * np.array([1.5, 2.0, 1.0])
+    expected = 2.0 * coords[:, 0] - 3.0 * coords[:, 1] + 0.5 * coords[:, 2]
+    values = interpolate_dx(linear_grid, coords)
+    np.testing.assert_allclose(values, expected + 1.0)
+
+
+def test_interpolate_dx_nearest(linear_grid):
+    """Test sampling the nearest grid point."""
+    coords = np.array([[-0.9, 2.2, 3.6], [0.4, 3.9, 4.4]])
+    values = interpolate_dx(linear_grid, coords, method="nearest")
+    np.testing.assert_allclose(
+        values, linear_grid["values"][[0, 3], [0, 4], [0, 2]]
+    )
+
+
+def test_interpolate_dx_out_of_bounds(linear_grid):
+    """Test the policies for points outside the grid."""
+    coords = np.array([[-1.0, 2.0, 3.5], [-2.0, 2.0, 3.5], [0.5, 4.0, 4.5]])
+    values = interpolate_dx(linear_grid, coords, fill_value=-99.0)
+    np.testing.assert_allclose(values, [-5.25, -99.0, -7.75])
+    values, outside = interpolate_dx(
+        linear_grid, coords, out_of_bounds="clip", return_outside=True
+    )
+    np.testing.assert_allclose(values, [-5.25, -5.25, -7.75])
+    np.testing.assert_array_equal(outside, [False, True, False])
+    with pytest.raises(ValueError, match="1 points lie outside"):
+        interpolate_dx(linear_grid, coords, out_of_bounds="raise")
+    with pytest.raises(ValueError, match="Method"):
+        interpolate_dx(linear_grid, coords, method="cubic")
+
+
+def test_write_dx(dx_grid, tmp_path):
+    """Test that written DX files read back to the same grid."""
+    dx_path, values = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        dx_dict = read_dx(dx_file)
+    out_path = tmp_path / "out.dx"
+    with open(out_path, "wt", encoding="utf-8") as dx_file:
+        write_dx(dx_file, dx_dict)
+    with open(out_path, "rt", encoding="utf-8") as dx_file:
+        result = read_dx(dx_file)
+    check_grid_compatibility(dx_dict, result)
+    np.testing.assert_allclose(result["values"], values, rtol=1e-6)
+
+
+@pytest.mark.parametrize("name", ["out.dx", "out.dx.gz"])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_write_dx_binary(dx_grid, tmp_path, monkeypatch, name, dtype):
+    """Test writing compressed and binary DX files and reading them back."""
+    monkeypatch.setattr("pdb2pqr.io.dx.DX_CHUNK_SIZE", 40)
+    dx_path, values = dx_grid
+    with open_dx(dx_path) as dx_file:
+        dx_dict = read_dx(dx_file, dtype=dtype)
+    out_path = tmp_path / name
+    with open_dx(out_path, "wb") as dx_file:
+        write_dx(dx_file, dx_dict, binary=True)
+    with open_dx(out_path) as dx_file:
+        result = read_dx(dx_file, dtype=dtype)
+    check_grid_compatibility(dx_dict, result)
+    np.testing.assert_array_equal(result["values"], dx_dict["values"])
+    with open_dx(out_path) as dx_file:
+        region = read_dx_region(dx_file, ((-0.5, 2.0, 3.5), (-0.25, 2.5, 4.0)))
+    np.testing.assert_array_equal(
+        region["values"], dx_dict["values"][2:4, 0:3, 0:3]
+    )
+    with open_dx(out_path, "wt") as dx_file:
+        with pytest.raises(ValueError, match="binary mode"):
+            write_dx(dx_file, dx_dict, binary=True)
+
+
+def test_open_dx_gzip(dx_grid, tmp_path):
+    """Test that compressed text DX files are detected when read."""
+    dx_path, values = dx_grid
+    with open_dx(dx_path, "rt") as dx_file:
+        dx_dict = read_dx(dx_file)
+    out_path = tmp_path / "out.dx.gz"
+    with open_dx(out_path, "wt") as dx_file:
+        write_dx(dx_file, dx_dict)
+    assert out_path.read_bytes()[:2] == b"\x1f\x8b"
+    renamed = out_path.rename(tmp_path / "renamed.dx")
+    for mode in ["rt", "rb"]:
+        with open_dx(renamed, mode) as dx_file:
+            result = read_dx(dx_file)
+        np.testing.assert_allclose(result["values"], values, rtol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "operation, scale, expected",
+    [
+        pytest.param("add", 1.0, lambda a, b, c: a + b + c, id="add"),
+        pytest.param("subtract", 1.0, lambda a, b, c: a - b - c, id="sub"),
+        pytest.param(
+            "mean", 2.0, lambda a, b, c: 2 * (a + b + c) / 3, id="mean"
+        ),
+        pytest.param(
+            "min",
+            1.0,
+            lambda a, b, c: np.minimum(np.minimum(a, b), c),
+            id="min",
+        ),
+        pytest.param(
+            "max",
+            -1.0,
+            lambda a, b, c: -np.maximum(np.maximum(a, b), c),
+            id="max",
+        ),
+    ],
+)
+def test_reduce_dx(tmp_path, operation, scale, expected):
+    """Test combining grids point by point."""
+    rng = np.random.default_rng(3)
+    grids = [rng.normal(size=(3, 4, 5)) for _ in range(3)]
+    paths = []
+    for idx, grid in enumerate(grids):
+        paths.append(tmp_path / f"grid{idx}.dx")
+        write_test_dx(paths[-1], grid, origin=(1.0, 2.0, 3.0))
+    result = reduce_dx(paths, operation=operation, scale=scale)
+    assert result["number of grid points"] == (3, 4, 5)
+    grids = [grid.round(6) for grid in grids]
+    np.testing.assert_allclose(
+        result["values"], expected(*grids), rtol=1e-5, atol=1e-5
+    )
+
+
+def test_reduce_dx_incompatible(tmp_path):
+    """Test that grids with different points are not combined."""
+    values = np.zeros((3, 4, 5))
+    write_test_dx(tmp_path / "a.dx", values, origin=(1.0, 2.0, 3.0))
+    write_test_dx(tmp_path / "b.dx", values, origin=(1.0, 2.5, 3.0))
+    with pytest.raises(ValueError, match="b.dx: Grid lower left corner"):
+        reduce_dx([tmp_path / "a.dx", tmp_path / "b.dx"])
+    with pytest.raises(ValueError, match="Operation"):
+        reduce_dx([tmp_path / "a.dx"], operation="divide")
+
+
+def test_dx_statistics(linear_grid):
+    """Test summarizing the masked values of a grid."""
+    values = linear_grid["values"]
+    mask = values > values.mean()
+    stats = dx_statistics(linear_grid, mask=mask)
+    assert stats["count"] == np.count_nonzero(mask)
+    assert stats["min"] == values[mask].min()
+    assert stats["mean"] == pytest.approx(values[mask].mean())
+    assert dx_statistics(linear_grid, mask=np.zeros_like(mask))["count"] == 0
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 1 << 20])
+def test_downsample_dx(dx_grid, monkeypatch, chunk):
+    """Test block averaging with leftover points dropped."""
+    monkeypatch.setattr("pdb2pqr.io.dx.GRID_SAMPLE_CHUNK", chunk)
+    dx_path, values = dx_grid
+    with open(dx_path, "rt", encoding="utf-8") as dx_file:
+        dx_dict = read_dx(dx_file)
+    result = downsample_dx(dx_dict, (2, 2, 3))
+    assert result["number of grid points"] == (2, 2, 2)
+    np.testing.assert_allclose(
+        result["lower left corner"], [-0.875, 2.125, 3.75]
+    )
+    np.testing.assert_allclose(
+        np.diag(result["grid spacing"]), [0.5, 0.5, 0.75]
+    )
+    expected = (
+        values[:4, :4, :6].reshape(2, 2, 2, 2, 2, 3).mean(axis=(1, 3, 5))
+    )
+    np.testing.assert_allclose(result["values"], expected)
+    with pytest.raises(ValueError, match="does not fit"):
+        downsample_dx(dx_dict, 5)
+
+
+@pytest.mark.parametrize("chunk", [1, 1 << 20])
+def test_resample_dx(linear_grid, monkeypatch, chunk):
+    """Test that resampling reproduces a linear function on the new grid."""
+    monkeypatch.setattr("pdb2pqr.io.dx.GRID_SAMPLE_CHUNK", chunk)
+    result = resample_dx(linear_grid, (0.3, 0.25, 0.5))
+    assert result["number of grid points"] == (6, 9, 3)
+    assert result["lower left corner"] == linear_grid["lower left corner"]
+    axes = [
+        origin + spacing * np.arange(num)
+        for origin, spacing, num in zip(
+            result["lower left corner"],
+            np.diag(result["grid spacing"]),
+            result["number of grid points"],
+        )
+    ]
+    x, y, z = np.meshgrid(*axes, indexing="ij")
+    np.testing.assert_allclose(
+        result["values"], 2.0 * x - 3.0 * y + 0.5 * z + 1.0
+    )
+    identity = resample_dx(linear_grid, 0.5)
+    np.testing.assert_allclose(identity["values"], linear_grid["values"])
+    with pytest.raises(ValueError, match="positive"):
+        resample_dx(linear_grid, 0.0)
@@ -4,10 +4,17 @@ This tests the dx entrypoint executable.
 
 from logging import getLogger
 from difflib import Differ
-from .common import INPUT_DIR
-
-from pdb2pqr.io import read_pqr, read_dx, write_cube
+import numpy as np
+from .common import INPUT_DIR, write_test_dx
 
+from pdb2pqr import dx2cube
+from pdb2pqr.dx2cube import (
+    _convert_file,
+    convert_batch,
+    get_cli_args,
+    read_manifest,
+)
+from pdb2pqr.io import convert_dx_to_cube, read_pqr, read_dx, write_cube
 
 _LOGGER = getLogger(__name__)
 
@@ -52,3 +59,103 @@ def test_dx2cube(tmp_path):
     assert not differences
 
     _LOGGER.info("No differences found in output")
+
+
+def test_dx2cube_stream(tmp_path, monkeypatch):
+    """Test that streaming conversion matches in-memory conversion."""
+    monkeypatch.setattr("pdb2pqr.io.dx.DX_CHUNK_SIZE", 100)
+    monkeypatch.setattr("pdb2pqr.io.dx.CUBE_BLOCK_LINES", 5)
+    pqr_path = INPUT_DIR / "dx2cube.pqr"
+    dx_path = tmp_path / "test.dx"
+    rng = np.random.default_rng(0)
+    write_test_dx(dx_path, rng.normal(size=(9, 5, 7)), origin=(1, 2, 3))
+
+    with open(pqr_path, "rt") as pqr_file:
+        atom_list = read_pqr(pqr_file)
+    with open(dx_path, "rt") as dx_file:
+        dx_dict = read_dx(dx_file)
+    with open(tmp_path / "memory.cube", "wt") as cube_file:
+        write_cube(cube_file, dx_dict, atom_list)
+    with open(dx_path, "rt") as dx_file, open(
+        tmp_path / "stream.cube", "wt"
+    ) as cube_file:
+        convert_dx_to_cube(dx_file, cube_file, atom_list)
+
+    stream_text = (tmp_path / "stream.cube").read_text()
+    assert stream_text == (tmp_path / "memory.cube").read_text()
+
+
+def test_dx2cube_batch(tmp_path):
+    """Test batch conversion of DX files listed in a manifest."""
+    rng = np.random.default_rng(1)
+    map_dir = tmp_path / "maps"
+    map_dir.mkdir()
+    for idx in range(3):
+        write_test_dx(map_dir / f"snap{idx}.dx", rng.normal(size=(3, 4, 5)))
+    write_test_dx(tmp_path / "single.dx", rng.normal(size=(2, 2, 2)))
+    out_dir = tmp_path / "cubes"
+    out_dir.mkdir()
+    pqr_path = INPUT_DIR / "dx2cube.pqr"
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(
+        "# DX PQR [OUTPUT]\n"
+        f"maps/snap*.dx {pqr_path} cubes\n"
+        f"single.dx {pqr_path} single_out.cube\n"
+        f"missing.dx {pqr_path}\n"
+    )
+
+    args = get_cli_args(f"--batch {manifest} --jobs 2")
+    assert args.batch == str(manifest)
+    tasks = read_manifest(args.batch)
+    assert [task[2] for task in tasks] == [
+        out_dir / "snap0.cube",
+        out_dir / "snap1.cube",
+        out_dir / "snap2.cube",
+        tmp_path / "single_out.cube",
+        tmp_path / "missing.cube",
+    ]
+    results = convert_batch(tasks, jobs=args.jobs)
+
+    assert [result["error"] is None for result in results] == [
+        True,
+        True,
+        True,
+        True,
+        False,
+    ]
+    with open(pqr_path, "rt") as pqr_file:
+        atom_list = read_pqr(pqr_file)
+    for (dx_path, _, cube_path), result in zip(tasks[:4], results):
+        assert result["seconds"] >= 0
+        with open(dx_path, "rt") as dx_file:
+            dx_dict = read_dx(dx_file)
+        with open(tmp_path / "expected.cube", "wt") as cube_file:
+            write_cube(cube_file, dx_dict, atom_list)
+        expected = (tmp_path / "expected.cube").read_text()
+        assert cube_path.read_text() == expected
+
+
+def fail_snap1(dx_path, cube_path, pqr_path):
+    """Convert like :func:`_convert_file`, failing unexpectedly for one."""
+    if dx_path.name == "snap1.dx":
+        raise ZeroDivisionError("degenerate grid")
+    return _convert_file(dx_path, cube_path, pqr_path)
+
+
+def test_dx2cube_batch_unexpected_error(tmp_path, monkeypatch):
+    """Test that an unexpected worker error only fails its own file."""
+    rng = np.random.default_rng(2)
+    pqr_path = INPUT_DIR / "dx2cube.pqr"
+    tasks = []
+    for idx in range(3):
+        dx_path = tmp_path / f"snap{idx}.dx"
+        write_test_dx(dx_path, rng.normal(size=(2, 3, 4)))
+        tasks.append((dx_path, pqr_path, tmp_path / f"snap{idx}.cube"))
+    monkeypatch.setattr(dx2cube, "_convert_file", fail_snap1)
+    results = convert_batch(tasks, jobs=2)
+    assert [result["error"] for result in results] == [
+        None,
+        "ZeroDivisionError: degenerate grid",
+        None,
+    ]
+    assert (tmp_path / "snap2.cube").exists()
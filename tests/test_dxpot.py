@@ -0,0 +1,55 @@
+"""
+This tests the dxpot entrypoint executable.
+"""
+
+import csv
+from io import StringIO
+
+import numpy as np
+
+from pdb2pqr.dxpot import annotate_pqr, get_cli_args
+
+PQR_TEXT = """REMARK   1 PQR file for testing
+ATOM      1  N   THR A   1       0.000   0.000   0.000  0.1000 2.0000
+ATOM      2  CA  THR A   1       0.500   1.000   0.250 -0.2000 1.5000
+HETATM    3  O   HOH     2      10.000   0.000   0.000  0.0000 1.4000
+END
+"""
+
+
+def test_annotate_pqr():
+    """Test appending sampled grid values to PQR atom lines."""
+    x, y, z = np.meshgrid(*[np.arange(3.0)] * 3, indexing="ij")
+    dx_dict = {
+        "grid spacing": [[1.0, 0, 0], [0, 1.0, 0], [0, 0, 1.0]],
+        "values": x + 10 * y + 100 * z,
+        "number of grid points": (3, 3, 3),
+        "lower left corner": [0.0, 0.0, 0.0],
+    }
+    args = get_cli_args("grid.dx in.pqr out.csv --out-of-bounds fill")
+    output = StringIO()
+    values, outside = annotate_pqr(
+        StringIO(PQR_TEXT),
+        output,
+        dx_dict,
+        method=args.method,
+        out_of_bounds=args.out_of_bounds,
+        fill_value=args.fill_value,
+    )
+    np.testing.assert_allclose(values, [0.0, 35.5, np.nan])
+    np.testing.assert_array_equal(outside, [False, False, True])
+    output.seek(0)
+    rows = list(csv.reader(output))
+    assert rows == [
+        ["serial", "name", "value"],
+        ["1", "N", "0.000000e+00"],
+        ["2", "CA", "3.550000e+01"],
+        ["3", "O", "nan"],
+    ]
+
+    # A finite fill value still reports the atom outside the grid
+    values, outside = annotate_pqr(
+        StringIO(PQR_TEXT), StringIO(), dx_dict, fill_value=0.0
+    )
+    np.testing.assert_allclose(values, [0.0, 35.5, 0.0])
+    np.testing.assert_array_equal(outside, [False, False, True])
@@ -148,3 +148,25 @@ def test_invalid_calctype():
     """Tests for input of invalid calculation types."""
     with pytest.raises(ValueError, match=r"Method.*"):
         Elec("test1.pqr", method="SHOULD_FAIL")
+
+
+def test_elec_template_fields():
+    """Test that rendering follows changes to fixed and varying fields."""
+    elec = Elec("test.pqr", "mg-para", Psize(), True, 0.15, False)
+    elec.async_ = 3
+    text = str(elec)
+    assert "    async 3\n" in text
+    assert text.count(" conc 0.150 ") == 2
+    elec.label = "100%"
+    elec.pdie = 4.0
+    elec.istrng = 0.25
+    elec.dime = [33, 65, 97]
+    text = str(elec)
+    assert text.startswith("elec 100%\n    mg-para\n    dime 33 65 97\n")
+    assert "    pdie 4.0000\n" in text
+    assert text.count(" conc 0.250 ") == 2
+    elec.istrng = 0.0
+    elec.write = [["pot", "dx", "a"], ["charge", "dx", "b"]]
+    text = str(elec)
+    assert "ion charge" not in text
+    assert text.endswith("    write pot dx a\n    write charge dx b\nend\n")
@@ -0,0 +1,69 @@
+"""Tests that the command-line tools only import what they need."""
+
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+#: Directory containing the pdb2pqr package
+ROOT_DIR = Path(__file__).parent.parent
+
+#: Modules that no short tool needs at startup
+DEFERRED_MODULES = ["propka", "pdbx", "pdb2pqr.pdb2pqr", "multiprocessing"]
+
+
+def run_python(code, *options):
+    """Run Python code in a new interpreter and return the process."""
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "module, deferred",
+    [
+        pytest.param("psize", DEFERRED_MODULES, id="psize"),
+        pytest.param("inputgen", DEFERRED_MODULES, id="inputgen"),
+        pytest.param("dx2cube", DEFERRED_MODULES, id="dx2cube"),
+        pytest.param("apbsrun", DEFERRED_MODULES + ["numpy"], id="apbsrun"),
+    ],
+)
+def test_deferred_imports(module, deferred):
+    """Test that importing a tool leaves heavy dependencies unimported."""
+    process = run_python(
+        f"import sys, pdb2pqr.{module}\n"
+        f"print(' '.join(m for m in {deferred!r} if m in sys.modules))"
+    )
+    assert process.stdout.split() == []
+
+
+def test_import_time():
+    """Test that the tool without NumPy imports faster than NumPy alone.
+
+    Both are timed in the same interpreter, so the comparison holds on a
+    slow or busy machine where an absolute budget would not.
+    """
+    process = run_python(
+        "import pdb2pqr.apbsrun\nimport numpy", "-X", "importtime"
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    assert times["pdb2pqr.apbsrun"] < times["numpy"]
+
+
+def test_lazy_main():
+    """Test that the PDB2PQR driver is still available from the package."""
+    process = run_python(
+        "import sys, pdb2pqr\n"
+        "print('pdb2pqr.pdb2pqr' in sys.modules)\n"
+        "print(pdb2pqr.main.__module__)"
+    )
+    assert process.stdout.split() == ["False", "pdb2pqr.pdb2pqr"]
@@ -3,13 +3,29 @@ TODO:   No tests for inputgen.py in old repo. Current coverage is
         based on testing the --apbs-input flag in PDB2PQR.
 """
 
+import csv
+import os
+import sys
 from pathlib import Path
+import numpy as np
 import pytest
 from .common import INPUT_DIR, get_ref_output, REF_DIR
 from pdb2pqr.config import FilePermission
-from pdb2pqr.inputgen import Input, get_cli_args, split_input
+from pdb2pqr.elec import Elec
+from pdb2pqr.inputgen import (
+    ComplexInput,
+    Input,
+    generate_inputs,
+    get_cli_args,
+    main,
+    read_bundle,
+    split_input,
+    write_sweep,
+)
+from pdb2pqr.io import read_pqr_arrays
 from pdb2pqr.process_cli import check_file
 from pdb2pqr.psize import Psize
+from .test_cost_model import write_runs
 
 
 @pytest.mark.parametrize(
@@ -70,3 +86,187 @@ def test_split_input(arguments):
 
     with pytest.raises(RuntimeError):
         split_input(args.filename)
+
+
+def test_split_input_bundle(tmp_path):
+    """Test splitting with threads and into an indexed bundle."""
+    para_path = tmp_path / "inputgen_2-para.in"
+    para_path.write_text(get_ref_output("inputgen_2-para.in"))
+    args = get_cli_args(f"{para_path} --split --jobs 4 --bundle")
+    file_list = split_input(para_path, "inputgen_2", jobs=args.jobs)
+    assert len(file_list) == 12
+    for file_path in file_list:
+        assert file_path.read_text() == get_ref_output(file_path.name)
+
+    bundle_list = split_input(para_path, "inputgen_2", bundle=args.bundle)
+    assert bundle_list == [tmp_path / "inputgen_2-PE.bundle"]
+    inputs = read_bundle(bundle_list[0])
+    assert list(inputs) == [file_path.name for file_path in file_list]
+    for name, text in inputs.items():
+        assert text == get_ref_output(name)
+    inputs = read_bundle(bundle_list[0], ["inputgen_2-PE7.in"])
+    assert inputs == {"inputgen_2-PE7.in": get_ref_output("inputgen_2-PE7.in")}
+    with pytest.raises(ValueError, match="has no"):
+        read_bundle(bundle_list[0], ["inputgen_2-PE12.in"])
+    with pytest.raises(ValueError, match="not an input bundle"):
+        read_bundle(para_path)
+
+
+def test_write_sweep(tmp_path):
+    """Test writing inputs for a Cartesian product of parameters."""
+    args = get_cli_args(
+        f"{INPUT_DIR}/dx2cube.pqr --sweep-istrng 0 0.15 --sweep-sdie 78.54 "
+        "40 --sweep-bcfl sdh mdh"
+    )
+    assert args.sweep_istrng == [0.0, 0.15]
+    assert args.sweep_bcfl == ["sdh", "mdh"]
+    manifest = write_sweep(
+        args.filename,
+        {
+            "istrng": args.sweep_istrng,
+            "sdie": args.sweep_sdie,
+            "bcfl": args.sweep_bcfl,
+            "space": [0.5, 1.0],
+        },
+        output_dir=tmp_path,
+    )
+    assert manifest == tmp_path / "dx2cube-sweep.csv"
+    with open(manifest, newline="") as manifest_file:
+        rows = list(csv.DictReader(manifest_file))
+    assert len(rows) == 16
+    assert len({row["input"] for row in rows}) == 16
+    assert rows[0]["input"] == "dx2cube-00.in"
+    # The default parameters give the usual input, reading the PQR file
+    # relative to the sweep directory
+    text = (tmp_path / rows[0]["input"]).read_text()
+    pqrname = Path(os.path.relpath(INPUT_DIR / "dx2cube.pqr", tmp_path))
+    assert (tmp_path / pqrname).samefile(INPUT_DIR / "dx2cube.pqr")
+    assert text == get_ref_output("inputgen_1.in").replace(
+        "mol pqr dx2cube.pqr", f"mol pqr {pqrname.as_posix()}"
+    )
+    row = rows[13]
+    assert (row["space"], row["istrng"], row["sdie"], row["bcfl"]) == (
+        "1.0",
+        "0.15",
+        "78.54",
+        "mdh",
+    )
+    text = (tmp_path / row["input"]).read_text()
+    assert text.count("bcfl mdh") == 2
+    assert text.count("conc 0.150") == 4
+    assert "dime 65 33 65" in text
+    with pytest.raises(ValueError, match="Cannot sweep"):
+        write_sweep(args.filename, {"temp": [300]}, output_dir=tmp_path)
+
+
+def test_complex_input(tmp_path):
+    """Test an input for a complex and its components on identical grids."""
+    text = (INPUT_DIR / "dx2cube.pqr").read_text()
+    lines = [line for line in text.splitlines() if line.startswith("ATOM")]
+    for name, part in [("receptor", lines[:5]), ("ligand", lines[5:])]:
+        (tmp_path / f"{name}.pqr").write_text("\n".join(part) + "\n")
+    psize = Psize()
+    psize.run_psize(INPUT_DIR / "dx2cube.pqr")
+    input_ = ComplexInput(
+        INPUT_DIR / "dx2cube.pqr",
+        [tmp_path / "receptor.pqr", tmp_path / "ligand.pqr"],
+        psize,
+        potdx=True,
+    )
+    text = str(input_)
+    assert text.count("    mol pqr ") == 3
+    assert "    mol pqr ligand.pqr\n" in text
+    for mol in range(1, 4):
+        assert f"    mol {mol}\n" in text
+    assert text.count("cgcent mol 1\n") == 3
+    assert "    write pot dx ligand\n" in text
+    elecs = [str(elec).splitlines() for elec in input_.elecs]
+    for idx in [3, 4, 5]:
+        assert len({elec[idx] for elec in elecs}) == 1
+    assert "print elecEnergy dx2cube - receptor - ligand end" in text
+
+    elec = Elec("mol", size=psize, center=[1.0, -2.5, 0.125])
+    assert "    cgcent 1.0000 -2.5000 0.1250\n" in str(elec)
+    text = str(ComplexInput(INPUT_DIR / "dx2cube.pqr", [], psize))
+    assert "write" not in text
+
+
+def test_generate_inputs():
+    """Test generating inputs in memory from arrays or a path."""
+    with open(INPUT_DIR / "dx2cube.pqr", "rb") as pqr_file:
+        columns = read_pqr_arrays(pqr_file)
+    atoms = {
+        "coordinates": columns["coordinates"].tolist(),
+        "radii": columns["radii"].tolist(),
+    }
+    reference = get_ref_output("inputgen_1.in")
+    assert generate_inputs(atoms, "dx2cube.pqr") == [reference]
+    assert generate_inputs(columns, "dx2cube.pqr") == [reference]
+    assert generate_inputs(INPUT_DIR / "dx2cube.pqr", "dx2cube.pqr") == [
+        reference
+    ]
+    assert "mol pqr mol.pqr\n" in generate_inputs(atoms, space=1.0)[0]
+
+    inputs = generate_inputs(
+        REF_DIR / "1AFS_ff=AMBER.pqr", method="mg-para", asyncflag=True
+    )
+    assert len(inputs) == 12
+    for iproc, text in enumerate(inputs):
+        assert text == get_ref_output(f"inputgen_2-PE{iproc}.in")
+
+
+def test_generate_inputs_cover_atoms():
+    """Test that the grids cover the atoms as the input reads them."""
+    # A rod along the xy diagonal, which a principal-axis grid would not
+    # cover in the original frame
+    rng = np.random.default_rng(0)
+    coordinates = np.outer(np.linspace(0.0, 40.0, 41), [1.0, 1.0, 0.0])
+    coordinates += rng.uniform(-1.0, 1.0, coordinates.shape)
+    radii = np.full(len(coordinates), 1.5)
+    text = generate_inputs({"coordinates": coordinates, "radii": radii})[0]
+    center = (coordinates.min(axis=0) + coordinates.max(axis=0)) / 2
+    for keyword in ["cglen", "fglen"]:
+        line = next(
+            line for line in text.splitlines() if keyword in line.split()
+        )
+        half = np.array([float(num) for num in line.split()[1:]]) / 2
+        assert np.all(coordinates + radii[:, None] <= center + half)
+        assert np.all(coordinates - radii[:, None] >= center - half)
+
+
+def test_inputgen_main(tmp_path, monkeypatch):
+    """Test that the CLI sizes with its options and reports bad grids."""
+    pqr_path = tmp_path / "mol.pqr"
+    pqr_path.write_bytes((INPUT_DIR / "dx2cube.pqr").read_bytes())
+    monkeypatch.setattr(
+        sys, "argv", ["inputgen", "--space", "1.0", str(pqr_path)]
+    )
+    main()
+    psize = Psize(space=1.0)
+    psize.run_psize(pqr_path)
+    dime = " ".join(str(num) for num in psize.ngrid)
+    assert f"dime {dime}\n" in (tmp_path / "mol.in").read_text()
+
+    csv_path = tmp_path / "runs.csv"
+    write_runs(csv_path)
+    (tmp_path / "mol.in").unlink()
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "inputgen",
+            "--method",
+            "mg-para",
+            "--cost-model",
+            str(csv_path),
+            "--gmemceil",
+            "1",
+            "--max-procs",
+            "1",
+            str(pqr_path),
+        ],
+    )
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    assert not (tmp_path / "mol.in").exists()
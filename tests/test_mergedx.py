@@ -0,0 +1,79 @@
+"""
+This tests the mergedx entrypoint executable.
+"""
+
+import numpy as np
+import pytest
+
+from pdb2pqr.io import merge_dx
+from pdb2pqr.mergedx import get_cli_args
+from .common import write_test_dx
+
+#: Global grid split into 2 x 2 x 1 overlapping sub-grids
+GLOBAL_SHAPE = (9, 7, 5)
+SUB_RANGES = [
+    ((0, 6), (0, 5), (0, 5)),
+    ((3, 9), (0, 5), (0, 5)),
+    ((0, 6), (2, 7), (0, 5)),
+    ((3, 9), (2, 7), (0, 5)),
+]
+
+
+@pytest.fixture
+def sub_grids(tmp_path):
+    """Write the sub-grids of a global grid, each offset by its index."""
+    spacing = 0.5
+    origin = np.array([-2.0, 1.0, 0.5])
+    rng = np.random.default_rng(4)
+    global_values = rng.normal(size=GLOBAL_SHAPE)
+    paths = []
+    for idx, ranges in enumerate(SUB_RANGES):
+        index = tuple(slice(start, stop) for start, stop in ranges)
+        sub_origin = origin + spacing * np.array([r[0] for r in ranges])
+        paths.append(tmp_path / f"pot-PE{idx}.dx")
+        write_test_dx(
+            paths[-1], global_values[index] + idx, sub_origin, spacing
+        )
+    return paths, global_values.round(6), origin
+
+
+def test_merge_dx_owner(sub_grids):
+    """Test that overlaps are split at their midpoints."""
+    paths, global_values, origin = sub_grids
+    args = get_cli_args(f"out.dx {' '.join(map(str, paths))} --pdime 2 2 1")
+    result = merge_dx(args.dx_inputs, policy=args.policy, pdime=args.pdime)
+    assert result["number of grid points"] == GLOBAL_SHAPE
+    np.testing.assert_allclose(result["lower left corner"], origin)
+    owner = np.zeros(GLOBAL_SHAPE)
+    owner[4:, :, :] += 1
+    owner[:, 3:, :] += 2
+    np.testing.assert_allclose(
+        result["values"], global_values + owner, atol=1e-5
+    )
+
+
+@pytest.mark.parametrize("policy", ["first", "last", "mean"])
+def test_merge_dx_overlap(sub_grids, policy):
+    """Test the other policies for overlapping points."""
+    paths, global_values, _ = sub_grids
+    result = merge_dx(paths, policy=policy)
+    contributions = [[] for _ in range(np.prod(GLOBAL_SHAPE))]
+    index = np.arange(np.prod(GLOBAL_SHAPE)).reshape(GLOBAL_SHAPE)
+    for idx, ranges in enumerate(SUB_RANGES):
+        sub_index = tuple(slice(start, stop) for start, stop in ranges)
+        for point in index[sub_index].ravel():
+            contributions[point].append(idx)
+    select = {"first": min, "last": max, "mean": np.mean}[policy]
+    offset = np.array([select(pes) for pes in contributions])
+    np.testing.assert_allclose(
+        result["values"],
+        global_values + offset.reshape(GLOBAL_SHAPE),
+        atol=1e-5,
+    )
+
+
+def test_merge_dx_bad_pdime(sub_grids):
+    """Test that a mismatched processor grid is rejected."""
+    paths, _, _ = sub_grids
+    with pytest.raises(ValueError, match="does not match pdime"):
+        merge_dx(paths, pdime=(4, 1, 1))
@@ -3,8 +3,22 @@ This tests the Psize entrypoint executable.
 .. todo:: Add finer grain tests
 """
 
+import csv
+import io
+import json
+import numpy as np
 import pytest
-from pdb2pqr.psize import Psize, get_cli_args
+from pdb2pqr.io import read_pqr_arrays
+from pdb2pqr.psize import (
+    Psize,
+    get_cli_args,
+    principal_axes,
+    read_manifest,
+    rotate_coordinates,
+    size_batch,
+    write_rotated_pqr,
+    write_table,
+)
 from .common import INPUT_DIR, get_ref_output
 
 
@@ -37,3 +51,277 @@ def test_psize(arguments: str, output_file: str):
     psize.run_psize(args.mol_path)
 
     assert str(psize) == get_ref_output(output_file)
+
+
+def test_psize_no_atoms(tmp_path):
+    """Test sizing a file with only HETATM entries."""
+    pqr_path = tmp_path / "water.pqr"
+    pqr_path.write_text(
+        "HETATM    1  O   HOH W   1       1.000   2.000   3.000 -0.8340 1.5\n"
+    )
+    psize = Psize()
+    psize.run_psize(pqr_path)
+    assert psize.num_hetatm == 1
+    assert str(psize) == "No ATOM entries in file!\n\n"
+
+
+@pytest.fixture
+def diagonal_pqr(tmp_path):
+    """Write a rod-shaped molecule lying along the diagonal of the axes."""
+    rng = np.random.default_rng(5)
+    direction = np.array([1.0, 1.0, 1.0]) / np.sqrt(3.0)
+    positions = np.outer(np.linspace(-40, 40, 200), direction)
+    positions += rng.normal(scale=1.0, size=positions.shape)
+    pqr_path = tmp_path / "rod.pqr"
+    with open(pqr_path, "wt", encoding="utf-8") as pqr_file:
+        pqr_file.write("REMARK   1 rod\n")
+        for idx, (x, y, z) in enumerate(positions):
+            pqr_file.write(
+                f"ATOM  {idx + 1:5d}  C   ALA A{idx + 1:4d}    "
+                f"{x:8.3f}{y:8.3f}{z:8.3f}  0.1000 1.7000\n"
+            )
+    return pqr_path, direction
+
+
+def test_principal_axes(diagonal_pqr):
+    """Test that the first principal axis follows the rod."""
+    pqr_path, direction = diagonal_pqr
+    with open(pqr_path, "rb") as pqr_file:
+        coordinates = read_pqr_arrays(pqr_file)["coordinates"]
+    rotation, center = principal_axes(coordinates)
+    np.testing.assert_allclose(rotation @ rotation.T, np.eye(3), atol=1e-12)
+    assert np.linalg.det(rotation) == pytest.approx(1.0)
+    assert abs(rotation[0] @ direction) > 0.999
+    rotated = rotate_coordinates(coordinates, rotation, center)
+    np.testing.assert_allclose(rotated.mean(axis=0), center, atol=1e-9)
+    np.testing.assert_allclose(
+        rotate_coordinates(rotated, rotation.T, center), coordinates
+    )
+
+
+def test_psize_reorient(diagonal_pqr, tmp_path):
+    """Test that reorienting a diagonal molecule shrinks its grid."""
+    pqr_path, _ = diagonal_pqr
+    psize = Psize(gmemceil=4000)
+    psize.run_psize(pqr_path)
+    assert psize.rotation is None
+    assert "REORIENTATION" not in str(psize)
+    reoriented = Psize(gmemceil=4000)
+    reoriented.run_psize(pqr_path, reorient=True)
+    assert reoriented.original_ngrid == psize.ngrid
+    assert np.prod(reoriented.ngrid) < np.prod(psize.ngrid) / 4
+    assert "Grid points saved = " in str(reoriented)
+    assert reoriented.to_dict()["reorientation"]["saved_points"] > 0
+
+    rotated_path = tmp_path / "rotated.pqr"
+    transform_path = write_rotated_pqr(
+        pqr_path,
+        rotated_path,
+        reoriented.rotation,
+        reoriented.rotation_center,
+    )
+    with open(transform_path, "rt", encoding="utf-8") as transform_file:
+        transform = json.load(transform_file)
+    with open(rotated_path, "rb") as pqr_file:
+        rotated = read_pqr_arrays(pqr_file)
+    with open(pqr_path, "rb") as pqr_file:
+        original = read_pqr_arrays(pqr_file)
+    restored = rotate_coordinates(
+        rotated["coordinates"],
+        np.array(transform["rotation"]).T,
+        np.array(transform["center"]),
+    )
+    np.testing.assert_allclose(restored, original["coordinates"], atol=2e-3)
+    np.testing.assert_array_equal(rotated["charges"], original["charges"])
+    rerun = Psize()
+    rerun.run_psize(rotated_path)
+    assert rerun.ngrid == reoriented.ngrid
+    # Atom lines with extra fields are not valid PQR
+    annotated_path = tmp_path / "annotated.pqr"
+    annotated_path.write_text(
+        "".join(
+            f"{line.rstrip()} 1.0\n" if line.startswith("ATOM") else line
+            for line in pqr_path.read_text().splitlines(keepends=True)
+        )
+    )
+    with pytest.raises(ValueError, match="Unable to parse line"):
+        write_rotated_pqr(
+            annotated_path,
+            tmp_path / "rotated2.pqr",
+            reoriented.rotation,
+            reoriented.rotation_center,
+        )
+
+
+@pytest.mark.parametrize(
+    "positions",
+    [
+        pytest.param(
+            np.column_stack(
+                [
+                    np.random.default_rng(0).uniform(-30, 30, (600, 2)),
+                    np.random.default_rng(1).normal(0, 0.5, 600),
+                ]
+            ),
+            id="square slab",
+        ),
+        pytest.param(
+            np.outer(np.linspace(-40, 40, 200), [1.0, 0.0, 0.0]),
+            id="axis-aligned rod",
+        ),
+    ],
+)
+def test_psize_reorient_no_gain(positions):
+    """Test that a rotation that does not shrink the grid is not used."""
+    atoms = {"coordinates": positions, "radii": np.full(len(positions), 1.7)}
+    psize = Psize(gmemceil=4000)
+    psize.run_arrays(atoms)
+    reoriented = Psize(gmemceil=4000)
+    reoriented.run_arrays(atoms, reorient=True)
+    assert reoriented.rotation is None
+    assert reoriented.ngrid == psize.ngrid
+    assert reoriented.to_dict()["reorientation"] is None
+    assert "Grid points saved" not in str(reoriented)
+    # The grid the principal axes would give is no smaller
+    rotation, center = principal_axes(positions)
+    rotated = Psize(gmemceil=4000)
+    rotated.run_arrays(
+        dict(
+            atoms, coordinates=rotate_coordinates(positions, rotation, center)
+        )
+    )
+    assert np.prod(rotated.ngrid) >= np.prod(psize.ngrid)
+
+
+def test_search_proc_grid():
+    """Test the processor grid search against the greedy setup."""
+    greedy = Psize(gmemceil=100)
+    greedy.run_psize(INPUT_DIR / "dx2cube.pqr")
+    assert greedy.proc_grid == [3, 2, 1]
+    assert "Proc. grid = 3 x 2 x 1" in str(greedy)
+
+    psize = Psize(gmemceil=100)
+    psize.run_psize(INPUT_DIR / "dx2cube.pqr")
+    options = psize.search_proc_grid(top=3)
+    assert [option["nproc"] for option in options] == [4, 4, 5]
+    assert options[0]["pdime"] == [1, 4, 1]
+    assert options[0]["nsmall"] == [129, 33, 97]
+    assert all(option["memory"] < 100 for option in options)
+    assert psize.proc_grid == [1, 4, 1]
+    assert psize.nsmall == [129, 33, 97]
+    assert "Total processors required = 4" in str(psize)
+    assert "######## PROCESSOR GRID ALTERNATIVES ########" in str(psize)
+
+    options = psize.search_proc_grid(max_procs=16, objective="time")
+    points = [np.prod(option["nsmall"]) for option in options]
+    assert points == sorted(points)
+    assert all(option["nproc"] <= 16 for option in options)
+    assert options[0]["pdime"] == [1, 4, 4]
+    with pytest.raises(ValueError, match="No processor grid"):
+        psize.search_proc_grid(max_procs=3)
+
+
+def test_psize_batch(tmp_path):
+    """Test sizing many PQR files with one bad file among them."""
+    pqr_path = INPUT_DIR / "dx2cube.pqr"
+    pqr_dir = tmp_path / "pqr"
+    pqr_dir.mkdir()
+    for idx in range(3):
+        (pqr_dir / f"mol{idx}.pqr").write_bytes(pqr_path.read_bytes())
+    (pqr_dir / "bad.pqr").write_text("ATOM 1 N MET 1 1.0 2.0 x 0.1 1.5\n")
+    # Parses, but the infinite grid overflows while sizing
+    (pqr_dir / "inf.pqr").write_text(
+        "ATOM 1 N MET 1 1.0 2.0 inf 0.1 1.5\n"
+        "ATOM 2 N MET 1 3.0 2.0 1.0 0.1 1.5\n"
+    )
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(
+        "# PQR files\npqr/mol*.pqr\n\npqr/bad.pqr\npqr/inf.pqr\n"
+    )
+    args = get_cli_args(f"--batch {manifest} --jobs 2")
+    assert args.mol_path is None
+    paths = read_manifest(args.batch)
+    assert [path.name for path in paths] == [
+        "mol0.pqr",
+        "mol1.pqr",
+        "mol2.pqr",
+        "bad.pqr",
+        "inf.pqr",
+    ]
+    rows = size_batch(paths, jobs=args.jobs, gmemceil=100)
+    assert [row["error"] is None for row in rows] == [True] * 3 + [False] * 2
+    assert "Unable to parse" in rows[3]["error"]
+    assert rows[3]["ngrid"] is None
+    assert rows[4]["error"].startswith("OverflowError: ")
+    assert rows[4]["ngrid"] is None
+
+    psize = Psize(gmemceil=100)
+    psize.run_psize(pqr_path)
+    row = rows[0]
+    assert row["path"] == str(paths[0])
+    assert row["num_atom"] == psize.num_atom
+    assert row["ngrid"] == psize.ngrid
+    assert row["nsmall"] == psize.nsmall
+    assert row["pdime"] == [3, 2, 1]
+    assert row["nfocus"] == psize.nfocus
+    assert row["memory_per_proc"] < 100 < row["sequential_memory"]
+
+    table = io.StringIO()
+    write_table(rows, table, "jsonl")
+    lines = table.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == rows
+    table = io.StringIO()
+    write_table(rows, table, "csv")
+    records = list(csv.DictReader(io.StringIO(table.getvalue())))
+    assert len(records) == 5
+    assert records[0]["ngrid_x"] == str(psize.ngrid[0])
+    assert records[0]["pdime_y"] == "2"
+    assert records[3]["ngrid_x"] == ""
+
+
+def test_psize_to_dict():
+    """Test the structured results against the text report."""
+    psize = Psize()
+    psize.run_psize(INPUT_DIR / "dx2cube.pqr")
+    values = psize.to_dict()
+    assert json.loads(json.dumps(values)) == values
+    assert values["parallel"] is False
+    assert values["ngrid"] == values["nglob"] == [129, 97, 97]
+    assert values["spacing"][0] == pytest.approx(
+        values["fine_length"][0] / 128
+    )
+    text = str(psize)
+    assert f"Memory per processor = {values['memory_per_proc']:.3f}" in text
+    assert values["reorientation"] is None
+    assert values["cost"] is None
+
+    psize = Psize(gmemceil=100)
+    psize.run_psize(INPUT_DIR / "dx2cube.pqr")
+    values = psize.to_dict()
+    assert values["parallel"] is True
+    assert values["pdime"] == [3, 2, 1]
+    assert values["nproc"] == 6
+    assert values["memory_per_proc"] < 100 < values["sequential_memory"]
+    assert values["nglob"][2] == values["nsmall"][2]
+    assert values["nglob"][0] > values["nsmall"][0]
+    spacing = " x ".join(f"{num:g}" for num in values["spacing"])
+    assert f"Fine mesh spacing = {spacing} A\n" in str(psize)
+    assert get_cli_args("--format json x.pqr").format == "json"
+
+
+def test_psize_gmemfac():
+    """Test that every memory estimate uses the bytes-per-grid factor."""
+    base = Psize(gmemceil=100)
+    base.run_psize(INPUT_DIR / "dx2cube.pqr")
+    heavy = Psize(gmemceil=100, gmemfac=400)
+    heavy.run_psize(INPUT_DIR / "dx2cube.pqr")
+    base_values = base.to_dict()
+    values = heavy.to_dict()
+    assert values["sequential_memory"] == pytest.approx(
+        2 * base_values["sequential_memory"]
+    )
+    assert values["nproc"] > base_values["nproc"]
+    assert values["memory_per_proc"] < 100
+    assert heavy.predict_cost()["memory"] == pytest.approx(
+        values["memory_per_proc"]
+    )
@@ -0,0 +1,76 @@
+"""Tests for the on-disk cache of psize results."""
+
+import os
+import pytest
+
+from pdb2pqr import psize as psize_module
+from pdb2pqr.psize import Psize
+from pdb2pqr.psize_cache import PsizeCache
+from .common import INPUT_DIR, get_ref_output
+
+
+@pytest.fixture
+def pqr_path(tmp_path):
+    """Copy the test molecule so that it can be edited."""
+    path = tmp_path / "mol.pqr"
+    path.write_bytes((INPUT_DIR / "dx2cube.pqr").read_bytes())
+    return path
+
+
+def test_psize_cache(pqr_path, tmp_path, monkeypatch):
+    """Test cache hits for unchanged atoms and misses for changed ones."""
+    cache = PsizeCache(tmp_path / "cache")
+    first = Psize(cache=cache)
+    first.run_psize(pqr_path)
+    assert str(first) == get_ref_output("psize_1.out")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("PQR file read on a cache hit")
+
+    # An unchanged file is not even read
+    with monkeypatch.context() as patch:
+        patch.setattr(psize_module, "read_pqr_arrays", fail)
+        second = Psize(cache=cache)
+        second.run_psize(pqr_path)
+    assert str(second) == str(first)
+
+    # Only REMARK lines differ: read again, but the atoms hit the cache
+    pqr_path.write_text("REMARK edited\n" + pqr_path.read_text())
+    with monkeypatch.context() as patch:
+        patch.setattr(Psize, "_set_all", fail)
+        third = Psize(cache=cache)
+        third.run_psize(pqr_path)
+    assert str(third) == str(first)
+
+    # Different parameters or atoms are computed again
+    other = Psize(space=1.0, cache=cache)
+    other.run_psize(pqr_path)
+    assert other.ngrid != first.ngrid
+    lines = pqr_path.read_text().splitlines(keepends=True)
+    lines = [line for line in lines if not line.startswith("REMARK")]
+    pqr_path.write_text("".join(lines[:-10]))
+    fewer = Psize(cache=cache)
+    fewer.run_psize(pqr_path)
+    assert fewer.num_atom < first.num_atom
+
+    reoriented = Psize(cache=cache)
+    reoriented.run_psize(pqr_path, reorient=True)
+    cached = Psize(cache=cache)
+    cached.run_psize(pqr_path, reorient=True)
+    assert str(cached) == str(reoriented)
+    assert "REORIENTATION" in str(cached)
+
+
+def test_psize_cache_eviction(tmp_path):
+    """Test that the least recently used results are evicted."""
+    cache = PsizeCache(tmp_path / "cache", max_bytes=300)
+    cache.put("a", {}, {"value": "a" * 100})
+    cache.put("b", {}, {"value": "b" * 100})
+    # Mark "a" as the most recently used
+    paths = {key: cache._entry_path(key, {}) for key in "abc"}
+    os.utime(paths["b"], ns=(0, 0))
+    assert cache.get("a", {}) == {"value": "a" * 100}
+    cache.put("c", {}, {"value": "c" * 100})
+    assert cache.get("b", {}) is None
+    assert cache.get("a", {}) is not None
+    assert cache.get("c", {}) is not None
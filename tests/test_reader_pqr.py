@@ -0,0 +1,65 @@
+"""Tests for reading PQR files."""
+
+import io
+import numpy as np
+import pytest
+
+from pdb2pqr.io import read_pqr, read_pqr_arrays
+from .common import INPUT_DIR
+
+
+@pytest.mark.parametrize("mode", ["rt", "rb"])
+def test_read_pqr_arrays(mode):
+    """Test that the arrays match the atoms read one line at a time."""
+    pqr_path = INPUT_DIR / "dx2cube.pqr"
+    with open(pqr_path, "rt", encoding="utf-8") as pqr_file:
+        atoms = read_pqr(pqr_file)
+    with open(pqr_path, mode) as pqr_file:
+        columns = read_pqr_arrays(pqr_file)
+    np.testing.assert_array_equal(
+        columns["coordinates"], [[atom.x, atom.y, atom.z] for atom in atoms]
+    )
+    np.testing.assert_array_equal(
+        columns["charges"], [atom.charge for atom in atoms]
+    )
+    np.testing.assert_array_equal(
+        columns["radii"], [atom.radius for atom in atoms]
+    )
+    np.testing.assert_array_equal(
+        columns["hetatm"], [atom.type == "HETATM" for atom in atoms]
+    )
+
+
+def test_read_pqr_arrays_fields():
+    """Test lines with and without optional fields and merged serials."""
+    text = (
+        "REMARK   1 ATOM looking line\n"
+        "ATOM      1  N   MET     1      -1.000   2.000   3.000 -0.3000 1.8\n"
+        "ATOM100000  CA  MET A   1A      4.0 5.0 6.0  0.1 1.9\r\n"
+        "HETATM    3  O   HOH W   2  7.000 8.000 9.000 -0.8340 1.5\n"
+        "TER\n"
+        "ATOM 4 C ALA 2 0 0 0 0 0"
+    )
+    columns = read_pqr_arrays(io.StringIO(text))
+    np.testing.assert_array_equal(
+        columns["coordinates"],
+        [[-1.0, 2.0, 3.0], [4.0, 5.0, 6.0], [7.0, 8.0, 9.0], [0, 0, 0]],
+    )
+    np.testing.assert_array_equal(columns["charges"], [-0.3, 0.1, -0.834, 0])
+    np.testing.assert_array_equal(columns["radii"], [1.8, 1.9, 1.5, 0])
+    np.testing.assert_array_equal(
+        columns["hetatm"], [False, False, True, False]
+    )
+    for line in ["ATOM 1 N 1.0 2.0\n", "REMARK\nATOM 1 N 1.0 2.0\n"]:
+        with pytest.raises(ValueError, match="Unable to parse line: ATOM"):
+            read_pqr_arrays(io.StringIO(line))
+    assert len(read_pqr_arrays(io.StringIO(""))["charges"]) == 0
+    assert len(read_pqr_arrays(io.StringIO("END\n\n"))["charges"]) == 0
+    # Truncated or garbled records are errors, as in read_pqr
+    for line in ["ATOM 1 N MET 1 1.0 2.0 3.0 0.1 1.5\nATO", "MODEL 1\n"]:
+        with pytest.raises(ValueError, match="Unable to parse line"):
+            read_pqr_arrays(io.StringIO(line))
+        with pytest.raises(ValueError, match="Unable to parse line"):
+            read_pqr(io.StringIO(line))
+    with pytest.raises(ValueError, match="Unable to parse"):
+        read_pqr_arrays(io.StringIO("ATOM 1 N MET 1 1.0 2.0 x 0.1 1.5\n"))